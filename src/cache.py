@@ -0,0 +1,258 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+class TTLCache:
+    """
+    Size-bounded cache with per-entry expiry, LRU eviction and hit/miss statistics.
+    
+    The size of each entry is measured by sizeof (1 per entry by default), so
+    a cache of transaction lists can be bounded by the total number of rows.
+    """
+    
+    def __init__(
+        self,
+        maxsize: int = 128,
+        ttl: float = 300,
+        sizeof: Optional[Callable[[Any], int]] = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._sizeof = sizeof or (lambda value: 1)
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, record=False) is not None
+    
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+    
+    def get(self, key: Hashable, default: Any = None, record: bool = True) -> Any:
+        """Get a live entry and mark it as most recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] >= self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if record:
+                    self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            if record:
+                self.hits += 1
+            return entry[2]
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store an entry, evicting least recently used entries to stay within maxsize."""
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.maxsize:
+                return
+            self._entries[key] = (time.time(), size, value)
+            self._size += size
+            while self._size > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+    
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._entries[key][2]
+            self._remove(key)
+            return value
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+    
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Get the live entries, most recently used last, without touching statistics."""
+        now = time.time()
+        with self._lock:
+            return [
+                (key, value) for key, (stored_at, _, value) in self._entries.items()
+                if now - stored_at < self.ttl
+            ]
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size": self._size,
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+def _day(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime("%Y-%m-%d") if value else None
+
+class TransactionCache(TTLCache):
+    """
+    Cache of red-flag query results that also answers narrower queries.
+    
+    Entries are keyed by day-granular date range, category and account set.
+    A query whose range, category and accounts fall inside a cached entry is
+    answered by filtering that entry instead of going upstream.
+    """
+    
+    def __init__(self, maxsize: int = 50000, ttl: float = 300):
+        # Bounded by the total number of cached transactions
+        super().__init__(maxsize=maxsize, ttl=ttl, sizeof=lambda value: len(value) + 1)
+        self.subsumed_hits = 0
+    
+    @staticmethod
+    def make_key(
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_id: Optional[str],
+        account_ids: List[str]
+    ) -> Tuple:
+        return (_day(start_date), _day(end_date), category_id, frozenset(account_ids))
+    
+    @staticmethod
+    def _covers(entry_key: Tuple, query_key: Tuple) -> bool:
+        start, end, category_id, account_ids = entry_key
+        q_start, q_end, q_category_id, q_account_ids = query_key
+        if start is not None and (q_start is None or q_start < start):
+            return False
+        if end is not None and (q_end is None or q_end > end):
+            return False
+        if category_id is not None and q_category_id != category_id:
+            return False
+        if account_ids and not (q_account_ids and q_account_ids <= account_ids):
+            return False
+        return True
+    
+    def lookup(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_id: Optional[str],
+        account_ids: List[str]
+    ) -> Optional[List[Dict]]:
+        """
+        Find cached transactions for a query, exactly or from a wider entry.
+        
+        Returns:
+            List of transaction dictionaries, or None on a miss
+        """
+        query_key = self.make_key(start_date, end_date, category_id, account_ids)
+        with self._lock:
+            exact = self.get(query_key, record=False)
+            if exact is not None:
+                self.hits += 1
+                return exact
+            
+            # Most recently used supersets first
+            for key, transactions in reversed(self.items()):
+                if self._covers(key, query_key):
+                    self.get(key, record=False)  # Refresh LRU position of the superset
+                    self.hits += 1
+                    self.subsumed_hits += 1
+                    break
+            else:
+                self.misses += 1
+                return None
+        
+        q_start, q_end, q_category_id, q_account_ids = query_key
+        return [
+            t for t in transactions
+            if (q_start is None or t["date"] >= q_start)
+            and (q_end is None or t["date"] <= q_end)
+            and (q_category_id is None or t["category_id"] == q_category_id)
+            and (not q_account_ids or t["account_id"] in q_account_ids)
+        ]
+    
+    def store(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_id: Optional[str],
+        account_ids: List[str],
+        transactions: List[Dict]
+    ) -> None:
+        self.set(self.make_key(start_date, end_date, category_id, account_ids), transactions)
+    
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats["subsumed_hits"] = self.subsumed_hits
+        return stats
+
+class _Flight:
+    """One in-flight call and the outcome its waiters share."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one execution.
+    
+    The first caller for a key runs the function; callers arriving while it
+    is still running wait and receive its result, or its exception, instead
+    of repeating the work. Nothing is kept once the call finishes.
+    """
+    
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn for key, or wait for the call already running for key."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                self.shared += 1
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._flights)}
@@ -0,0 +1,80 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+import requests
+from ynab_client import YNABClient
+from rate_limiter import RateLimitExceeded
+
+class CacheWarmer:
+    """
+    Background refresher that keeps the dashboard's common views warm.
+    
+    Every interval seconds one thread refreshes, at background priority, the
+    transactions behind the default window, the accounts list and the
+    categories, so requests find them fresh instead of waiting on YNAB.
+    Anything synced more recently than interval (by a request or the change
+    feed) is skipped, keeping the warmer cheap on the hourly quota. When
+    several web workers share the store, only the one holding its warm
+    lease does the refreshing.
+    """
+    
+    def __init__(
+        self,
+        client: YNABClient,
+        interval: Optional[float] = None,
+        window_days: int = 30
+    ):
+        self.client = client
+        # Slightly shorter than the five-minute cache timeout by default
+        self.interval = interval or float(os.getenv("YNAB_WARM_INTERVAL", "240"))
+        self.window_days = window_days
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        """Start the warmer thread if it is not running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ynab-cache-warmer", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        self._stop.set()
+    
+    def _run(self) -> None:
+        # Warm once right away, then every interval
+        while True:
+            try:
+                self.warm()
+            except (requests.exceptions.RequestException, RateLimitExceeded) as e:
+                print(f"Cache warming failed: {str(e)}")
+            if self._stop.wait(self.interval):
+                return
+    
+    def _is_due(self, resource: str) -> bool:
+        return not self.client.store.is_fresh(self.client.budget_id, resource, self.interval)
+    
+    def warm(self) -> List[str]:
+        """
+        Refresh whatever is due once.
+        
+        Returns:
+            Names of the refreshed resources
+        """
+        refreshed = []
+        if not self.client.store.acquire_lease(self.client.budget_id, "warm", self.interval * 2):
+            return refreshed
+        start_date = datetime.now() - timedelta(days=self.window_days)
+        with self.client.background():
+            if self._is_due("transactions"):
+                self.client.sync_transactions(since_date=start_date)
+                refreshed.append("transactions")
+            if self._is_due("accounts"):
+                self.client.get_accounts(use_cache=False)
+                refreshed.append("accounts")
+            if self._is_due("categories"):
+                self.client.get_categories(use_cache=False)
+                refreshed.append("categories")
+        return refreshed
@@ -0,0 +1,162 @@
+import os
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import requests
+from ynab_client import YNABClient
+from rate_limiter import RateLimitExceeded
+
+class Subscription:
+    """One viewer's filters and the queue of change events waiting for it."""
+    
+    def __init__(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        account_ids: Optional[List[str]] = None,
+        max_pending: int = 100
+    ):
+        self.start_day = start_date.strftime("%Y-%m-%d") if start_date else None
+        self.end_day = end_date.strftime("%Y-%m-%d") if end_date else None
+        self.start_date = start_date
+        self.end_date = end_date
+        self.account_ids = sorted(account_ids or [])
+        self.events: "queue.Queue[Dict]" = queue.Queue(maxsize=max_pending)
+    
+    @property
+    def filters(self) -> Tuple:
+        return (self.start_day, self.end_day, tuple(self.account_ids))
+    
+    def matches(self, t) -> bool:
+        if self.start_day and t["date"] < self.start_day:
+            return False
+        if self.end_day and t["date"] > self.end_day:
+            return False
+        return not self.account_ids or t["account_id"] in self.account_ids
+
+class ChangeFeed:
+    """
+    Single background poller that fans red-flag changes out to subscribers.
+    
+    While anyone is subscribed, one thread delta-syncs the store every
+    interval seconds at background priority. Each subscriber then receives
+    only the changed red-flag transactions inside its own filters, plus its
+    totals read from the store's daily rollups, so any number of open
+    dashboards costs one upstream poll per interval.
+    
+    Web workers sharing a store poll in turn: only the worker holding the
+    store's "feed" lease syncs, and none does while the store was synced
+    within the interval. When the store was synced by someone else since
+    the last poll (a request, or another web worker), the changes it
+    brought are not known, so subscribers get a "resync" event with their
+    totals and reload the rest.
+    """
+    
+    def __init__(self, client: YNABClient, interval: Optional[float] = None):
+        self.client = client
+        self.interval = interval or float(os.getenv("YNAB_POLL_INTERVAL", "60"))
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._knowledge: Optional[int] = None
+    
+    def subscribe(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        account_ids: Optional[List[str]] = None
+    ) -> Subscription:
+        """Register a viewer, starting the poller if it is not running."""
+        subscription = Subscription(start_date, end_date, account_ids)
+        with self._lock:
+            self._subscribers.append(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="ynab-change-feed", daemon=True
+                )
+                self._thread.start()
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+    
+    def stop(self) -> None:
+        self._stop.set()
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    self._knowledge = None
+                    # Let a worker that still has viewers take over at once
+                    self.client.store.release_lease(self.client.budget_id, "feed")
+                    return
+            try:
+                self.poll()
+            except (requests.exceptions.RequestException, RateLimitExceeded) as e:
+                print(f"Change feed poll failed: {str(e)}")
+    
+    def poll(self) -> int:
+        """
+        Delta-sync once and notify subscribers affected by the changes.
+        
+        The sync is skipped when the shared store was synced within the
+        interval or another worker holds the feed lease; subscribers then
+        learn of any sync since the last poll through a resync event.
+        
+        Returns:
+            Number of subscribers notified
+        """
+        store, budget_id = self.client.store, self.client.budget_id
+        knowledge = self.client.server_knowledge
+        resync = self._knowledge is not None and knowledge != self._knowledge
+        if (
+            not store.is_fresh(budget_id, "transactions", self.interval)
+            and store.acquire_lease(budget_id, "feed", self.interval * 2)
+        ):
+            with self.client.background():
+                changes = self.client.sync_red_flag_changes()
+        else:
+            changes = {"changed": [], "removed": []} if knowledge is not None else None
+        self._knowledge = self.client.server_knowledge
+        if not changes:
+            return 0
+        if not (resync or changes["changed"] or changes["removed"]):
+            return 0
+        
+        with self._lock:
+            subscribers = list(self._subscribers)
+        # Viewers with the same filters share one rollup read
+        summaries: Dict[Tuple, Dict] = {}
+        notified = 0
+        for subscription in subscribers:
+            changed = [t for t in changes["changed"] if subscription.matches(t)]
+            if not (resync or changed or changes["removed"]):
+                continue
+            if subscription.filters not in summaries:
+                summaries[subscription.filters] = self.client.store.summarize_transactions(
+                    self.client.budget_id,
+                    start_date=subscription.start_date,
+                    end_date=subscription.end_date,
+                    account_id=subscription.account_ids or None
+                )
+            event = {
+                "changed": changed,
+                "removed": changes["removed"],
+                "summary": summaries[subscription.filters],
+                "resync": resync
+            }
+            try:
+                subscription.events.put_nowait(event)
+            except queue.Full:
+                # A viewer that stopped reading is dropped rather than buffered
+                self.unsubscribe(subscription)
+                continue
+            notified += 1
+        return notified
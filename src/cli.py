@@ -0,0 +1,142 @@
+import argparse
+import sys
+from datetime import datetime, timedelta
+from typing import List, Optional
+import requests
+from ynab_client import YNABClient
+from rate_limiter import RateLimitExceeded
+from transaction import to_currency
+
+# Only the client is imported up front; pandas, reportlab and the report
+# engines load inside the commands that need them, so quick lookups and
+# cron syncs start fast.
+
+def parse_date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date '{value}'. Use YYYY-MM-DD.")
+
+def date_range(args: argparse.Namespace):
+    """Resolve --start/--end, defaulting to the last --days days."""
+    end_date = args.end or datetime.now()
+    start_date = args.start or end_date - timedelta(days=args.days)
+    return start_date, end_date
+
+def run_amount(args: argparse.Namespace) -> int:
+    """Print the red-flag total for a date range from the local store."""
+    start_date, end_date = date_range(args)
+    client = YNABClient()
+    stats = client.get_red_flag_summary(start_date, end_date, account_id=args.account or None)
+    if args.json:
+        import fast_json
+        print(fast_json.dumps({
+            "start_date": start_date.strftime("%Y-%m-%d"),
+            "end_date": end_date.strftime("%Y-%m-%d"),
+            "total_amount": to_currency(stats["total_milliunits"]),
+            "total_milliunits": stats["total_milliunits"],
+            "count": stats["count"]
+        }).decode())
+    else:
+        print(
+            f"Red-flag total {start_date:%Y-%m-%d} to {end_date:%Y-%m-%d}: "
+            f"{to_currency(stats['total_milliunits']):,.2f} ({stats['count']} transactions)"
+        )
+    if client.last_sync_error:
+        print(f"Warning: showing stored data, sync failed: {client.last_sync_error}", file=sys.stderr)
+    return 0
+
+def run_sync(args: argparse.Namespace) -> int:
+    """Delta-sync the local store, as a cron job would."""
+    client = YNABClient()
+    with client.background():
+        changed = client.sync_transactions(since_date=datetime.now() - timedelta(days=args.days))
+        client.get_accounts(use_cache=False)
+        client.get_categories(use_cache=False)
+    print(f"Synced {changed} changed transactions")
+    return 0
+
+def run_report(args: argparse.Namespace) -> int:
+    """Generate a report file through YNABRedFlagTracker."""
+    from main import YNABRedFlagTracker
+    start_date, end_date = date_range(args)
+    YNABRedFlagTracker().generate_report(
+        start_date=start_date,
+        end_date=end_date,
+        category_id=args.category,
+        account_id=args.account or None,
+        output_format=args.format,
+        streaming=args.streaming,
+        sheet_per_month=args.sheet_per_month,
+        from_archive=args.from_archive
+    )
+    return 0
+
+def run_archive(args: argparse.Namespace) -> int:
+    """Write red-flag history to the Parquet archive."""
+    from main import YNABRedFlagTracker
+    start_date, end_date = date_range(args)
+    YNABRedFlagTracker().archive_transactions(start_date=start_date, end_date=end_date)
+    return 0
+
+def run_trend(args: argparse.Namespace) -> int:
+    """Print monthly red-flag totals from the Parquet archive, offline."""
+    from parquet_archive import monthly_totals
+    start_date, end_date = date_range(args)
+    for row in monthly_totals(start_date=start_date, end_date=end_date, account_id=args.account or None):
+        print(
+            f"{row['month']}  {row['budget_id']}  "
+            f"{to_currency(row['total_milliunits']):>14,.2f}  ({row['count']} transactions)"
+        )
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="YNAB red flag tracker")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    def add_range(command: argparse.ArgumentParser) -> None:
+        command.add_argument("--start", type=parse_date, help="First day, YYYY-MM-DD")
+        command.add_argument("--end", type=parse_date, help="Last day, YYYY-MM-DD (default today)")
+        command.add_argument("--days", type=int, default=30, help="Days back when --start is not given")
+        command.add_argument("--account", action="append", default=[], help="Account ID; repeat for several")
+    
+    amount = commands.add_parser("amount", help="Print the red-flag total for a date range")
+    add_range(amount)
+    amount.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    amount.set_defaults(run=run_amount)
+    
+    sync = commands.add_parser("sync", help="Bring the local store up to date")
+    sync.add_argument("--days", type=int, default=365, help="Days of history to keep synced")
+    sync.set_defaults(run=run_sync)
+    
+    report = commands.add_parser("report", help="Generate a report file")
+    add_range(report)
+    report.add_argument("--category", help="Category ID to filter by")
+    report.add_argument("--format", choices=["pdf", "csv", "excel"], default="pdf")
+    report.add_argument("--streaming", action="store_true", help="Write rows as they are read (csv, excel)")
+    report.add_argument("--sheet-per-month", action="store_true", help="One Excel sheet per month (with --streaming)")
+    report.add_argument("--from-archive", action="store_true", help="Read transactions from the Parquet archive")
+    report.set_defaults(run=run_report)
+    
+    archive = commands.add_parser("archive", help="Write red-flag history to the Parquet archive")
+    add_range(archive)
+    archive.set_defaults(run=run_archive, days=365)
+    
+    trend = commands.add_parser("trend", help="Print monthly red-flag totals from the Parquet archive")
+    add_range(trend)
+    trend.set_defaults(run=run_trend, days=3650)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.run(args)
+    except RateLimitExceeded as e:
+        print(f"YNAB rate limit reached and no stored data covers the request: {str(e)}", file=sys.stderr)
+        return 1
+    except (ValueError, ImportError, requests.exceptions.RequestException) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,18 @@
 import os
 from datetime import datetime, timedelta
-import pandas as pd
-from tabulate import tabulate
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.prompt import Prompt
 from rich import print as rprint
 from ynab_client import YNABClient
+from streaming_export import write_csv, write_excel
 
 class CNYDashboard:
     def __init__(self):
         self.client = YNABClient()
         self.console = Console()
-        self.cny_budget_id = "639270bb-7e47-4a46-b622-8308ce02b3d8"  # CNY Budget ID
+        self.cny_budget_id = self.client.budget_id  # Set via YNAB_BUDGET_ID
         
     def get_date_range(self):
         """Get custom date range from user."""
@@ -61,16 +60,16 @@ class CNYDashboard:
         while True:
             try:
                 selection = Prompt.ask(
-                    "Select account number (or 'all' for all accounts)",
+                    "Select account numbers, comma-separated (or 'all' for all accounts)",
                     default="all"
                 )
                 
                 if selection.lower() == "all":
                     return None
                     
-                idx = int(selection) - 1
-                if 0 <= idx < len(cny_accounts):
-                    return cny_accounts[idx]["id"]
+                indexes = [int(part) - 1 for part in selection.split(",")]
+                if all(0 <= idx < len(cny_accounts) for idx in indexes):
+                    return [cny_accounts[idx]["id"] for idx in indexes]
                 else:
                     rprint("[red]Invalid account number[/red]")
             except ValueError:
@@ -100,19 +99,22 @@ class CNYDashboard:
             self.console.print("[yellow]No red-flagged transactions found in the selected period[/yellow]")
             return
         
-        # Convert to DataFrame for analysis
-        df = pd.DataFrame(transactions)
-        df["amount"] = df["amount"].astype(float) / 1000  # Convert to CNY
-        df["date"] = pd.to_datetime(df["date"])
+        # Convert to a columnar table for analysis
+        from transaction_table import TransactionTable
+        table = TransactionTable.from_records(transactions)
         
         # Calculate statistics
-        total_amount = df["amount"].sum()
-        avg_amount = df["amount"].mean()
-        transaction_count = len(df)
+        total_amount = table.total() / 1000  # Convert to CNY
+        avg_amount = table.mean() / 1000
+        transaction_count = len(table)
         
-        # Group by category
-        category_stats = df.groupby("category_name")["amount"].agg(["sum", "count"]).reset_index()
-        category_stats = category_stats.sort_values("sum", ascending=False)
+        # Category totals come from the store's daily rollups
+        summary = self.client.get_red_flag_summary(
+            start_date=start_date,
+            end_date=end_date,
+            account_id=account_id
+        )
+        category_stats = sorted(summary["categories"], key=lambda g: g["amount"], reverse=True)
         
         # Create dashboard
         self.console.print("\n[bold]Summary Statistics[/bold]")
@@ -128,11 +130,11 @@ class CNYDashboard:
         category_table.add_column("Total Amount", style="yellow", justify="right")
         category_table.add_column("Count", style="green", justify="right")
         
-        for _, row in category_stats.iterrows():
+        for group in category_stats:
             category_table.add_row(
-                row["category_name"],
-                f"¥{row['sum']:,.2f}",
-                str(row["count"])
+                group["category_name"],
+                f"¥{group['amount'] / 1000:,.2f}",
+                str(group["count"])
             )
         
         self.console.print(category_table)
@@ -144,12 +146,12 @@ class CNYDashboard:
         transaction_table.add_column("Category", style="yellow")
         transaction_table.add_column("Amount", style="red", justify="right")
         
-        for _, row in df.sort_values("date", ascending=False).head(10).iterrows():
+        for row in table.sort(descending=True).head(10).records():
             transaction_table.add_row(
-                row["date"].strftime("%Y-%m-%d"),
+                row["date"],
                 row["payee_name"],
                 row["category_name"],
-                f"¥{row['amount']:,.2f}"
+                f"¥{row['amount'] / 1000:,.2f}"
             )
         
         self.console.print(transaction_table)
@@ -163,12 +165,13 @@ class CNYDashboard:
             )
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # Written row by row, with amounts converted to CNY
             if export_format == "csv":
                 filename = f"reports/cny_red_flags_{timestamp}.csv"
-                df.to_csv(filename, index=False)
+                write_csv(transactions, filename)
             else:
                 filename = f"reports/cny_red_flags_{timestamp}.xlsx"
-                df.to_excel(filename, index=False)
+                write_excel(transactions, filename)
             
             self.console.print(f"[green]Data exported to {filename}[/green]")
 
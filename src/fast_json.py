@@ -0,0 +1,72 @@
+import gzip
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+# orjson and brotli are optional; without them responses use the standard
+# json module and gzip
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+def _default(obj: Any) -> Any:
+    """Convert numpy and pandas values the encoders do not handle natively."""
+    import numpy as np
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(obj: Any) -> bytes:
+    """Encode an object as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+def dumps_with_raw(payload: Dict, raw: Optional[Dict[str, bytes]] = None) -> bytes:
+    """
+    Encode a dictionary, adding members whose values are already encoded.
+    
+    Values in raw (such as cached chart JSON) are spliced in as they are
+    instead of being decoded and encoded again.
+    """
+    body = dumps(payload)
+    if not raw:
+        return body
+    members = b",".join(dumps(key) + b":" + value for key, value in raw.items())
+    separator = b"," if payload else b""
+    return body[:-1] + separator + members + b"}"
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick brotli or gzip from an Accept-Encoding header, preferring brotli."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a response body with a negotiated content coding."""
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
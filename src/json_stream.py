@@ -0,0 +1,83 @@
+import codecs
+import json
+import re
+from typing import Dict, Iterable, Iterator, Optional
+
+class JSONArrayStream:
+    """
+    Incrementally parse the elements of one array field in a JSON document.
+    
+    Only the element being decoded is held in memory, so a response with tens
+    of thousands of transactions can be consumed with flat memory. Scalar
+    fields outside the array (such as server_knowledge) can be read with
+    scalar() once iteration has finished.
+    """
+    
+    def __init__(self, chunks: Iterable[bytes], key: str):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+        self._outside = ""
+        self._exhausted = False
+    
+    def _read(self) -> Optional[str]:
+        """Read and decode the next chunk, or return None at the end of the body."""
+        for chunk in self._chunks:
+            if chunk:
+                return self._decoder.decode(chunk)
+        self._exhausted = True
+        return None
+    
+    def __iter__(self) -> Iterator[Dict]:
+        buffer = ""
+        match = None
+        while match is None:
+            text = self._read()
+            if text is None:
+                self._outside = buffer
+                return
+            buffer += text
+            match = self._start.search(buffer)
+        self._outside = buffer[:match.start()]
+        buffer = buffer[match.end():]
+        pos = 0
+        
+        while True:
+            # Skip separators between elements
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                break
+            try:
+                item, end = self._json.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                text = self._read()
+                if text is None:
+                    raise ValueError("Truncated JSON array in response")
+                buffer = buffer[pos:] + text
+                pos = 0
+                continue
+            if end == len(buffer) or buffer[end] not in " \t\r\n,]":
+                # A number cut off by the end of a chunk, such as "6." of
+                # "6.02", continues in the next one
+                text = None if self._exhausted else self._read()
+                if text is not None:
+                    buffer = buffer[pos:] + text
+                    pos = 0
+                    continue
+            yield item
+            pos = end
+        
+        # Keep what follows the array for scalar lookups
+        rest = [buffer[pos + 1:]]
+        while not self._exhausted:
+            text = self._read()
+            if text is not None:
+                rest.append(text)
+        self._outside += "".join(rest)
+    
+    def scalar(self, name: str) -> Optional[int]:
+        """Get an integer field found outside the array, such as server_knowledge."""
+        match = re.search(r'"%s"\s*:\s*(-?\d+)' % re.escape(name), self._outside)
+        return int(match.group(1)) if match else None
@@ -1,14 +1,25 @@
+import calendar
 import os
 import schedule
 import time
+import requests
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Union
 from ynab_client import YNABClient
-from report_generator import ReportGenerator
+from multi_budget import MultiBudgetClient, configured_budget_ids
+from rate_limiter import RateLimitExceeded
+from streaming_export import BUDGET_EXPORT_COLUMNS, EXPORT_COLUMNS, ExportTotals, write_csv, write_excel
+from parquet_archive import archive_dir, iter_archive, write_archive
+from transaction import FIELDS
 
 class YNABRedFlagTracker:
     def __init__(self):
-        self.ynab_client = YNABClient()
+        # Track every budget in YNAB_BUDGET_IDS when more than one is configured
+        budget_ids = configured_budget_ids()
+        if len(budget_ids) > 1:
+            self.ynab_client = MultiBudgetClient(budget_ids)
+        else:
+            self.ynab_client = YNABClient()
         self.reports_dir = "reports"
         os.makedirs(self.reports_dir, exist_ok=True)
     
@@ -17,8 +28,11 @@ class YNABRedFlagTracker:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         category_id: Optional[str] = None,
-        account_id: Optional[str] = None,
-        output_format: str = "pdf"
+        account_id: Optional[Union[str, List[str]]] = None,
+        output_format: str = "pdf",
+        streaming: bool = False,
+        sheet_per_month: bool = False,
+        from_archive: bool = False
     ) -> None:
         """
         Generate a report of red-flagged transactions.
@@ -27,25 +41,38 @@ class YNABRedFlagTracker:
             start_date: Start date for filtering transactions
             end_date: End date for filtering transactions
             category_id: Optional category ID to filter by
-            account_id: Optional account ID to filter by
+            account_id: Optional account ID, or list of account IDs, to filter by
             output_format: Output format (pdf, csv, or excel)
+            streaming: Write rows as they are read, in constant memory, for
+                very large exports (csv or excel)
+            sheet_per_month: With streaming Excel output, write one sheet per month
+            from_archive: Read transactions from the Parquet archive instead
+                of YNAB, so the report is regenerated offline
         """
-        # Get transactions
-        transactions = self.ynab_client.get_red_flag_transactions(
-            start_date=start_date,
-            end_date=end_date,
-            category_id=category_id,
-            account_id=account_id
-        )
+        if from_archive:
+            transactions = self._iter_archive(start_date, end_date, category_id, account_id)
+        else:
+            # Stream transactions straight into the report
+            transactions = self.ynab_client.iter_red_flag_transactions(
+                start_date=start_date,
+                end_date=end_date,
+                category_id=category_id,
+                account_id=account_id
+            )
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if streaming:
+            self._generate_streaming_report(transactions, output_format, timestamp, sheet_per_month)
+            return
+        
+        # pandas and the report engines load only when a report is made
+        from report_generator import ReportGenerator
+        report = ReportGenerator(transactions)
         
-        if not transactions:
+        if report.table.empty:
             print("No red-flagged transactions found for the specified criteria.")
             return
         
         # Generate report
-        report = ReportGenerator(transactions)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
         if output_format.lower() == "pdf":
             output_path = os.path.join(self.reports_dir, f"red_flag_report_{timestamp}.pdf")
             report.generate_pdf(output_path)
@@ -59,7 +86,114 @@ class YNABRedFlagTracker:
             raise ValueError("Unsupported output format")
         
         print(f"Report generated successfully: {output_path}")
-        print(f"Total amount: ${report.calculate_total():,.2f}")
+        if isinstance(self.ynab_client, MultiBudgetClient):
+            for summary in self.ynab_client.summarize(list(report.table.records())):
+                print(
+                    f"Total amount ({summary['budget_name']}): "
+                    f"{summary['currency_symbol']}{summary['total_amount']:,.2f}"
+                )
+        else:
+            print(f"Total amount: ${report.calculate_total():,.2f}")
+    
+    def _generate_streaming_report(
+        self,
+        transactions: Iterable[Dict],
+        output_format: str,
+        timestamp: str,
+        sheet_per_month: bool = False
+    ) -> None:
+        """Export transactions without holding them in memory."""
+        columns = list(EXPORT_COLUMNS)
+        if isinstance(self.ynab_client, MultiBudgetClient):
+            columns += BUDGET_EXPORT_COLUMNS
+        totals = ExportTotals()
+        
+        if output_format.lower() == "csv":
+            output_path = os.path.join(self.reports_dir, f"red_flag_report_{timestamp}.csv")
+            write_csv(totals.track(transactions), output_path, columns)
+        elif output_format.lower() == "excel":
+            output_path = os.path.join(self.reports_dir, f"red_flag_report_{timestamp}.xlsx")
+            write_excel(totals.track(transactions), output_path, columns, sheet_per_month)
+        else:
+            raise ValueError("Streaming export supports csv and excel only")
+        
+        if not totals.count:
+            os.remove(output_path)
+            print("No red-flagged transactions found for the specified criteria.")
+            return
+        print(f"Report generated successfully: {output_path} ({totals.count:,} transactions)")
+        for budget in totals.budgets.values():
+            label = f" ({budget['budget_name']})" if budget["budget_name"] else ""
+            print(
+                f"Total amount{label}: "
+                f"{budget['currency_symbol']}{budget['total_milliunits'] / 1000:,.2f}"
+            )
+    
+    def _iter_archive(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_id: Optional[str],
+        account_id: Optional[Union[str, List[str]]]
+    ) -> Iterable[Dict]:
+        """Read this tracker's budgets from the archive, shaped like client results."""
+        if isinstance(self.ynab_client, MultiBudgetClient):
+            budget_ids, columns = self.ynab_client.budget_ids, None
+        else:
+            # Single-budget results carry no budget tags
+            budget_ids, columns = [self.ynab_client.budget_id], list(FIELDS)
+        return iter_archive(
+            start_date=start_date,
+            end_date=end_date,
+            budget_ids=budget_ids,
+            columns=columns,
+            category_id=category_id,
+            account_id=[account_id] if isinstance(account_id, str) else account_id or None
+        )
+    
+    def archive_transactions(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> int:
+        """
+        Write red-flagged transactions to the Parquet archive.
+        
+        The range is widened to whole months, back to the first of the start
+        month and on to the last day of the end month, and every archived
+        month of the tracked budgets in that range is replaced, including
+        months that no longer have any red flags.
+        
+        Args:
+            start_date: Start date of the history to archive
+            end_date: End date of the history to archive
+        
+        Returns:
+            Number of transactions archived
+        """
+        if start_date:
+            start_date = datetime(start_date.year, start_date.month, 1)
+        if end_date:
+            last_day = calendar.monthrange(end_date.year, end_date.month)[1]
+            end_date = datetime(end_date.year, end_date.month, last_day)
+        transactions = self.ynab_client.iter_red_flag_transactions(
+            start_date=start_date,
+            end_date=end_date
+        )
+        if isinstance(self.ynab_client, MultiBudgetClient):
+            budget_id, budget_ids = None, self.ynab_client.budget_ids
+        else:
+            budget_id = self.ynab_client.budget_id
+            budget_ids = [budget_id]
+        count = write_archive(
+            transactions,
+            budget_id=budget_id,
+            replace_budgets=budget_ids,
+            start_month=start_date.strftime("%Y-%m") if start_date else None,
+            end_month=end_date.strftime("%Y-%m") if end_date else None
+        )
+        print(f"Archived {count:,} red-flagged transactions to {archive_dir()}")
+        return count
     
     def schedule_daily_report(self, time_str: str = "18:00") -> None:
         """Schedule a daily report generation."""
@@ -92,7 +226,13 @@ class YNABRedFlagTracker:
     def run_scheduler(self) -> None:
         """Run the scheduler loop."""
         while True:
-            schedule.run_pending()
+            # Scheduled reports yield request quota to interactive use
+            with self.ynab_client.background():
+                try:
+                    schedule.run_pending()
+                except (RateLimitExceeded, requests.exceptions.RequestException) as e:
+                    # The job stays due and is retried on the next pass
+                    print(f"Scheduled report postponed: {str(e)}")
             time.sleep(60)
 
 def main():
@@ -0,0 +1,240 @@
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from dotenv import load_dotenv
+from ynab_client import YNABClient, create_session
+from transaction_store import TransactionStore
+
+def configured_budget_ids() -> List[str]:
+    """
+    Get the budgets to track from YNAB_BUDGET_IDS (comma-separated),
+    falling back to the single YNAB_BUDGET_ID.
+    """
+    load_dotenv()
+    budget_ids = os.getenv("YNAB_BUDGET_IDS") or os.getenv("YNAB_BUDGET_ID") or ""
+    return [b.strip() for b in budget_ids.split(",") if b.strip()]
+
+class MultiBudgetClient:
+    """
+    Red-flag queries across several YNAB budgets at once.
+    
+    Each budget gets its own YNABClient, but all of them share one HTTP
+    session, one rate limiter and one store, and are queried concurrently so
+    a merged result costs about as long as the slowest budget.
+    """
+    
+    def __init__(
+        self,
+        budget_ids: Optional[List[str]] = None,
+        store: Optional[TransactionStore] = None,
+        max_concurrency: int = 8,
+        **client_kwargs
+    ):
+        budget_ids = budget_ids or configured_budget_ids()
+        if not budget_ids:
+            raise ValueError("No budgets configured. Set YNAB_BUDGET_IDS in the .env file.")
+        
+        session = client_kwargs.pop("session", None) or create_session(max_concurrency)
+        first = YNABClient(budget_id=budget_ids[0], store=store, session=session, **client_kwargs)
+        self.clients: Dict[str, YNABClient] = {budget_ids[0]: first}
+        for budget_id in budget_ids[1:]:
+            self.clients[budget_id] = YNABClient(
+                budget_id=budget_id,
+                store=first.store,
+                session=session,
+                rate_limiter=first.rate_limiter,
+                **client_kwargs
+            )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="ynab-budgets"
+        )
+    
+    @property
+    def budget_ids(self) -> List[str]:
+        return list(self.clients)
+    
+    def background(self):
+        """Mark calls made by the current thread or task as background refreshes."""
+        return next(iter(self.clients.values())).background()
+    
+    def get_budget_info(self) -> Dict[str, Dict]:
+        """Get name and currency format for each configured budget."""
+        summaries = {
+            b["id"]: b for b in next(iter(self.clients.values())).get_budgets()
+        }
+        info = {}
+        for budget_id in self.clients:
+            summary = summaries.get(budget_id, {})
+            currency = summary.get("currency_format") or {}
+            info[budget_id] = {
+                "budget_id": budget_id,
+                "budget_name": summary.get("name", budget_id),
+                "currency_code": currency.get("iso_code", ""),
+                "currency_symbol": currency.get("currency_symbol", ""),
+                "decimal_digits": currency.get("decimal_digits", 2)
+            }
+        return info
+    
+    def _scoped_filters(
+        self,
+        category_id: Optional[str],
+        account_id: Optional[Union[str, List[str]]]
+    ) -> Dict[str, Tuple[Optional[str], List[str]]]:
+        """
+        Route category and account filters to the budgets that own them.
+        
+        Account and category IDs belong to a single budget, and YNAB answers
+        404 for an ID queried in any other budget. Each budget's accounts and
+        categories (usually served from the cache or store) decide which of
+        the filter IDs it gets; budgets owning none of them are left out.
+        
+        Returns:
+            Category ID and account IDs to query, by budget ID
+        """
+        account_ids = [account_id] if isinstance(account_id, str) else list(account_id or [])
+        if not category_id and not account_ids:
+            return {budget_id: (None, []) for budget_id in self.clients}
+        
+        def owned(client: YNABClient) -> Optional[Tuple[Optional[str], List[str]]]:
+            budget_accounts = []
+            if account_ids:
+                known = {a["id"] for a in client.get_accounts()}
+                budget_accounts = [a for a in account_ids if a in known]
+                if not budget_accounts:
+                    return None
+            if category_id:
+                known = {c["id"] for g in client.get_categories() for c in g.get("categories", [])}
+                if category_id not in known:
+                    return None
+            return category_id, budget_accounts
+        
+        futures = {
+            budget_id: self._executor.submit(copy_context().run, owned, client)
+            for budget_id, client in self.clients.items()
+        }
+        scoped = {}
+        for budget_id, future in futures.items():
+            filters = future.result()
+            if filters is not None:
+                scoped[budget_id] = filters
+        return scoped
+    
+    def get_red_flag_transactions(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_id: Optional[str] = None,
+        account_id: Optional[Union[str, List[str]]] = None,
+        use_cache: bool = True
+    ) -> List[Dict]:
+        """
+        Retrieve red-flagged transactions from every budget concurrently.
+        
+        Account and category filters only go to the budgets that own them.
+        
+        Args:
+            start_date: Start date for filtering transactions
+            end_date: End date for filtering transactions
+            category_id: Optional category ID to filter by
+            account_id: Optional account ID, or list of account IDs, to filter by
+            use_cache: Whether to use cached data if available
+        
+        Returns:
+            Merged list of transaction dictionaries ordered by date, each tagged
+            with its budget and currency
+        """
+        # Each worker runs in a copy of this context to keep the request priority
+        info_future = self._executor.submit(copy_context().run, self.get_budget_info)
+        futures = {
+            budget_id: self._executor.submit(
+                copy_context().run,
+                self.clients[budget_id].get_red_flag_transactions,
+                start_date=start_date,
+                end_date=end_date,
+                category_id=budget_category_id,
+                account_id=budget_account_ids,
+                use_cache=use_cache
+            )
+            for budget_id, (budget_category_id, budget_account_ids)
+            in self._scoped_filters(category_id, account_id).items()
+        }
+        budget_info = info_future.result()
+        
+        merged = []
+        for budget_id, future in futures.items():
+            tags = budget_info[budget_id]
+            merged.extend(dict(t, **tags) for t in future.result())
+        merged.sort(key=lambda t: (t["date"], t["id"]))
+        return merged
+    
+    def iter_red_flag_transactions(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_id: Optional[str] = None,
+        account_id: Optional[Union[str, List[str]]] = None
+    ) -> Iterator[Dict]:
+        """
+        Stream budget-tagged red-flagged transactions from every budget.
+        
+        Per-budget streams are merged by date, so records answered from the
+        store come out in date order without building the full list. Account
+        and category filters only go to the budgets that own them.
+        """
+        budget_info = self.get_budget_info()
+        
+        def tagged(
+            budget_id: str,
+            budget_category_id: Optional[str],
+            budget_account_ids: List[str]
+        ) -> Iterator[Dict]:
+            tags = budget_info[budget_id]
+            for t in self.clients[budget_id].iter_red_flag_transactions(
+                start_date=start_date,
+                end_date=end_date,
+                category_id=budget_category_id,
+                account_id=budget_account_ids
+            ):
+                yield dict(t, **tags)
+        
+        yield from heapq.merge(
+            *(
+                tagged(budget_id, *filters)
+                for budget_id, filters in self._scoped_filters(category_id, account_id).items()
+            ),
+            key=lambda t: (t["date"], t["id"])
+        )
+    
+    def summarize(self, transactions: List[Dict]) -> List[Dict]:
+        """
+        Total budget-tagged transactions per budget in each budget's own currency.
+        
+        Args:
+            transactions: Transactions returned by get_red_flag_transactions
+        
+        Returns:
+            One summary dictionary per budget with milliunit and currency totals
+        """
+        summaries: Dict[str, Dict] = {}
+        for t in transactions:
+            summary = summaries.setdefault(t["budget_id"], {
+                "budget_id": t["budget_id"],
+                "budget_name": t["budget_name"],
+                "currency_code": t["currency_code"],
+                "currency_symbol": t["currency_symbol"],
+                "decimal_digits": t["decimal_digits"],
+                "total_milliunits": 0,
+                "count": 0
+            })
+            summary["total_milliunits"] += t["amount"]
+            summary["count"] += 1
+        
+        for summary in summaries.values():
+            summary["total_amount"] = round(
+                summary["total_milliunits"] / 1000, summary["decimal_digits"]
+            )
+        return list(summaries.values())
@@ -0,0 +1,325 @@
+import os
+import shutil
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+from transaction import FIELDS
+
+# pyarrow is optional and heavy, so it is only loaded when an archive is
+# written or read
+
+DEFAULT_ARCHIVE_DIR = os.path.join("data", "archive")
+
+# Budget tags added by MultiBudgetClient; budget_id itself is a partition key
+BUDGET_COLUMNS = ["budget_name", "currency_code", "currency_symbol", "decimal_digits"]
+
+# Columns stored in each partition file
+ARCHIVE_COLUMNS = list(FIELDS) + BUDGET_COLUMNS
+
+# Low-cardinality columns stored dictionary-encoded, on disk and when read
+DICTIONARY_COLUMNS = [
+    "cleared", "flag_color", "account_id", "account_name", "payee_id", "payee_name",
+    "category_id", "category_name", "transfer_account_id",
+    "budget_name", "currency_code", "currency_symbol"
+]
+
+# Rows buffered per partition before they are written as a row group
+CHUNK_ROWS = 10000
+
+COMPRESSION = "zstd"
+
+def archive_dir() -> str:
+    """Archive location, from YNAB_ARCHIVE_DIR or data/archive."""
+    return os.getenv("YNAB_ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR)
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet archives need pyarrow. Install it with: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+def _schema(pa):
+    types = {"date": pa.date32(), "amount": pa.int64(), "approved": pa.bool_(), "decimal_digits": pa.int8()}
+    return pa.schema([(column, types.get(column, pa.string())) for column in ARCHIVE_COLUMNS])
+
+def _partitioning(pa):
+    import pyarrow.dataset as ds
+    return ds.partitioning(pa.schema([("budget_id", pa.string()), ("month", pa.string())]), flavor="hive")
+
+def _partition_path(root: str, budget_id: str, month: str) -> str:
+    return os.path.join(root, f"budget_id={budget_id}", f"month={month}", "part-0.parquet")
+
+def _temp_path(path: str) -> str:
+    # Dot files are skipped by dataset discovery, so readers never see a partial file
+    return os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".tmp")
+
+def write_archive(
+    transactions: Iterable[Mapping],
+    root: Optional[str] = None,
+    budget_id: Optional[str] = None,
+    chunk_rows: int = CHUNK_ROWS,
+    replace_budgets: Sequence[str] = (),
+    start_month: Optional[str] = None,
+    end_month: Optional[str] = None
+) -> int:
+    """
+    Write transactions to a Parquet archive partitioned by budget and month.
+    
+    Each (budget, month) pair becomes one file,
+    root/budget_id=<id>/month=<YYYY-MM>/part-0.parquet, compressed with
+    zstd and with repeated text columns dictionary-encoded. Rows are
+    buffered per partition and written a row group at a time, so memory is
+    bounded by chunk_rows per open partition. A written partition replaces
+    the previous file for that month, so archive whole months. Archived
+    months of replace_budgets between start_month and end_month that get
+    no rows are removed, so a month whose red flags were all cleared does
+    not keep its old partition.
+    
+    Args:
+        transactions: Iterable of transaction mappings, such as the generator
+            returned by iter_red_flag_transactions
+        root: Archive directory; defaults to archive_dir()
+        budget_id: Budget of transactions that carry no budget_id tag
+        chunk_rows: Rows buffered per partition before each write
+        replace_budgets: Budgets whose months in the range this run replaces
+        start_month: First replaced month, as YYYY-MM; defaults to the earliest
+        end_month: Last replaced month, as YYYY-MM; defaults to the latest
+    
+    Returns:
+        Number of transactions written
+    
+    Raises:
+        ImportError: If pyarrow is not installed
+        ValueError: If a transaction has no budget
+    """
+    pa, pq = _pyarrow()
+    root = root or archive_dir()
+    schema = _schema(pa)
+    writers: Dict[Tuple[str, str], "pq.ParquetWriter"] = {}
+    buffers: Dict[Tuple[str, str], Dict[str, List]] = {}
+    
+    def flush(key: Tuple[str, str]) -> None:
+        table = pa.Table.from_pydict(buffers.pop(key), schema=schema)
+        writer = writers.get(key)
+        if writer is None:
+            path = _partition_path(root, *key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            writer = writers[key] = pq.ParquetWriter(
+                _temp_path(path), schema,
+                compression=COMPRESSION,
+                use_dictionary=DICTIONARY_COLUMNS
+            )
+        writer.write_table(table)
+    
+    count = 0
+    try:
+        for t in transactions:
+            key = (t.get("budget_id") or budget_id, t["date"][:7])
+            if not key[0]:
+                raise ValueError("Archived transactions need a budget_id")
+            columns = buffers.get(key)
+            if columns is None:
+                columns = buffers[key] = {column: [] for column in ARCHIVE_COLUMNS}
+            for column in ARCHIVE_COLUMNS:
+                columns[column].append(t.get(column))
+            columns["date"][-1] = date.fromisoformat(t["date"])
+            if len(columns["id"]) >= chunk_rows:
+                flush(key)
+            count += 1
+        for key in list(buffers):
+            flush(key)
+    except BaseException:
+        # Keep the previous partitions rather than half-written ones
+        for key, writer in writers.items():
+            writer.close()
+            os.remove(_temp_path(_partition_path(root, *key)))
+        raise
+    
+    for key, writer in writers.items():
+        writer.close()
+        path = _partition_path(root, *key)
+        os.replace(_temp_path(path), path)
+    for replaced_budget in replace_budgets:
+        for month in _archived_months(root, replaced_budget):
+            if (replaced_budget, month) in writers:
+                continue
+            if (start_month and month < start_month) or (end_month and month > end_month):
+                continue
+            shutil.rmtree(os.path.dirname(_partition_path(root, replaced_budget, month)))
+    return count
+
+def _archived_months(root: str, budget_id: str) -> List[str]:
+    """Months with a partition directory for budget_id."""
+    directory = os.path.join(root, f"budget_id={budget_id}")
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        name[len("month="):] for name in os.listdir(directory) if name.startswith("month=")
+    )
+
+def _dataset(root: str):
+    pa, _ = _pyarrow()
+    import pyarrow.dataset as ds
+    if not os.path.isdir(root):
+        raise ValueError(f"No archive found at {root}. Write one with the archive command first.")
+    return ds.dataset(
+        root,
+        format=ds.ParquetFileFormat(
+            read_options=ds.ParquetReadOptions(dictionary_columns=DICTIONARY_COLUMNS)
+        ),
+        partitioning=_partitioning(pa)
+    )
+
+def _filter(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    budget_ids: Optional[Sequence[str]],
+    category_id: Optional[str] = None,
+    account_id: Optional[Sequence[str]] = None
+):
+    """Dataset filter; budget_id and month conditions prune whole partitions."""
+    import pyarrow.dataset as ds
+    conditions = []
+    if budget_ids:
+        conditions.append(ds.field("budget_id").isin(list(budget_ids)))
+    if start_date:
+        conditions.append(ds.field("month") >= start_date.strftime("%Y-%m"))
+        conditions.append(ds.field("date") >= start_date.date())
+    if end_date:
+        conditions.append(ds.field("month") <= end_date.strftime("%Y-%m"))
+        conditions.append(ds.field("date") <= end_date.date())
+    if category_id:
+        conditions.append(ds.field("category_id") == category_id)
+    if account_id:
+        conditions.append(ds.field("account_id").isin(list(account_id)))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def load_archive(
+    root: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    budget_ids: Optional[Sequence[str]] = None,
+    columns: Optional[Sequence[str]] = None,
+    category_id: Optional[str] = None,
+    account_id: Optional[Sequence[str]] = None
+):
+    """
+    Read archived transactions into a pyarrow Table.
+    
+    Only the partitions overlapping the budgets and date range are opened,
+    and only the requested columns are decoded. budget_id and month can be
+    requested like stored columns. Rows are not sorted.
+    
+    Args:
+        root: Archive directory; defaults to archive_dir()
+        start_date: First day to include
+        end_date: Last day to include
+        budget_ids: Budgets to include; defaults to all
+        columns: Columns to read; defaults to every stored column and budget_id
+        category_id: Optional category ID to filter by
+        account_id: Optional list of account IDs to filter by
+    
+    Raises:
+        ImportError: If pyarrow is not installed
+        ValueError: If there is no archive at root
+    """
+    dataset = _dataset(root or archive_dir())
+    return dataset.to_table(
+        columns=list(columns or ARCHIVE_COLUMNS + ["budget_id"]),
+        filter=_filter(start_date, end_date, budget_ids, category_id, account_id)
+    )
+
+def iter_archive(
+    root: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    budget_ids: Optional[Sequence[str]] = None,
+    columns: Optional[Sequence[str]] = None,
+    category_id: Optional[str] = None,
+    account_id: Optional[Sequence[str]] = None
+) -> Iterator[Dict]:
+    """
+    Yield archived transactions as dictionaries, ordered by date.
+    
+    Records have the same shape as those from iter_red_flag_transactions,
+    with dates as YYYY-MM-DD strings and amounts in milliunits, so reports
+    can be regenerated offline. Months are read and sorted one at a time,
+    so memory is bounded by the largest month rather than the whole range.
+    Arguments are as for load_archive.
+    """
+    pa, _ = _pyarrow()
+    import pyarrow.dataset as ds
+    columns = list(columns or ARCHIVE_COLUMNS + ["budget_id"])
+    dataset = _dataset(root or archive_dir())
+    expression = _filter(start_date, end_date, budget_ids, category_id, account_id)
+    sort_keys = [(column, "ascending") for column in ("date", "id") if column in columns]
+    for month in _months(dataset, expression):
+        month_filter = ds.field("month") == month
+        table = dataset.to_table(
+            columns=columns,
+            filter=month_filter if expression is None else expression & month_filter
+        )
+        if sort_keys:
+            table = table.sort_by(sort_keys)
+        yield from _records(pa, table)
+
+def _months(dataset, expression) -> List[str]:
+    """Months with a partition matching the filter, from the file paths alone."""
+    months = set()
+    for fragment in dataset.get_fragments(filter=expression):
+        for part in fragment.path.replace(os.sep, "/").split("/"):
+            if part.startswith("month="):
+                months.add(part[len("month="):])
+    return sorted(months)
+
+def _records(pa, table) -> Iterator[Dict]:
+    """Decode a table into transaction dictionaries, a batch at a time."""
+    for batch in table.to_batches(max_chunksize=CHUNK_ROWS):
+        # Decoding dictionaries and formatting dates column by column in
+        # Arrow is several times faster than converting each value in Python
+        values = {}
+        for name, column in zip(batch.schema.names, batch.columns):
+            if pa.types.is_dictionary(column.type):
+                column = column.cast(column.type.value_type)
+            elif name == "date":
+                column = column.cast(pa.string())
+            values[name] = column.to_pylist()
+        names = list(values)
+        for row in zip(*values.values()):
+            yield dict(zip(names, row))
+
+def monthly_totals(
+    root: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    budget_ids: Optional[Sequence[str]] = None,
+    account_id: Optional[Sequence[str]] = None
+) -> List[Dict]:
+    """
+    Total archived red-flag amounts per budget and month.
+    
+    Only the amount column is decoded (date and account_id are only read
+    to filter), so years of history are summed in a fraction of a second.
+    
+    Returns:
+        One dictionary per budget and month with budget_id, month,
+        total_milliunits and count, ordered by month
+    """
+    table = load_archive(
+        root, start_date, end_date, budget_ids, ["budget_id", "month", "amount"], account_id=account_id
+    )
+    totals = table.group_by(["budget_id", "month"]).aggregate([("amount", "sum"), ("amount", "count")])
+    totals = totals.sort_by([("month", "ascending"), ("budget_id", "ascending")])
+    return [
+        {
+            "budget_id": row["budget_id"],
+            "month": row["month"],
+            "total_milliunits": row["amount_sum"],
+            "count": row["amount_count"]
+        }
+        for row in totals.to_pylist()
+    ]
@@ -0,0 +1,124 @@
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+class RateLimitExceeded(ValueError):
+    """Raised when the YNAB request quota cannot serve a call in time."""
+    
+    def __init__(self, retry_after: float = 0):
+        super().__init__("Rate limit exceeded. Please try again later.")
+        self.retry_after = retry_after
+
+class RateLimiter:
+    """
+    Client-side token bucket for the YNAB quota of 200 requests per hour.
+    
+    Interactive calls may use the whole bucket; background refreshes stop
+    at the reserve so a user-facing request always has quota left. The bucket
+    is corrected from the X-Rate-Limit header YNAB returns on every response.
+    """
+    
+    def __init__(self, capacity: int = 200, period: float = 3600, reserve: int = 20):
+        self.capacity = capacity
+        self.period = period
+        self.reserve = reserve
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._condition = threading.Condition()
+    
+    @property
+    def remaining(self) -> float:
+        with self._condition:
+            self._refill()
+            return self._tokens
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._updated) * self.capacity / self.period
+        )
+        self._updated = now
+    
+    def _wait_time(self, floor: float) -> float:
+        """Seconds until the bucket holds one token above floor."""
+        return (floor + 1 - self._tokens) * self.period / self.capacity
+    
+    def acquire(self, priority: str = INTERACTIVE, max_wait: Optional[float] = None) -> None:
+        """
+        Take one request token, waiting for the bucket to refill if needed.
+        
+        Args:
+            priority: INTERACTIVE or BACKGROUND
+            max_wait: Longest time to wait in seconds, or None to wait indefinitely
+        
+        Raises:
+            RateLimitExceeded: If no token becomes available within max_wait
+        """
+        self._wait(priority, max_wait, take=True)
+    
+    def wait_available(self, priority: str = INTERACTIVE, max_wait: Optional[float] = None) -> None:
+        """
+        Wait until a token is available to priority, without taking it.
+        
+        Lets a caller wait for quota before it takes locks that other
+        callers need, so they do not queue behind the wait.
+        
+        Raises:
+            RateLimitExceeded: If no token becomes available within max_wait
+        """
+        self._wait(priority, max_wait, take=False)
+    
+    def _wait(self, priority: str, max_wait: Optional[float], take: bool) -> None:
+        floor = self.reserve if priority == BACKGROUND else 0
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        with self._condition:
+            while True:
+                self._refill()
+                if self._tokens >= floor + 1:
+                    if take:
+                        self._tokens -= 1
+                    return
+                wait = self._wait_time(floor)
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining < wait:
+                        raise RateLimitExceeded(retry_after=wait)
+                self._condition.wait(wait)
+    
+    def update_from_header(self, header: Optional[str]) -> None:
+        """Sync the bucket with an X-Rate-Limit header such as "36/200"."""
+        if not header:
+            return
+        try:
+            used, limit = (int(part) for part in header.split("/"))
+        except ValueError:
+            return
+        with self._condition:
+            self._refill()
+            self.capacity = limit
+            self._tokens = min(self._tokens, float(limit - used))
+    
+    def exhaust(self, retry_after: float) -> None:
+        """Empty the bucket after a 429 so callers wait until retry_after has passed."""
+        with self._condition:
+            self._tokens = 1 - retry_after * self.capacity / self.period
+            self._updated = time.monotonic()
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30) -> float:
+    """Exponential backoff with full jitter for the given retry attempt."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(api_token: str) -> RateLimiter:
+    """Get the rate limiter shared by every client using api_token."""
+    with _limiters_lock:
+        if api_token not in _limiters:
+            _limiters[api_token] = RateLimiter()
+        return _limiters[api_token]
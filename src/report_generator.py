@@ -1,19 +1,67 @@
-import pandas as pd
+import itertools
 from datetime import datetime
-from typing import List, Dict
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+from transaction_table import TransactionTable
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Transaction fields kept in reports; other YNAB fields are dropped on read
+REPORT_COLUMNS = [
+    "id", "date", "payee_name", "category_name", "account_name", "amount",
+    "memo", "flag_color", "cleared", "approved", "account_id", "category_id"
+]
+
+# Budget tags added by MultiBudgetClient
+BUDGET_COLUMNS = [
+    "budget_id", "budget_name", "currency_code", "currency_symbol", "decimal_digits"
+]
+
+# Reports with more rows use the paginated large-report PDF layout
+LARGE_REPORT_ROWS = 1000
+
+# Large-report layout: fixed row height and font size (points) and the share
+# of the page width given to date, payee, category, amount and notes
+PDF_ROW_HEIGHT = 14
+PDF_FONT_SIZE = 8
+PDF_COLUMN_SHARES = (0.13, 0.26, 0.21, 0.15, 0.25)
+
+def _clip(value: Optional[str], max_chars: int) -> Optional[str]:
+    """Shorten text to max_chars, marking the cut with an ellipsis."""
+    if value is None or len(value) <= max_chars:
+        return value
+    return value[:max_chars - 1] + "\u2026"
 
 class ReportGenerator:
-    def __init__(self, transactions: List[Dict]):
-        self.transactions = transactions
-        self.df = pd.DataFrame(transactions)
+    def __init__(self, transactions: Iterable[Dict]):
+        """
+        Build the report table in a single pass over the transactions.
+        
+        Args:
+            transactions: List or iterator of transaction dictionaries, such as
+                the generator returned by iter_red_flag_transactions
+        """
+        transactions = iter(transactions)
+        first = next(transactions, None)
+        columns = list(REPORT_COLUMNS)
+        if first is not None:
+            columns += [c for c in BUDGET_COLUMNS if c in first]
+            transactions = itertools.chain([first], transactions)
+        
+        self.table = TransactionTable.from_records(transactions, extra_columns=columns)
+        self._columns = columns
+        self._df = None
+    
+    @property
+    def df(self) -> "pd.DataFrame":
+        """Report rows as a DataFrame, built on first use by the CSV and Excel writers."""
+        if self._df is None:
+            self._df = self.table.to_dataframe(self._columns)
+        return self._df
     
     def calculate_total(self) -> float:
         """Calculate the total amount of red-flagged transactions."""
-        return self.df["amount"].sum() / 1000  # YNAB amounts are in milliunits
+        return self.table.total() / 1000  # YNAB amounts are in milliunits
     
     def generate_csv(self, output_path: str) -> None:
         """Generate a CSV report."""
@@ -23,8 +71,51 @@ class ReportGenerator:
         """Generate an Excel report."""
         self.df.to_excel(output_path, index=False)
     
-    def generate_pdf(self, output_path: str) -> None:
-        """Generate a PDF report."""
+    def _pdf_rows(self, table: TransactionTable, max_chars: Optional[List[int]] = None) -> List[List[str]]:
+        """
+        Build PDF table rows column by column instead of row by row.
+        
+        Args:
+            table: Transactions to list
+            max_chars: Optional per-column character limits; longer text is
+                clipped so rows keep a fixed height
+        """
+        columns = [
+            table.column("date").tolist(),
+            table.column("payee_name").tolist(),
+            table.column("category_name").tolist(),
+            [f"${amount / 1000:,.2f}" for amount in table.amount.tolist()],
+            table.column("memo").tolist()
+        ]
+        if max_chars:
+            columns = [
+                [_clip(value, limit) for value in values] if limit else values
+                for values, limit in zip(columns, max_chars)
+            ]
+        return [[value if value is not None else "" for value in row] for row in zip(*columns)]
+    
+    def generate_pdf(
+        self,
+        output_path: str,
+        large: Optional[bool] = None,
+        category_subtotals: bool = False
+    ) -> None:
+        """
+        Generate a PDF report.
+        
+        Args:
+            output_path: File to write
+            large: Use the large-report layout; by default it is used above
+                LARGE_REPORT_ROWS transactions
+            category_subtotals: Group transactions into one section per
+                category, each ending with its subtotal (large layout)
+        """
+        # reportlab is only loaded when a PDF is requested
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+        from reportlab.lib.styles import getSampleStyleSheet
+        
         doc = SimpleDocTemplate(output_path, pagesize=letter)
         styles = getSampleStyleSheet()
         elements = []
@@ -47,16 +138,16 @@ class ReportGenerator:
         )
         elements.append(total)
         
+        if large is None:
+            large = len(self.table) > LARGE_REPORT_ROWS
+        if large or category_subtotals:
+            elements.append(Paragraph(f"Transactions: {len(self.table):,}", styles["Normal"]))
+            self._add_large_pdf_tables(doc, elements, category_subtotals)
+            doc.build(elements)
+            return
+        
         # Prepare data for table
-        data = [["Date", "Payee", "Category", "Amount", "Notes"]]
-        for _, row in self.df.iterrows():
-            data.append([
-                row["date"],
-                row["payee_name"],
-                row["category_name"],
-                f"${row['amount']/1000:,.2f}",
-                row.get("memo", "")
-            ])
+        data = [["Date", "Payee", "Category", "Amount", "Notes"]] + self._pdf_rows(self.table)
         
         # Create table
         table = Table(data)
@@ -75,4 +166,103 @@ class ReportGenerator:
         ]))
         
         elements.append(table)
-        doc.build(elements) 
\ No newline at end of file
+        doc.build(elements)
+    
+    def _add_large_pdf_tables(self, doc, elements: List, category_subtotals: bool) -> None:
+        """
+        Lay out transactions as page-sized tables for large reports.
+        
+        Every row has a fixed height and every column a fixed width, so the
+        rows that fit on each page are known in advance. Each page gets its
+        own small table with the header repeated, and reportlab never has to
+        measure or split one huge table.
+        """
+        from reportlab.lib import colors
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import PageBreak, Paragraph, Table, TableStyle
+        
+        header = ["Date", "Payee", "Category", "Amount", "Notes"]
+        col_widths = [doc.width * share for share in PDF_COLUMN_SHARES]
+        # Helvetica averages about half an em per character; dates and
+        # amounts always fit
+        max_chars = [
+            0 if i in (0, 3) else int(width / (PDF_FONT_SIZE * 0.5))
+            for i, width in enumerate(col_widths)
+        ]
+        style = TableStyle([
+            ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+            ("FONTSIZE", (0, 0), (-1, -1), PDF_FONT_SIZE),
+            ("TOPPADDING", (0, 0), (-1, -1), 2),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ("ALIGN", (3, 0), (3, -1), "RIGHT"),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.beige, colors.white]),
+            ("BOX", (0, 0), (-1, -1), 0.5, colors.black)
+        ])
+        subtotal_style = TableStyle([
+            ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+            ("LINEABOVE", (0, -1), (-1, -1), 0.5, colors.black)
+        ], parent=style)
+        
+        # Frames keep 6pt of padding on each side
+        frame_height = doc.height - 12
+        remaining = frame_height
+        for flowable in elements:
+            remaining -= (
+                flowable.wrap(doc.width, frame_height)[1]
+                + flowable.getSpaceBefore() + flowable.getSpaceAfter()
+            )
+        
+        def add_rows(rows: List[List[str]], subtotal: bool) -> None:
+            nonlocal remaining
+            start = 0
+            while start < len(rows):
+                # Rows that fit below a header, keeping one row spare
+                fit = int(remaining // PDF_ROW_HEIGHT) - 2
+                if fit < 1:
+                    elements.append(PageBreak())
+                    remaining = frame_height
+                    continue
+                chunk = rows[start:start + fit]
+                start += len(chunk)
+                last = subtotal and start >= len(rows)
+                elements.append(Table(
+                    [header] + chunk,
+                    colWidths=col_widths,
+                    rowHeights=PDF_ROW_HEIGHT,
+                    repeatRows=1,
+                    style=subtotal_style if last else style
+                ))
+                remaining -= (len(chunk) + 1) * PDF_ROW_HEIGHT
+        
+        if not category_subtotals:
+            add_rows(self._pdf_rows(self.table, max_chars), subtotal=False)
+            return
+        
+        heading_style = getSampleStyleSheet()["Heading3"]
+        codes = self.table.codes["category"]
+        groups = sorted(self.table.group_by("category"), key=lambda g: g["category_name"] or "")
+        for group in groups:
+            code = self.table.dictionaries["category"].codes[group["category_id"]]
+            section = self.table.take(codes == code)
+            heading = Paragraph(
+                f"{group['category_name'] or 'Uncategorized'}: "
+                f"${group['amount'] / 1000:,.2f} ({group['count']:,} transactions)",
+                heading_style
+            )
+            heading_height = (
+                heading.wrap(doc.width, frame_height)[1]
+                + heading.getSpaceBefore() + heading.getSpaceAfter()
+            )
+            # Keep a heading on the page of its first rows
+            if remaining < heading_height + 4 * PDF_ROW_HEIGHT:
+                elements.append(PageBreak())
+                remaining = frame_height
+            elements.append(heading)
+            remaining -= heading_height
+            rows = self._pdf_rows(section, max_chars)
+            rows.append(["", "", "Subtotal", f"${group['amount'] / 1000:,.2f}", ""])
+            add_rows(rows, subtotal=True)
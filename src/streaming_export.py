@@ -0,0 +1,180 @@
+import csv
+import itertools
+import os
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+# Columns written by the streaming exporters, in order
+EXPORT_COLUMNS = [
+    "date", "payee_name", "category_name", "account_name", "amount",
+    "memo", "cleared", "approved", "flag_color", "id"
+]
+
+# Budget columns added for multi-budget exports
+BUDGET_EXPORT_COLUMNS = ["budget_name", "currency_code"]
+
+# Rows formatted and written per chunk; memory use is bounded by one chunk
+CHUNK_ROWS = 1000
+
+# Excel number formats and column widths (in characters) of the exported columns
+AMOUNT_FORMAT = "#,##0.00"
+DATE_FORMAT = "yyyy-mm-dd"
+EXCEL_COLUMN_WIDTHS = {
+    "date": 12, "payee_name": 28, "category_name": 22, "account_name": 20,
+    "amount": 14, "memo": 36, "budget_name": 20
+}
+
+def _export_value(t: Mapping, column: str):
+    """Export value of one transaction field, with amounts in currency units."""
+    value = t.get(column)
+    if column == "amount" and value is not None:
+        return value / 1000
+    return value
+
+def _chunks(rows: Iterable, size: int) -> Iterator[List]:
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def write_csv(
+    transactions: Iterable[Mapping],
+    output_path: str,
+    columns: Optional[Sequence[str]] = None,
+    chunk_rows: int = CHUNK_ROWS
+) -> int:
+    """
+    Write transactions to CSV as they arrive, in constant memory.
+    
+    Only the chosen columns are written, with amounts converted from
+    milliunits. Text is quoted where needed, so commas, quotes and line
+    breaks in memos stay inside their field. Rows are formatted and written
+    a chunk at a time, so memory use does not grow with the date range.
+    
+    Args:
+        transactions: Iterable of transaction mappings, such as the generator
+            returned by iter_red_flag_transactions
+        output_path: File to write
+        columns: Columns to write; defaults to EXPORT_COLUMNS
+        chunk_rows: Rows formatted and written per chunk
+    
+    Returns:
+        Number of transactions written
+    """
+    columns = list(columns or EXPORT_COLUMNS)
+    count = 0
+    try:
+        with open(output_path, "w", newline="", encoding="utf-8", buffering=256 * 1024) as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for chunk in _chunks(transactions, chunk_rows):
+                writer.writerows([_export_value(t, c) for c in columns] for t in chunk)
+                count += len(chunk)
+    except BaseException:
+        # Do not leave a truncated export behind
+        os.remove(output_path)
+        raise
+    return count
+
+def write_excel(
+    transactions: Iterable[Mapping],
+    output_path: str,
+    columns: Optional[Sequence[str]] = None,
+    sheet_per_month: bool = False
+) -> int:
+    """
+    Write transactions to an Excel workbook with openpyxl's write-only mode.
+    
+    Rows go straight to the worksheet files as they arrive instead of being
+    built up in memory, so memory use stays near one row whatever the
+    export size. Amounts are numeric cells in currency units and dates are
+    date cells, so they sort and sum in Excel. Every sheet has a bold,
+    frozen header row.
+    
+    Args:
+        transactions: Iterable of transaction mappings, in date order as
+            returned by iter_red_flag_transactions
+        output_path: File to write
+        columns: Columns to write; defaults to EXPORT_COLUMNS
+        sheet_per_month: Write one sheet per month (named YYYY-MM) instead
+            of a single "Transactions" sheet
+    
+    Returns:
+        Number of transactions written
+    """
+    # openpyxl is only loaded when an Excel export is made
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+    
+    columns = list(columns or EXPORT_COLUMNS)
+    workbook = Workbook(write_only=True)
+    sheets = {}
+    
+    def sheet_for(name: str):
+        sheet = sheets.get(name)
+        if sheet is None:
+            sheet = sheets[name] = workbook.create_sheet(name)
+            # Layout settings must come before the first row in write-only mode
+            sheet.freeze_panes = "A2"
+            for i, column in enumerate(columns, start=1):
+                sheet.column_dimensions[get_column_letter(i)].width = EXCEL_COLUMN_WIDTHS.get(column, 12)
+            header = []
+            for column in columns:
+                cell = WriteOnlyCell(sheet, value=column)
+                cell.font = Font(bold=True)
+                header.append(cell)
+            sheet.append(header)
+        return sheet
+    
+    amount_index = columns.index("amount") if "amount" in columns else None
+    date_index = columns.index("date") if "date" in columns else None
+    count = 0
+    for t in transactions:
+        sheet = sheet_for(t["date"][:7] if sheet_per_month else "Transactions")
+        row = [_export_value(t, c) for c in columns]
+        if amount_index is not None and row[amount_index] is not None:
+            cell = WriteOnlyCell(sheet, value=row[amount_index])
+            cell.number_format = AMOUNT_FORMAT
+            row[amount_index] = cell
+        if date_index is not None and row[date_index]:
+            cell = WriteOnlyCell(sheet, value=date.fromisoformat(row[date_index]))
+            cell.number_format = DATE_FORMAT
+            row[date_index] = cell
+        sheet.append(row)
+        count += 1
+    
+    if not sheets:
+        # A workbook needs at least one sheet
+        sheet_for("Transactions")
+    workbook.save(output_path)
+    return count
+
+class ExportTotals:
+    """Running per-budget totals of the transactions passing through an export."""
+    
+    def __init__(self):
+        self.budgets: Dict[Optional[str], Dict] = {}
+    
+    def track(self, transactions: Iterable[Mapping]) -> Iterator[Mapping]:
+        """Pass transactions through unchanged while adding up their amounts."""
+        for t in transactions:
+            budget_id = t.get("budget_id")
+            totals = self.budgets.get(budget_id)
+            if totals is None:
+                totals = self.budgets[budget_id] = {
+                    "budget_name": t.get("budget_name"),
+                    "currency_symbol": t.get("currency_symbol", "$"),
+                    "total_milliunits": 0,
+                    "count": 0
+                }
+            totals["total_milliunits"] += t["amount"]
+            totals["count"] += 1
+            yield t
+    
+    @property
+    def count(self) -> int:
+        return sum(totals["count"] for totals in self.budgets.values())
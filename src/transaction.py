@@ -0,0 +1,71 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator
+
+# Transaction fields used by the client, dashboards and reports
+FIELDS = (
+    "id", "date", "amount", "memo", "cleared", "approved", "flag_color",
+    "account_id", "account_name", "payee_id", "payee_name",
+    "category_id", "category_name", "transfer_account_id"
+)
+_FIELD_SET = frozenset(FIELDS)
+
+class Transaction(Mapping):
+    """
+    Compact, read-only transaction record.
+    
+    Only the fields in FIELDS are kept, in __slots__ rather than a per-record
+    dict, so cached and stored result sets take a fraction of the memory of
+    the YNAB JSON they came from. Records read both as attributes
+    (t.amount) and as a mapping (t["amount"], t.get("memo")), so existing
+    dictionary-based callers keep working. Amounts stay integer milliunits.
+    """
+    
+    __slots__ = FIELDS
+    
+    def __init__(self, **fields: Any):
+        for name in FIELDS:
+            object.__setattr__(self, name, fields.get(name))
+    
+    @classmethod
+    def from_dict(cls, t: Mapping) -> "Transaction":
+        """Build a record from a YNAB API or store transaction dictionary."""
+        record = cls.__new__(cls)
+        for name in FIELDS:
+            object.__setattr__(record, name, t.get(name))
+        object.__setattr__(record, "approved", bool(t.get("approved")))
+        object.__setattr__(record, "amount", int(t["amount"]))
+        return record
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Transaction records are read-only")
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+    
+    def __len__(self) -> int:
+        return len(FIELDS)
+    
+    def __repr__(self) -> str:
+        return f"Transaction(id={self.id!r}, date={self.date!r}, amount={self.amount!r})"
+    
+    def __reduce__(self):
+        return (_from_values, (tuple(getattr(self, name) for name in FIELDS),))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in FIELDS}
+
+def _from_values(values: tuple) -> Transaction:
+    return Transaction(**dict(zip(FIELDS, values)))
+
+def total_milliunits(transactions: Iterable[Mapping]) -> int:
+    """Sum transaction amounts exactly, in milliunits."""
+    return sum(t["amount"] for t in transactions)
+
+def to_currency(milliunits: int) -> float:
+    """Convert milliunits to currency units for display."""
+    return milliunits / 1000
@@ -0,0 +1,652 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from transaction import Transaction
+
+RED_FLAG_COLORS = ("red", "red_flag")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    id TEXT PRIMARY KEY,
+    budget_id TEXT NOT NULL,
+    name TEXT,
+    type TEXT,
+    on_budget INTEGER,
+    closed INTEGER,
+    balance INTEGER,
+    deleted INTEGER DEFAULT 0,
+    position INTEGER
+);
+CREATE TABLE IF NOT EXISTS category_groups (
+    id TEXT PRIMARY KEY,
+    budget_id TEXT NOT NULL,
+    name TEXT,
+    hidden INTEGER,
+    deleted INTEGER DEFAULT 0,
+    position INTEGER
+);
+CREATE TABLE IF NOT EXISTS categories (
+    id TEXT PRIMARY KEY,
+    budget_id TEXT NOT NULL,
+    category_group_id TEXT,
+    name TEXT,
+    hidden INTEGER,
+    deleted INTEGER DEFAULT 0,
+    position INTEGER
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY,
+    budget_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    memo TEXT,
+    cleared TEXT,
+    approved INTEGER,
+    flag_color TEXT,
+    account_id TEXT,
+    payee_id TEXT,
+    payee_name TEXT,
+    category_id TEXT,
+    transfer_account_id TEXT,
+    sync_generation INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_flag_date
+    ON transactions (budget_id, flag_color, date);
+-- Matches the (date, id) keyset order of page_transactions, with the flag
+-- color last so red flags are picked out of the index without a sort
+DROP INDEX IF EXISTS idx_transactions_date;
+CREATE INDEX IF NOT EXISTS idx_transactions_keyset
+    ON transactions (budget_id, date, id, flag_color);
+CREATE INDEX IF NOT EXISTS idx_transactions_account
+    ON transactions (account_id, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_category
+    ON transactions (category_id, date);
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    budget_id TEXT NOT NULL,
+    flag_color TEXT NOT NULL,
+    date TEXT NOT NULL,
+    category_id TEXT NOT NULL,
+    account_id TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (budget_id, flag_color, date, category_id, account_id)
+);
+CREATE TRIGGER IF NOT EXISTS rollup_insert AFTER INSERT ON transactions BEGIN
+    INSERT INTO daily_rollups VALUES (
+        NEW.budget_id, IFNULL(NEW.flag_color, ''), NEW.date,
+        IFNULL(NEW.category_id, ''), IFNULL(NEW.account_id, ''), NEW.amount, 1
+    )
+    ON CONFLICT DO UPDATE SET amount = amount + excluded.amount, count = count + 1;
+END;
+-- The delete and update triggers are recreated so stores made with older
+-- versions of them pick up the current definitions
+DROP TRIGGER IF EXISTS rollup_delete;
+DROP TRIGGER IF EXISTS rollup_update;
+CREATE TRIGGER rollup_delete AFTER DELETE ON transactions BEGIN
+    UPDATE daily_rollups SET amount = amount - OLD.amount, count = count - 1
+    WHERE budget_id = OLD.budget_id AND flag_color = IFNULL(OLD.flag_color, '')
+        AND date = OLD.date AND category_id = IFNULL(OLD.category_id, '')
+        AND account_id = IFNULL(OLD.account_id, '');
+    DELETE FROM daily_rollups
+    WHERE budget_id = OLD.budget_id AND flag_color = IFNULL(OLD.flag_color, '')
+        AND date = OLD.date AND category_id = IFNULL(OLD.category_id, '')
+        AND account_id = IFNULL(OLD.account_id, '') AND count <= 0;
+END;
+CREATE TRIGGER rollup_update
+AFTER UPDATE OF budget_id, flag_color, date, amount, category_id, account_id ON transactions BEGIN
+    UPDATE daily_rollups SET amount = amount - OLD.amount, count = count - 1
+    WHERE budget_id = OLD.budget_id AND flag_color = IFNULL(OLD.flag_color, '')
+        AND date = OLD.date AND category_id = IFNULL(OLD.category_id, '')
+        AND account_id = IFNULL(OLD.account_id, '');
+    DELETE FROM daily_rollups
+    WHERE budget_id = OLD.budget_id AND flag_color = IFNULL(OLD.flag_color, '')
+        AND date = OLD.date AND category_id = IFNULL(OLD.category_id, '')
+        AND account_id = IFNULL(OLD.account_id, '') AND count <= 0;
+    INSERT INTO daily_rollups VALUES (
+        NEW.budget_id, IFNULL(NEW.flag_color, ''), NEW.date,
+        IFNULL(NEW.category_id, ''), IFNULL(NEW.account_id, ''), NEW.amount, 1
+    )
+    ON CONFLICT DO UPDATE SET amount = amount + excluded.amount, count = count + 1;
+END;
+CREATE TABLE IF NOT EXISTS sync_state (
+    budget_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (budget_id, key)
+);
+"""
+
+TRANSACTION_COLUMNS = (
+    "id", "date", "amount", "memo", "cleared", "approved", "flag_color",
+    "account_id", "payee_id", "payee_name", "category_id", "transfer_account_id"
+)
+
+# Transaction columns with account and category names resolved
+TRANSACTION_QUERY = (
+    f"SELECT {', '.join('t.' + c for c in TRANSACTION_COLUMNS)}, "
+    "a.name AS account_name, c.name AS category_name "
+    "FROM transactions t "
+    "LEFT JOIN accounts a ON a.id = t.account_id "
+    "LEFT JOIN categories c ON c.id = t.category_id"
+)
+
+class TransactionStore:
+    """On-disk SQLite store for YNAB transactions, accounts and categories."""
+    
+    def __init__(self, path: str = ":memory:"):
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._owner = f"{os.getpid()}-{id(self)}"
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            # WAL lets readers in other processes proceed during a sync
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            columns = [row["name"] for row in self._conn.execute("PRAGMA table_info(transactions)")]
+            if "sync_generation" not in columns:
+                # Stores created before full syncs were staged in place
+                try:
+                    self._conn.execute("ALTER TABLE transactions ADD COLUMN sync_generation INTEGER")
+                except sqlite3.OperationalError:
+                    # Another process added it first
+                    pass
+            # Stores created before the rollups existed are backfilled once
+            has_rollups = self._conn.execute("SELECT 1 FROM daily_rollups LIMIT 1").fetchone()
+            has_transactions = self._conn.execute("SELECT 1 FROM transactions LIMIT 1").fetchone()
+        if has_transactions and not has_rollups:
+            self.rebuild_rollups()
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+    
+    # Sync state
+    
+    def get_state(self, budget_id: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM sync_state WHERE budget_id = ? AND key = ?",
+                (budget_id, key)
+            ).fetchone()
+        return row["value"] if row else None
+    
+    def set_state(self, budget_id: str, key: str, value: Optional[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sync_state (budget_id, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (budget_id, key) DO UPDATE SET value = excluded.value",
+                (budget_id, key, value)
+            )
+    
+    def synced_at(self, budget_id: str, resource: str) -> float:
+        """Get the time a resource (transactions, accounts, categories) was last synced."""
+        value = self.get_state(budget_id, f"{resource}_synced_at")
+        return float(value) if value else 0.0
+    
+    def is_fresh(self, budget_id: str, resource: str, max_age: float) -> bool:
+        return time.time() - self.synced_at(budget_id, resource) < max_age
+    
+    def mark_synced(self, budget_id: str, resource: str) -> None:
+        self.set_state(budget_id, f"{resource}_synced_at", str(time.time()))
+    
+    def acquire_lease(self, budget_id: str, name: str, ttl: float) -> bool:
+        """
+        Take a named lease shared by every process using this store file.
+        
+        Used so that only one web worker syncs or warms a budget at a time.
+        A lease held by another store expires after ttl seconds, so a worker
+        that dies mid-sync does not block the others for long.
+        
+        Returns:
+            True if this store now holds the lease
+        """
+        key = f"{name}_lease"
+        now = time.time()
+        with self._lock, self._conn:
+            # Take the write lock first so the check and the update are atomic
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT value FROM sync_state WHERE budget_id = ? AND key = ?",
+                (budget_id, key)
+            ).fetchone()
+            if row and row["value"]:
+                holder, _, expires = row["value"].rpartition("|")
+                if holder != self._owner and float(expires) > now:
+                    return False
+            self._conn.execute(
+                "INSERT INTO sync_state (budget_id, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (budget_id, key) DO UPDATE SET value = excluded.value",
+                (budget_id, key, f"{self._owner}|{now + ttl}")
+            )
+        return True
+    
+    def release_lease(self, budget_id: str, name: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE sync_state SET value = NULL WHERE budget_id = ? AND key = ? AND value LIKE ?",
+                (budget_id, f"{name}_lease", f"{self._owner}|%")
+            )
+    
+    # Transactions
+    
+    def clear_transactions(self, budget_id: str) -> None:
+        with self._lock, self._conn:
+            # Rollups go first, so the per-row delete trigger finds nothing to update
+            self._conn.execute("DELETE FROM daily_rollups WHERE budget_id = ?", (budget_id,))
+            self._conn.execute("DELETE FROM transactions WHERE budget_id = ?", (budget_id,))
+    
+    def merge_transactions(
+        self,
+        budget_id: str,
+        transactions: Iterable[Dict],
+        changes: Optional[Dict[str, List]] = None,
+        generation: Optional[int] = None
+    ) -> int:
+        """
+        Upsert changed transactions and remove deleted ones, in one transaction.
+        
+        The store is locked while the transactions are merged, so callers
+        reading from the network should pass them in batches.
+        
+        Args:
+            budget_id: Budget the transactions belong to
+            transactions: Transaction dictionaries as returned by the YNAB API
+            changes: Optional dictionary collecting red-flag changes: merged
+                red-flagged transactions under "changed" and the ids of
+                transactions that are no longer red-flagged under "removed"
+            generation: Full-sync generation stamped on the merged rows, for
+                remove_stale_transactions
+        
+        Returns:
+            Number of transactions processed
+        """
+        count = 0
+        upsert_sql = (
+            f"INSERT INTO transactions (budget_id, {', '.join(TRANSACTION_COLUMNS)}, sync_generation) "
+            f"VALUES ({', '.join('?' * (len(TRANSACTION_COLUMNS) + 2))}) "
+            "ON CONFLICT (id) DO UPDATE SET "
+            + ", ".join(f"{c} = excluded.{c}" for c in TRANSACTION_COLUMNS[1:])
+            + ", sync_generation = IFNULL(excluded.sync_generation, sync_generation)"
+        )
+        with self._lock, self._conn:
+            for t in transactions:
+                count += 1
+                if changes is not None:
+                    self._record_change(t, changes)
+                if t.get("deleted"):
+                    self._conn.execute("DELETE FROM transactions WHERE id = ?", (t["id"],))
+                    continue
+                self._conn.execute(
+                    upsert_sql,
+                    (budget_id,) + tuple(t.get(c) for c in TRANSACTION_COLUMNS) + (generation,)
+                )
+                # Keep account and category names resolvable for the join
+                if t.get("account_id"):
+                    self._conn.execute(
+                        "INSERT INTO accounts (id, budget_id, name) VALUES (?, ?, ?) "
+                        "ON CONFLICT (id) DO UPDATE SET name = excluded.name",
+                        (t["account_id"], budget_id, t.get("account_name"))
+                    )
+                if t.get("category_id"):
+                    self._conn.execute(
+                        "INSERT INTO categories (id, budget_id, name) VALUES (?, ?, ?) "
+                        "ON CONFLICT (id) DO UPDATE SET name = excluded.name",
+                        (t["category_id"], budget_id, t.get("category_name"))
+                    )
+        return count
+    
+    def remove_stale_transactions(self, budget_id: str, generation: int) -> int:
+        """
+        Finish a full sync by removing the rows it did not bring in.
+        
+        A full sync merges into the existing rows, stamping each with its
+        generation, so the previous copy stays readable until the download
+        has completed. Rows from earlier generations were deleted upstream
+        or fall outside the new range.
+        
+        Returns:
+            Number of transactions removed
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM transactions WHERE budget_id = ? "
+                "AND (sync_generation IS NULL OR sync_generation != ?)",
+                (budget_id, generation)
+            )
+        return cursor.rowcount
+    
+    def _record_change(self, t: Dict, changes: Dict[str, List]) -> None:
+        """Classify an incoming transaction as a red-flag change, before it is merged."""
+        if not t.get("deleted") and t.get("flag_color") in RED_FLAG_COLORS:
+            changes.setdefault("changed", []).append(Transaction.from_dict(t))
+            return
+        row = self._conn.execute(
+            "SELECT flag_color FROM transactions WHERE id = ?", (t["id"],)
+        ).fetchone()
+        if row and row["flag_color"] in RED_FLAG_COLORS:
+            changes.setdefault("removed", []).append(t["id"])
+    
+    def query_transactions(
+        self,
+        budget_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_id: Optional[str] = None,
+        account_id: Optional[Union[str, List[str]]] = None,
+        flag_colors: Optional[Iterable[str]] = RED_FLAG_COLORS
+    ) -> List[Dict]:
+        """
+        Query stored transactions using the flag, date, account and category indexes.
+        
+        Args:
+            budget_id: Budget to query
+            start_date: Earliest transaction date to include
+            end_date: Latest transaction date to include
+            category_id: Optional category ID to filter by
+            account_id: Optional account ID, or list of account IDs, to filter by
+            flag_colors: Flag colors to include, or None for all transactions
+        
+        Returns:
+            List of transaction dictionaries ordered by date
+        """
+        return list(self.iter_transactions(
+            budget_id, start_date, end_date, category_id, account_id, flag_colors
+        ))
+    
+    def iter_transactions(
+        self,
+        budget_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_id: Optional[str] = None,
+        account_id: Optional[Union[str, List[str]]] = None,
+        flag_colors: Optional[Iterable[str]] = RED_FLAG_COLORS,
+        batch_size: int = 500
+    ) -> Iterator[Transaction]:
+        """Stream the rows of query_transactions in batches from a cursor."""
+        clauses, params = self._transaction_filters(
+            budget_id, start_date, end_date, category_id, account_id, flag_colors
+        )
+        sql = (
+            f"{TRANSACTION_QUERY} "
+            f"WHERE {' AND '.join(clauses)} "
+            "ORDER BY t.date, t.id"
+        )
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield Transaction.from_dict(dict(row))
+    
+    def page_transactions(
+        self,
+        budget_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_id: Optional[str] = None,
+        account_id: Optional[Union[str, List[str]]] = None,
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 100,
+        flag_colors: Optional[Iterable[str]] = RED_FLAG_COLORS
+    ) -> List[Transaction]:
+        """
+        Get one page of transactions, newest first, using a keyset cursor.
+        
+        The page starts right after the (date, id) of the last transaction of
+        the previous page, so any page costs an index seek plus the page size
+        rather than skipping all earlier rows.
+        
+        Args:
+            budget_id: Budget to query
+            start_date: Earliest transaction date to include
+            end_date: Latest transaction date to include
+            category_id: Optional category ID to filter by
+            account_id: Optional account ID, or list of account IDs, to filter by
+            after: (date, id) of the last transaction of the previous page
+            limit: Maximum number of transactions to return
+            flag_colors: Flag colors to include, or None for all transactions
+        
+        Returns:
+            List of Transaction records ordered by date and id, descending
+        """
+        clauses, params = self._transaction_filters(
+            budget_id, start_date, end_date, category_id, account_id, flag_colors
+        )
+        if after:
+            clauses.append("(t.date, t.id) < (?, ?)")
+            params.extend(after)
+        sql = (
+            f"{TRANSACTION_QUERY} "
+            f"WHERE {' AND '.join(clauses)} "
+            "ORDER BY t.date DESC, t.id DESC LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        return [Transaction.from_dict(dict(row)) for row in rows]
+    
+    @staticmethod
+    def _transaction_filters(
+        budget_id: str,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_id: Optional[str],
+        account_id: Optional[Union[str, List[str]]],
+        flag_colors: Optional[Iterable[str]]
+    ) -> Tuple[List[str], List]:
+        """Build the WHERE clauses and parameters shared by transaction queries."""
+        clauses = ["t.budget_id = ?"]
+        params: List = [budget_id]
+        if flag_colors is not None:
+            flag_colors = list(flag_colors)
+            clauses.append(f"t.flag_color IN ({', '.join('?' * len(flag_colors))})")
+            params.extend(flag_colors)
+        if start_date:
+            clauses.append("t.date >= ?")
+            params.append(start_date.strftime("%Y-%m-%d"))
+        if end_date:
+            clauses.append("t.date <= ?")
+            params.append(end_date.strftime("%Y-%m-%d"))
+        if category_id:
+            clauses.append("t.category_id = ?")
+            params.append(category_id)
+        if isinstance(account_id, str):
+            clauses.append("t.account_id = ?")
+            params.append(account_id)
+        elif account_id:
+            clauses.append(f"t.account_id IN ({', '.join('?' * len(account_id))})")
+            params.extend(account_id)
+        return clauses, params
+    
+    # Daily rollups
+    
+    def rebuild_rollups(self) -> None:
+        """Recompute the daily rollups from the stored transactions."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM daily_rollups")
+            self._conn.execute(
+                "INSERT INTO daily_rollups "
+                "SELECT budget_id, IFNULL(flag_color, ''), date, IFNULL(category_id, ''), "
+                "IFNULL(account_id, ''), SUM(amount), COUNT(*) "
+                "FROM transactions GROUP BY 1, 2, 3, 4, 5"
+            )
+    
+    def _rollup_query(
+        self,
+        select: str,
+        budget_id: str,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_id: Optional[str],
+        account_id: Optional[Union[str, List[str]]],
+        flag_colors: Iterable[str]
+    ) -> List[sqlite3.Row]:
+        """Aggregate rollup rows matching the filters, grouped by the first selected column."""
+        flag_colors = list(flag_colors)
+        clauses = ["r.budget_id = ?", f"r.flag_color IN ({', '.join('?' * len(flag_colors))})"]
+        params: List = [budget_id] + flag_colors
+        if start_date:
+            clauses.append("r.date >= ?")
+            params.append(start_date.strftime("%Y-%m-%d"))
+        if end_date:
+            clauses.append("r.date <= ?")
+            params.append(end_date.strftime("%Y-%m-%d"))
+        if category_id:
+            clauses.append("r.category_id = ?")
+            params.append(category_id)
+        if isinstance(account_id, str):
+            clauses.append("r.account_id = ?")
+            params.append(account_id)
+        elif account_id:
+            clauses.append(f"r.account_id IN ({', '.join('?' * len(account_id))})")
+            params.extend(account_id)
+        
+        sql = (
+            f"SELECT {select} FROM daily_rollups r "
+            "LEFT JOIN categories c ON c.id = r.category_id "
+            f"WHERE {' AND '.join(clauses)} GROUP BY 1 ORDER BY 1"
+        )
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+    
+    def summarize_transactions(
+        self,
+        budget_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_id: Optional[str] = None,
+        account_id: Optional[Union[str, List[str]]] = None,
+        flag_colors: Iterable[str] = RED_FLAG_COLORS
+    ) -> Dict:
+        """
+        Summarize stored transactions from the daily rollups.
+        
+        The rollups are kept up to date by triggers as transactions are
+        merged, changed or deleted, so the cost depends on the number of days
+        in the range rather than the number of transactions.
+        
+        Args:
+            budget_id: Budget to summarize
+            start_date: Earliest transaction date to include
+            end_date: Latest transaction date to include
+            category_id: Optional category ID to filter by
+            account_id: Optional account ID, or list of account IDs, to filter by
+            flag_colors: Flag colors to include
+        
+        Returns:
+            Dictionary with total_milliunits and count, plus per-day ("daily")
+            and per-category ("categories") totals in milliunits
+        """
+        filters = (budget_id, start_date, end_date, category_id, account_id, flag_colors)
+        daily = self._rollup_query(
+            "r.date, SUM(r.amount), SUM(r.count)", *filters
+        )
+        categories = self._rollup_query(
+            "r.category_id, c.name, SUM(r.amount), SUM(r.count)", *filters
+        )
+        return {
+            "total_milliunits": sum(row[1] for row in daily),
+            "count": sum(row[2] for row in daily),
+            "daily": [
+                {"date": date, "amount": amount, "count": count}
+                for date, amount, count in daily
+            ],
+            "categories": [
+                {"category_id": category or None, "category_name": name, "amount": amount, "count": count}
+                for category, name, amount, count in categories
+            ]
+        }
+    
+    # Accounts and categories
+    
+    def save_accounts(self, budget_id: str, accounts: List[Dict]) -> None:
+        with self._lock, self._conn:
+            for position, a in enumerate(accounts):
+                self._conn.execute(
+                    "INSERT INTO accounts (id, budget_id, name, type, on_budget, closed, balance, deleted, position) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET name = excluded.name, type = excluded.type, "
+                    "on_budget = excluded.on_budget, closed = excluded.closed, "
+                    "balance = excluded.balance, deleted = excluded.deleted, position = excluded.position",
+                    (a["id"], budget_id, a.get("name"), a.get("type"), a.get("on_budget"),
+                     a.get("closed"), a.get("balance"), a.get("deleted", False), position)
+                )
+    
+    def get_accounts(self, budget_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, name, type, on_budget, closed, balance, deleted "
+                "FROM accounts WHERE budget_id = ? AND type IS NOT NULL ORDER BY position",
+                (budget_id,)
+            ).fetchall()
+        accounts = []
+        for row in rows:
+            a = dict(row)
+            for key in ("on_budget", "closed", "deleted"):
+                a[key] = bool(a[key])
+            accounts.append(a)
+        return accounts
+    
+    def save_categories(self, budget_id: str, category_groups: List[Dict]) -> None:
+        with self._lock, self._conn:
+            for group_position, group in enumerate(category_groups):
+                self._conn.execute(
+                    "INSERT INTO category_groups (id, budget_id, name, hidden, deleted, position) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET name = excluded.name, "
+                    "hidden = excluded.hidden, deleted = excluded.deleted, position = excluded.position",
+                    (group["id"], budget_id, group.get("name"), group.get("hidden"),
+                     group.get("deleted", False), group_position)
+                )
+                for position, c in enumerate(group.get("categories", [])):
+                    self._conn.execute(
+                        "INSERT INTO categories (id, budget_id, category_group_id, name, hidden, deleted, position) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (id) DO UPDATE SET category_group_id = excluded.category_group_id, "
+                        "name = excluded.name, hidden = excluded.hidden, deleted = excluded.deleted, "
+                        "position = excluded.position",
+                        (c["id"], budget_id, group["id"], c.get("name"), c.get("hidden"),
+                         c.get("deleted", False), position)
+                    )
+    
+    def get_categories(self, budget_id: str) -> List[Dict]:
+        """Get stored categories nested under their groups, like the YNAB API."""
+        with self._lock:
+            groups = self._conn.execute(
+                "SELECT id, name, hidden, deleted FROM category_groups "
+                "WHERE budget_id = ? ORDER BY position",
+                (budget_id,)
+            ).fetchall()
+            categories = self._conn.execute(
+                "SELECT id, category_group_id, name, hidden, deleted FROM categories "
+                "WHERE budget_id = ? AND category_group_id IS NOT NULL ORDER BY position",
+                (budget_id,)
+            ).fetchall()
+        
+        by_group: Dict[str, List[Dict]] = {}
+        for row in categories:
+            c = dict(row)
+            c["hidden"] = bool(c["hidden"])
+            c["deleted"] = bool(c["deleted"])
+            by_group.setdefault(c["category_group_id"], []).append(c)
+        
+        category_groups = []
+        for row in groups:
+            group = dict(row)
+            group["hidden"] = bool(group["hidden"])
+            group["deleted"] = bool(group["deleted"])
+            group["categories"] = by_group.get(group["id"], [])
+            category_groups.append(group)
+        return category_groups
@@ -0,0 +1,252 @@
+from datetime import date
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Day numbers count days since 1970-01-01, matching numpy's datetime64[D]
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Plain per-row columns kept as object arrays
+OBJECT_COLUMNS = ["id", "memo", "flag_color", "cleared", "approved"]
+
+# Dictionary-encoded columns: code column -> (id field, name field)
+ENCODED_COLUMNS = {
+    "account": ("account_id", "account_name"),
+    "category": ("category_id", "category_name"),
+    "payee": ("payee_id", "payee_name")
+}
+
+def day_number(value: date) -> int:
+    """Convert a date or datetime to the day number used by TransactionTable."""
+    return value.toordinal() - EPOCH_ORDINAL
+
+class _Dictionary:
+    """Code assignment for one dictionary-encoded column."""
+    
+    def __init__(self):
+        self.codes: Dict[Optional[str], int] = {}
+        self.ids: List[Optional[str]] = []
+        self.names: List[Optional[str]] = []
+    
+    def encode(self, key: Optional[str], name: Optional[str]) -> int:
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.ids)
+            self.ids.append(key)
+            self.names.append(name)
+        return code
+    
+    def decode(self, codes: np.ndarray, field: str) -> np.ndarray:
+        values = np.array(self.ids if field == "id" else self.names, dtype=object)
+        return values[codes]
+
+class TransactionTable:
+    """
+    Columnar in-memory table of transactions.
+    
+    Amounts are int64 milliunits, dates are int32 day numbers and account,
+    category and payee are int32 codes into shared dictionaries, so filters,
+    sorts and group-bys run as numpy operations instead of per-row Python.
+    Filtered and sorted tables share the dictionaries of the table they came
+    from and only copy the row columns.
+    """
+    
+    def __init__(
+        self,
+        amount: np.ndarray,
+        day: np.ndarray,
+        codes: Dict[str, np.ndarray],
+        dictionaries: Dict[str, _Dictionary],
+        objects: Dict[str, np.ndarray]
+    ):
+        self.amount = amount
+        self.day = day
+        self.codes = codes
+        self.dictionaries = dictionaries
+        self.objects = objects
+    
+    @classmethod
+    def from_records(
+        cls,
+        transactions: Iterable[Dict],
+        extra_columns: Sequence[str] = ()
+    ) -> "TransactionTable":
+        """
+        Build a table in a single pass over transaction dictionaries.
+        
+        Args:
+            transactions: List or iterator of transaction dictionaries
+            extra_columns: Additional fields to keep, such as budget tags
+        
+        Returns:
+            TransactionTable holding the transactions in input order
+        """
+        known = {"amount", "date", *OBJECT_COLUMNS}
+        for id_field, name_field in ENCODED_COLUMNS.values():
+            known.update((id_field, name_field))
+        object_columns = OBJECT_COLUMNS + [c for c in extra_columns if c not in known]
+        dictionaries = {name: _Dictionary() for name in ENCODED_COLUMNS}
+        encoders = [
+            (dictionaries[name].encode, id_field, name_field, [])
+            for name, (id_field, name_field) in ENCODED_COLUMNS.items()
+        ]
+        amounts, dates = [], []
+        objects: Dict[str, list] = {c: [] for c in object_columns}
+        object_lists = list(objects.items())
+        
+        for t in transactions:
+            amounts.append(t["amount"])
+            dates.append(t["date"])
+            for encode, id_field, name_field, codes in encoders:
+                codes.append(encode(t.get(id_field), t.get(name_field)))
+            for column, values in object_lists:
+                values.append(t.get(column))
+        
+        return cls(
+            amount=np.array(amounts, dtype=np.int64),
+            day=np.array(dates, dtype="datetime64[D]").astype(np.int32),
+            codes={
+                name: np.array(codes, dtype=np.int32)
+                for name, (_, _, _, codes) in zip(ENCODED_COLUMNS, encoders)
+            },
+            dictionaries=dictionaries,
+            objects={c: np.array(values, dtype=object) for c, values in objects.items()}
+        )
+    
+    def __len__(self) -> int:
+        return len(self.amount)
+    
+    @property
+    def empty(self) -> bool:
+        return len(self.amount) == 0
+    
+    def take(self, index: np.ndarray) -> "TransactionTable":
+        """Select rows by a boolean mask or an array of positions."""
+        return TransactionTable(
+            amount=self.amount[index],
+            day=self.day[index],
+            codes={name: codes[index] for name, codes in self.codes.items()},
+            dictionaries=self.dictionaries,
+            objects={c: values[index] for c, values in self.objects.items()}
+        )
+    
+    def filter(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        category_id: Optional[str] = None,
+        account_id: Optional[Union[str, List[str]]] = None
+    ) -> "TransactionTable":
+        """
+        Select transactions by date range, category and account.
+        
+        Args:
+            start_date: First day to include
+            end_date: Last day to include
+            category_id: Optional category ID to filter by
+            account_id: Optional account ID, or list of account IDs, to filter by
+        
+        Returns:
+            TransactionTable with the matching rows
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if start_date:
+            mask &= self.day >= day_number(start_date)
+        if end_date:
+            mask &= self.day <= day_number(end_date)
+        if category_id:
+            mask &= self.codes["category"] == self.dictionaries["category"].codes.get(category_id, -1)
+        if account_id:
+            account_ids = [account_id] if isinstance(account_id, str) else account_id
+            account_codes = [self.dictionaries["account"].codes.get(a, -1) for a in account_ids]
+            mask &= np.isin(self.codes["account"], account_codes)
+        return self.take(mask)
+    
+    def sort(self, descending: bool = False) -> "TransactionTable":
+        """Order transactions by date, keeping input order within a day."""
+        order = np.argsort(-self.day if descending else self.day, kind="stable")
+        return self.take(order)
+    
+    def head(self, n: int) -> "TransactionTable":
+        return self.take(slice(0, n))
+    
+    def total(self) -> int:
+        """Sum of amounts in milliunits."""
+        return int(self.amount.sum())
+    
+    def mean(self) -> float:
+        """Average amount in milliunits."""
+        return self.total() / len(self) if len(self) else 0
+    
+    def group_by(self, key: str) -> List[Dict]:
+        """
+        Total and count transactions per account, category, payee or day.
+        
+        Args:
+            key: "account", "category", "payee" or "date"
+        
+        Returns:
+            One dictionary per group with the group's id and name (or date),
+            amount in milliunits and count, in code or date order
+        """
+        if key == "date":
+            groups, inverse = np.unique(self.day, return_inverse=True)
+            labels = {"date": groups.astype("datetime64[D]").astype(str).astype(object)}
+        else:
+            inverse = self.codes[key]
+            dictionary = self.dictionaries[key]
+            id_field, name_field = ENCODED_COLUMNS[key]
+            groups = np.unique(inverse)
+            labels = {
+                id_field: np.array(dictionary.ids, dtype=object)[groups],
+                name_field: np.array(dictionary.names, dtype=object)[groups]
+            }
+            inverse = np.searchsorted(groups, inverse)
+        
+        totals = np.zeros(len(groups), dtype=np.int64)
+        np.add.at(totals, inverse, self.amount)
+        counts = np.bincount(inverse, minlength=len(groups))
+        return [
+            dict({field: values[i] for field, values in labels.items()},
+                 amount=int(totals[i]), count=int(counts[i]))
+            for i in range(len(groups))
+        ]
+    
+    def column(self, name: str) -> np.ndarray:
+        """Get one column decoded to the values of a transaction dictionary."""
+        if name == "amount":
+            return self.amount
+        if name == "date":
+            return self.day.astype("datetime64[D]").astype(str).astype(object)
+        if name in self.objects:
+            return self.objects[name]
+        for key, (id_field, name_field) in ENCODED_COLUMNS.items():
+            if name in (id_field, name_field):
+                return self.dictionaries[key].decode(
+                    self.codes[key], "id" if name == id_field else "name"
+                )
+        raise KeyError(name)
+    
+    def to_dataframe(self, columns: Optional[Sequence[str]] = None) -> "pd.DataFrame":
+        """Decode the table into a DataFrame with amounts still in milliunits."""
+        # pandas is imported on first use; it is slow to import and most
+        # table users never need a DataFrame
+        import pandas as pd
+        columns = columns or self.columns
+        return pd.DataFrame({c: self.column(c) for c in columns}, columns=list(columns))
+    
+    @property
+    def columns(self) -> List[str]:
+        fields = ["id", "date", "amount"]
+        for id_field, name_field in ENCODED_COLUMNS.values():
+            fields += [id_field, name_field]
+        return fields + [c for c in self.objects if c not in fields]
+    
+    def records(self, columns: Optional[Sequence[str]] = None) -> Iterator[Dict]:
+        """Iterate over the rows as transaction dictionaries."""
+        columns = list(columns or self.columns)
+        values = [self.column(c).tolist() for c in columns]
+        for row in zip(*values):
+            yield dict(zip(columns, row))
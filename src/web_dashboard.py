@@ -1,43 +1,206 @@
-from flask import Flask, render_template, jsonify, request
+import base64
+import os
+import queue
+import threading
+from flask import Blueprint, Flask, render_template, jsonify, request, Response
+from werkzeug.local import LocalProxy
 from datetime import datetime, timedelta
-import pandas as pd
-import plotly.express as px
-import plotly.utils
 import json
+import requests
 from ynab_client import YNABClient
+from multi_budget import MultiBudgetClient, configured_budget_ids
+from rate_limiter import RateLimitExceeded
+from cache import TTLCache
+from change_feed import ChangeFeed
+from cache_warmer import CacheWarmer
+import fast_json
+from transaction import to_currency
 
-app = Flask(__name__)
-client = YNABClient()
-CNY_BUDGET_ID = "639270bb-7e47-4a46-b622-8308ce02b3d8"
+dashboard = Blueprint("dashboard", __name__)
 
-def get_transactions_data(start_date, end_date, account_id=None):
-    """Get and process transactions data."""
-    transactions = client.get_red_flag_transactions(
-        start_date=start_date,
-        end_date=end_date,
-        account_id=account_id
-    )
+# Clients and workers are created on first use, so importing this module or
+# creating the app makes no YNAB request
+_services = {}
+_services_lock = threading.RLock()
+
+def _service(name, factory):
+    """Get a process-wide service, creating it on first use."""
+    service = _services.get(name)
+    if service is None:
+        with _services_lock:
+            service = _services.get(name)
+            if service is None:
+                service = _services[name] = factory()
+    return service
+
+def get_client():
+    return _service("client", YNABClient)
+
+def get_multi_client():
+    def create():
+        budget_ids = configured_budget_ids() or [get_client().budget_id]
+        return MultiBudgetClient(budget_ids, store=get_client().store, session=get_client().session)
+    return _service("multi_client", create)
+
+client = LocalProxy(get_client)
+multi_client = LocalProxy(get_multi_client)
+
+# One background poller shared by every open dashboard
+change_feed = LocalProxy(lambda: _service("change_feed", lambda: ChangeFeed(get_client())))
+
+# Keeps the default 30-day view, accounts and categories fresh between requests
+cache_warmer = LocalProxy(lambda: _service("cache_warmer", lambda: CacheWarmer(client)))
+
+# Encoded charts by data version; the data behind a version never changes
+chart_cache = TTLCache(maxsize=256, ttl=3600)
+
+def create_app(warm_cache=None):
+    """
+    Create the dashboard app.
+    
+    Serve it with a multi-process server for production, for example
+    gunicorn --workers 4 --worker-class gevent "web_dashboard:create_app()".
+    Use an async worker class: each open /api/stream connection holds its
+    worker for as long as the tab is open, which starves sync workers and
+    fixed thread pools. Workers share the SQLite store (YNAB_STORE_PATH),
+    so data synced by one is served by all, and store leases keep them from
+    syncing, warming or polling the same budget at once.
+    
+    Args:
+        warm_cache: Start the background cache warmer; defaults to the
+            YNAB_WARM_CACHE environment variable, on unless set to 0
+    """
+    app = Flask(__name__)
+    app.register_blueprint(dashboard)
+    if warm_cache is None:
+        warm_cache = os.getenv("YNAB_WARM_CACHE", "1") != "0"
+    if warm_cache:
+        # The warmer thread creates the client, so the app can serve at once
+        cache_warmer.start()
+    return app
+
+def encode_cursor(cursor):
+    """Encode a (date, id) page cursor as an opaque URL-safe string."""
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode("|".join(cursor).encode()).decode()
+
+def decode_cursor(value):
+    """Decode a page cursor from encode_cursor; raises ValueError if malformed."""
+    try:
+        date, _, transaction_id = base64.urlsafe_b64decode(value.encode()).decode().partition("|")
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if not transaction_id:
+        raise ValueError("Invalid cursor")
+    return date, transaction_id
+
+def summarize_stats(stats):
+    """Summary card values, in CNY, from get_red_flag_summary totals."""
+    total = to_currency(stats["total_milliunits"])
+    return {
+        "total_amount": total,
+        "avg_amount": total / stats["count"] if stats["count"] else 0,
+        "transaction_count": stats["count"]
+    }
+
+def format_transaction(t):
+    """Transaction for display in the dashboard table."""
+    record = t.to_dict()
+    record["amount"] = f"¥{to_currency(t['amount']):,.2f}"
+    return record
+
+def rate_limited_response(error):
+    """Build the response sent when YNAB quota is exhausted and nothing is stored."""
+    response = jsonify({"error": str(error)})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(int(error.retry_after) + 1)
+    return response
+
+def json_response(payload, raw=None):
+    """
+    Encode a JSON response with the fast encoder, compressed per Accept-Encoding.
     
-    if not transactions:
-        return pd.DataFrame()
+    Members in raw are already-encoded JSON values, such as cached charts,
+    and are included without encoding them again.
+    """
+    body = fast_json.dumps_with_raw(payload, raw)
+    response = Response(body, mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    encoding = fast_json.negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding and len(body) >= fast_json.MIN_COMPRESS_SIZE:
+        response.set_data(fast_json.compress(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+def etag_for(version):
+    """ETag of a data version in the content coding negotiated for this request."""
+    encoding = fast_json.negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+    return f"{version}-{encoding}" if encoding else version
+
+def not_modified(version):
+    """
+    Check If-None-Match against a data version while the store is fresh.
+    
+    A match is answered without syncing or computing anything; once the
+    store is due for a sync the request goes through, and the response is
+    still a 304 if the sync brought no changes.
+    """
+    return (
+        version is not None
+        and etag_for(version) in request.if_none_match
+        and client.is_store_fresh()
+    )
+
+def not_modified_response(version):
+    response = Response(status=304)
+    response.set_etag(etag_for(version))
+    response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+def conditional_response(response, version):
+    """Tag a response with its data version so browsers can revalidate their copy."""
+    if version is None:
+        return response
+    response.set_etag(etag_for(version))
+    # Browsers keep the response but revalidate before each reuse
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
+def category_chart_data(category_totals):
+    """Compact category chart series: category names and amounts in CNY."""
+    if not category_totals:
+        return None
     
-    df = pd.DataFrame(transactions)
-    df["amount"] = df["amount"].astype(float) / 1000  # Convert to CNY
-    df["date"] = pd.to_datetime(df["date"])
-    return df
+    category_stats = sorted(category_totals, key=lambda g: g["amount"], reverse=True)
+    return {
+        "labels": [g["category_name"] for g in category_stats],
+        "values": [to_currency(g["amount"]) for g in category_stats]
+    }
 
-def create_category_chart(df):
-    """Create category breakdown chart."""
-    if df.empty:
+def trend_chart_data(daily_stats):
+    """Compact trend chart series: dates and daily amounts in CNY."""
+    if not daily_stats:
         return None
     
-    category_stats = df.groupby("category_name")["amount"].sum().reset_index()
-    category_stats = category_stats.sort_values("amount", ascending=False)
+    return {
+        "dates": [g["date"] for g in daily_stats],
+        "values": [to_currency(g["amount"]) for g in daily_stats]
+    }
+
+def create_category_chart(category_totals):
+    """Create category breakdown chart from per-category totals."""
+    data = category_chart_data(category_totals)
+    if data is None:
+        return None
     
+    # plotly is only needed for charts=figure
+    import plotly.express as px
+    import plotly.utils
     fig = px.pie(
-        category_stats,
-        values="amount",
-        names="category_name",
+        values=data["values"],
+        names=data["labels"],
         title="Red Flag Transactions by Category",
         color_discrete_sequence=px.colors.qualitative.Set3
     )
@@ -45,18 +208,17 @@ def create_category_chart(df):
     fig.update_traces(textposition="inside", textinfo="percent+label")
     return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
 
-def create_trend_chart(df):
-    """Create daily trend chart."""
-    if df.empty:
+def create_trend_chart(daily_stats):
+    """Create daily trend chart from per-day totals."""
+    data = trend_chart_data(daily_stats)
+    if data is None:
         return None
     
-    daily_stats = df.groupby(df["date"].dt.date)["amount"].sum().reset_index()
-    daily_stats["date"] = pd.to_datetime(daily_stats["date"])
-    
+    import plotly.express as px
+    import plotly.utils
     fig = px.line(
-        daily_stats,
-        x="date",
-        y="amount",
+        x=data["dates"],
+        y=data["values"],
         title="Daily Red Flag Transaction Amounts",
         labels={"amount": "Amount (CNY)", "date": "Date"}
     )
@@ -69,15 +231,41 @@ def create_trend_chart(df):
     
     return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
 
-@app.route("/")
+def get_charts(stats, version, chart_format):
+    """
+    Build the encoded category and trend charts, reusing those built for the same data version.
+    
+    chart_format "data" returns the compact series for the page to plot with
+    its own figure spec; "figure" returns full Plotly figure JSON as a string.
+    Both are returned as encoded JSON values for json_response.
+    """
+    cache_key = (version, chart_format)
+    charts = chart_cache.get(cache_key) if version else None
+    if charts is None:
+        if chart_format == "data":
+            charts = (category_chart_data(stats["categories"]), trend_chart_data(stats["daily"]))
+        else:
+            charts = (create_category_chart(stats["categories"]), create_trend_chart(stats["daily"]))
+        charts = tuple(fast_json.dumps(chart) for chart in charts)
+        if version:
+            chart_cache.set(cache_key, charts)
+    return charts
+
+@dashboard.route("/")
 def index():
     """Render the main dashboard page."""
     # Get default date range (last 30 days)
     end_date = datetime.now()
     start_date = end_date - timedelta(days=30)
     
-    # Get accounts for the dropdown
-    accounts = client.get_accounts()
+    # Only the accounts dropdown is needed here; the page loads its data
+    # from /api/data, and the cache warmer keeps the default range fresh
+    try:
+        accounts = client.get_accounts()
+    except (RateLimitExceeded, requests.exceptions.RequestException) as e:
+        # Render without the dropdown rather than failing the page
+        print(f"Error fetching accounts: {str(e)}")
+        accounts = []
     cny_accounts = [acc for acc in accounts if acc["on_budget"]]
     
     return render_template(
@@ -87,17 +275,34 @@ def index():
         accounts=cny_accounts
     )
 
-@app.route("/api/data")
+@dashboard.route("/api/data")
 def get_data():
     """API endpoint to get dashboard data."""
     start_date = datetime.strptime(request.args.get("start_date"), "%Y-%m-%d")
     end_date = datetime.strptime(request.args.get("end_date"), "%Y-%m-%d")
-    account_id = request.args.get("account_id")
+    # Several account_id parameters are fetched from their accounts in parallel
+    account_ids = [a for a in request.args.getlist("account_id") if a]
+    chart_format = "data" if request.args.get("charts") == "data" else "figure"
     
-    df = get_transactions_data(start_date, end_date, account_id)
+    version = client.data_version(start_date, end_date, account_id=account_ids)
+    if version:
+        version += "-" + chart_format
+    if not_modified(version):
+        return not_modified_response(version)
     
-    if df.empty:
-        return jsonify({
+    try:
+        # Totals and charts come from the daily rollups
+        stats = client.get_red_flag_summary(start_date, end_date, account_id=account_ids or None)
+        # Only the newest 100 are listed; see /api/transactions for the rest
+        page = client.get_red_flag_page(start_date, end_date, account_id=account_ids or None, limit=100)
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
+    
+    version = client.data_version(start_date, end_date, account_id=account_ids)
+    if version:
+        version += "-" + chart_format
+    if not stats["count"]:
+        return conditional_response(json_response({
             "summary": {
                 "total_amount": 0,
                 "avg_amount": 0,
@@ -105,34 +310,120 @@ def get_data():
             },
             "transactions": [],
             "category_chart": None,
-            "trend_chart": None
-        })
+            "trend_chart": None,
+            "stale": client.last_sync_error is not None
+        }), version)
     
     # Calculate summary statistics
-    summary = {
-        "total_amount": df["amount"].sum(),
-        "avg_amount": df["amount"].mean(),
-        "transaction_count": len(df)
-    }
+    summary = summarize_stats(stats)
     
     # Prepare transactions data
-    transactions = df.sort_values("date", ascending=False).head(100).to_dict("records")
-    for t in transactions:
-        t["date"] = t["date"].strftime("%Y-%m-%d")
-        t["amount"] = f"¥{t['amount']:,.2f}"
+    transactions = [format_transaction(t) for t in page["transactions"]]
     
     # Create charts
-    category_chart = create_category_chart(df)
-    trend_chart = create_trend_chart(df)
+    category_chart, trend_chart = get_charts(stats, version, chart_format)
     
-    return jsonify({
+    return conditional_response(json_response({
         "summary": summary,
         "transactions": transactions,
+        "stale": client.last_sync_error is not None
+    }, raw={
         "category_chart": category_chart,
         "trend_chart": trend_chart
-    })
+    }), version)
+
+@dashboard.route("/api/transactions")
+def get_transactions():
+    """
+    API endpoint listing red-flagged transactions newest first, one page at a time.
+    
+    Pass the returned next_cursor as cursor to get the following page.
+    Amounts are in milliunits.
+    """
+    try:
+        start_date = datetime.strptime(request.args.get("start_date", ""), "%Y-%m-%d")
+        end_date = datetime.strptime(request.args.get("end_date", ""), "%Y-%m-%d")
+    except ValueError:
+        return jsonify({"error": "start_date and end_date are required as YYYY-MM-DD."}), 400
+    account_ids = [a for a in request.args.getlist("account_id") if a]
+    category_id = request.args.get("category_id") or None
+    try:
+        limit = min(max(int(request.args.get("limit", 100)), 1), 1000)
+        after = decode_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    version = client.data_version(start_date, end_date, category_id, account_ids)
+    if version:
+        version += f"-{limit}-{request.args.get('cursor', '')}"
+    if not_modified(version):
+        return not_modified_response(version)
+    try:
+        page = client.get_red_flag_page(
+            start_date,
+            end_date,
+            category_id=category_id,
+            account_id=account_ids or None,
+            after=after,
+            limit=limit
+        )
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
+    
+    version = client.data_version(start_date, end_date, category_id, account_ids)
+    if version:
+        version += f"-{limit}-{request.args.get('cursor', '')}"
+    return conditional_response(json_response({
+        "transactions": [t.to_dict() for t in page["transactions"]],
+        "next_cursor": encode_cursor(page["next_cursor"]),
+        "stale": client.last_sync_error is not None
+    }), version)
 
-@app.route('/api/red-flag-amount', methods=['GET'])
+@dashboard.route("/api/stream")
+def stream_changes():
+    """
+    Server-Sent Events stream of red-flag changes for the dashboard filters.
+    
+    Each "changes" event carries the new or changed transactions within the
+    filters, ids of transactions no longer red-flagged, and the updated
+    summary and chart series.
+    """
+    try:
+        start_date = datetime.strptime(request.args.get("start_date", ""), "%Y-%m-%d")
+        end_date = datetime.strptime(request.args.get("end_date", ""), "%Y-%m-%d")
+    except ValueError:
+        return jsonify({"error": "start_date and end_date are required as YYYY-MM-DD."}), 400
+    account_ids = [a for a in request.args.getlist("account_id") if a]
+    subscription = change_feed.subscribe(start_date, end_date, account_ids)
+    
+    def events():
+        try:
+            yield "retry: 10000\n\n"
+            while True:
+                try:
+                    event = subscription.events.get(timeout=15)
+                except queue.Empty:
+                    # Keep proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                payload = fast_json.dumps({
+                    "summary": summarize_stats(event["summary"]),
+                    "changed": [format_transaction(t) for t in event["changed"]],
+                    "removed": event["removed"],
+                    "category_chart": category_chart_data(event["summary"]["categories"]),
+                    "trend_chart": trend_chart_data(event["summary"]["daily"]),
+                    "resync": event["resync"]
+                })
+                yield f"event: changes\ndata: {payload.decode()}\n\n"
+        finally:
+            change_feed.unsubscribe(subscription)
+    
+    response = Response(events(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@dashboard.route('/api/red-flag-amount', methods=['GET'])
 def get_red_flag_amount():
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date')
@@ -143,9 +434,38 @@ def get_red_flag_amount():
         end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
     except ValueError:
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
-    transactions = client.get_red_flag_transactions(start_date=start_date, end_date=end_date)
-    total_amount = sum(float(t["amount"]) / 1000 for t in transactions)
-    return jsonify({"total_amount": total_amount, "count": len(transactions)})
+    version = client.data_version(start_date, end_date)
+    if not_modified(version):
+        return not_modified_response(version)
+    try:
+        stats = client.get_red_flag_summary(start_date=start_date, end_date=end_date)
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
+    # Exact milliunits are converted once for display
+    return conditional_response(json_response({
+        "total_amount": to_currency(stats["total_milliunits"]),
+        "total_milliunits": stats["total_milliunits"],
+        "count": stats["count"]
+    }), client.data_version(start_date, end_date))
+
+@dashboard.route("/api/budgets/red-flag-amount", methods=["GET"])
+def get_budgets_red_flag_amount():
+    """API endpoint with red-flag totals for every configured budget."""
+    start_date_str = request.args.get("start_date")
+    end_date_str = request.args.get("end_date")
+    if not start_date_str or not end_date_str:
+        return jsonify({"error": "start_date and end_date are required"}), 400
+    try:
+        start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
+        end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    try:
+        transactions = multi_client.get_red_flag_transactions(start_date=start_date, end_date=end_date)
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
+    return json_response({"budgets": multi_client.summarize(transactions), "count": len(transactions)})
 
 if __name__ == "__main__":
-    app.run(debug=True) 
\ No newline at end of file
+    # Development server; see create_app for production serving
+    create_app().run(debug=os.getenv("FLASK_DEBUG") == "1") 
\ No newline at end of file
@@ -1,27 +1,130 @@
+import hashlib
+import heapq
+import itertools
 import os
-from typing import Dict, List, Optional
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 import time
+from transaction_store import TransactionStore
+from json_stream import JSONArrayStream
+from cache import SingleFlight, TTLCache, TransactionCache
+from transaction import Transaction
+from rate_limiter import (
+    BACKGROUND,
+    INTERACTIVE,
+    RateLimiter,
+    RateLimitExceeded,
+    backoff_delay,
+    get_rate_limiter
+)
+
+DEFAULT_STORE_PATH = os.path.join("data", "ynab_store.sqlite3")
+
+# Transactions parsed from a sync response per store write; the store is
+# only locked while a batch is merged, not while the body downloads
+MERGE_BATCH_ROWS = 500
+
+# Priority of the calls made in the current thread or task
+_request_priority = ContextVar("ynab_request_priority", default=INTERACTIVE)
+
+# Set while the current thread holds the sync lock, lease and flight
+_holding_sync = ContextVar("ynab_holding_sync", default=False)
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    """
+    Create a keep-alive HTTP session with a connection pool sized for concurrent use.
+    
+    Args:
+        pool_size: Maximum number of connections kept open per host
+        
+    Returns:
+        Configured requests session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive"
+    })
+    return session
 
 class YNABClient:
-    def __init__(self, budget_id: Optional[str] = None):
+    def __init__(
+        self,
+        budget_id: Optional[str] = None,
+        incremental: bool = True,
+        store: Optional[TransactionStore] = None,
+        session: Optional[requests.Session] = None,
+        pool_size: int = 10,
+        timeout: float = 30,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: int = 3,
+        max_wait: float = 10,
+        max_stale: Optional[float] = None
+    ):
         load_dotenv()
         self.api_token = os.getenv("YNAB_API_TOKEN")
         if not self.api_token:
             raise ValueError("YNAB API token not found in environment variables")
         
         # Set up API configuration
-        self.base_url = "https://api.ynab.com/v1"
+        self.base_url = os.getenv("YNAB_API_URL", "https://api.ynab.com/v1")
         self.headers = {
             "Authorization": f"Bearer {self.api_token}",
             "Content-Type": "application/json"
         }
         
-        # Cache for storing data
-        self._cache = {}
+        # Shared connection pool so calls reuse warm TCP/TLS connections
+        self.session = session or create_session(pool_size)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.request_timings = deque(maxlen=500)
+        
+        # Request quota shared by every client using the same token
+        self.rate_limiter = rate_limiter or get_rate_limiter(self.api_token)
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.last_sync_error: Optional[str] = None
+        
+        # Bounded caches for storing data
         self._cache_timeout = 300  # 5 minutes
+        self._cache = TTLCache(maxsize=32, ttl=self._cache_timeout)
+        # Web workers sharing a store can keep this small, as the store is fast
+        self._transaction_cache = TransactionCache(
+            maxsize=int(os.getenv("YNAB_TRANSACTION_CACHE_ROWS", "50000")),
+            ttl=self._cache_timeout
+        )
+        
+        # Stored data this far past the cache timeout is still served at once
+        # while a background refresh runs
+        self.max_stale = (
+            float(os.getenv("YNAB_MAX_STALE", "3600")) if max_stale is None else max_stale
+        )
+        self._revalidating = set()
+        self._revalidate_lock = threading.Lock()
+        self._revalidate_executor: Optional[ThreadPoolExecutor] = None
+        
+        # Concurrent identical fetches share one upstream request, and syncs
+        # of the store run one at a time
+        self._flights = SingleFlight()
+        self._sync_lock = threading.Lock()
+        
+        # Persistent local copy of the budget, kept current by delta sync
+        self.incremental = incremental
+        self.store = store or TransactionStore(
+            os.getenv("YNAB_STORE_PATH", DEFAULT_STORE_PATH)
+        )
         
         # Budget selection logic
         self.budget_id = (
@@ -31,27 +134,202 @@ class YNABClient:
         if not self.budget_id:
             self.budget_id = self._get_first_budget_id()
     
+    @contextmanager
+    def background(self):
+        """Mark calls made by the current thread or task as background refreshes."""
+        token = _request_priority.set(BACKGROUND)
+        try:
+            yield
+        finally:
+            _request_priority.reset(token)
+    
+    def _revalidate(self, key: str, refresh: Callable[[], object]) -> None:
+        """Run refresh in the background unless a refresh of key is already running."""
+        with self._revalidate_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+            if self._revalidate_executor is None:
+                self._revalidate_executor = ThreadPoolExecutor(
+                    max_workers=2, thread_name_prefix="ynab-revalidate"
+                )
+        
+        def run():
+            try:
+                with self.background():
+                    refresh()
+            except (requests.exceptions.RequestException, RateLimitExceeded) as e:
+                print(f"Background refresh of {key} failed: {str(e)}")
+            finally:
+                with self._revalidate_lock:
+                    self._revalidating.discard(key)
+        
+        self._revalidate_executor.submit(run)
+    
+    def _within_stale_limit(self, resource: str) -> bool:
+        """Check whether a stored resource may still be served while it refreshes."""
+        return self.store.is_fresh(self.budget_id, resource, self._cache_timeout + self.max_stale)
+    
+    def _get(
+        self,
+        path: str,
+        params: Optional[Dict] = None,
+        stream: bool = False
+    ) -> requests.Response:
+        """
+        Send a GET request through the pooled session within the rate limit.
+        
+        Rate-limited (429) and server error (5xx) responses as well as
+        connection failures are retried with jittered exponential backoff.
+        Interactive calls give up once waiting would exceed max_wait, while
+        background calls wait for quota as long as needed, except during a
+        sync, which waits for quota before it starts. With stream=True
+        the body is left unread for the caller to consume incrementally.
+        
+        Raises:
+            RateLimitExceeded: If the quota is exhausted for this call
+            requests.exceptions.RequestException: If the request ultimately fails
+        """
+        priority = _request_priority.get()
+        # Background calls wait for quota indefinitely, except while holding
+        # the sync lock that interactive syncs need
+        max_wait = None if priority == BACKGROUND and not _holding_sync.get() else self.max_wait
+        
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(priority, max_wait)
+            start = time.perf_counter()
+            try:
+                response = self.session.get(
+                    f"{self.base_url}{path}",
+                    headers=self.headers,
+                    params=params,
+                    timeout=self.timeout,
+                    stream=stream
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                continue
+            
+            if not (stream and response.ok):
+                # Streamed bodies are recorded once they have been read
+                self._record_timing(path, response, time.perf_counter() - start, len(response.content))
+            self.rate_limiter.update_from_header(response.headers.get("X-Rate-Limit"))
+            
+            if response.status_code == 429:
+                retry_after = float(response.headers.get("Retry-After") or backoff_delay(attempt))
+                if attempt == self.max_retries:
+                    raise RateLimitExceeded(retry_after=retry_after)
+                # The next acquire waits (or gives up) until the quota returns
+                self.rate_limiter.exhaust(retry_after)
+                response.close()
+                continue
+            if response.status_code >= 500 and attempt < self.max_retries:
+                response.close()
+                time.sleep(backoff_delay(attempt))
+                continue
+            break
+        
+        response.raise_for_status()
+        return response
+    
+    def _record_timing(
+        self,
+        path: str,
+        response: requests.Response,
+        seconds: float,
+        body_bytes: int,
+        wire_bytes: Optional[int] = None
+    ) -> None:
+        if wire_bytes is None:
+            wire_bytes = int(response.headers.get("Content-Length", 0))
+        self.request_timings.append({
+            "path": path,
+            "status": response.status_code,
+            "seconds": seconds,
+            "bytes": body_bytes,
+            "wire_bytes": wire_bytes
+        })
+    
+    def _get_json(self, path: str, params: Optional[Dict] = None) -> Dict:
+        """
+        GET and decode a JSON response, sharing it with identical concurrent calls.
+        
+        Threads asking for the same path and parameters while a request is in
+        flight wait for that request instead of sending their own.
+        """
+        key = (path, tuple(sorted((params or {}).items())))
+        return self._flights.do(key, lambda: self._get(path, params).json())
+    
+    def _stream_transactions(self, path: str, params: Optional[Dict] = None) -> JSONArrayStream:
+        """Stream the transactions array of a response without loading the whole body."""
+        response = self._get(path, params, stream=True)
+        start = time.perf_counter() - response.elapsed.total_seconds()
+        
+        def chunks() -> Iterator[bytes]:
+            body_bytes = 0
+            try:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    body_bytes += len(chunk)
+                    yield chunk
+            finally:
+                # Chunked and compressed bodies have no usable Content-Length,
+                # so sizes and duration are taken once the body has been read
+                self._record_timing(
+                    path, response, time.perf_counter() - start, body_bytes, response.raw.tell()
+                )
+        
+        return JSONArrayStream(chunks(), "transactions")
+    
+    def get_cache_stats(self) -> Dict:
+        """Report hit/miss statistics for the metadata and transaction caches."""
+        return {
+            "metadata": self._cache.stats(),
+            "transactions": self._transaction_cache.stats()
+        }
+    
+    def get_request_stats(self) -> Dict:
+        """Summarize recorded request timings."""
+        timings = list(self.request_timings)
+        if not timings:
+            return {"count": 0, "avg_seconds": 0, "max_seconds": 0, "total_bytes": 0, "wire_bytes": 0, "coalesced": 0}
+        seconds = [t["seconds"] for t in timings]
+        return {
+            "count": len(timings),
+            "avg_seconds": sum(seconds) / len(seconds),
+            "max_seconds": max(seconds),
+            "total_bytes": sum(t["bytes"] for t in timings),
+            "wire_bytes": sum(t["wire_bytes"] for t in timings),
+            "coalesced": self._flights.shared
+        }
+    
     def _get_first_budget_id(self) -> str:
-        """Get the first budget ID with caching."""
+        """
+        Get the first budget ID, resolved once per API token and kept in the store.
+        
+        Later processes using the same token and store start without a
+        /budgets request.
+        """
         cache_key = "budget_id"
-        if cache_key in self._cache:
-            cache_time, budget_id = self._cache[cache_key]
-            if time.time() - cache_time < self._cache_timeout:
-                return budget_id
+        budget_id = self._cache.get(cache_key)
+        if budget_id is not None:
+            return budget_id
+        # Keyed by a token hash so another account never reuses the budget
+        state_key = "default_budget_id:" + hashlib.sha1(self.api_token.encode()).hexdigest()[:16]
+        budget_id = self.store.get_state("", state_key)
+        if budget_id:
+            self._cache.set(cache_key, budget_id)
+            return budget_id
         
         try:
-            response = requests.get(
-                f"{self.base_url}/budgets",
-                headers=self.headers
-            )
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self._get_json("/budgets")
             if not data["data"]["budgets"]:
                 raise ValueError("No budgets found in your YNAB account")
             
             budget_id = data["data"]["budgets"][0]["id"]
-            self._cache[cache_key] = (time.time(), budget_id)
+            self._cache.set(cache_key, budget_id)
+            self.store.set_state("", state_key, budget_id)
             return budget_id
             
         except requests.exceptions.RequestException as e:
@@ -59,14 +337,228 @@ class YNABClient:
                 raise ValueError("Invalid API token. Please check your YNAB API token in the .env file.")
             raise
     
+    @property
+    def server_knowledge(self) -> Optional[int]:
+        """The YNAB server_knowledge of the last transaction sync, if any."""
+        value = self.store.get_state(self.budget_id, "server_knowledge")
+        return int(value) if value else None
+    
+    def is_store_fresh(self) -> bool:
+        """Check whether transactions were synced within the cache timeout."""
+        return self.store.is_fresh(self.budget_id, "transactions", self._cache_timeout)
+    
+    def data_version(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_id: Optional[str] = None,
+        account_id: Optional[Union[str, List[str]]] = None
+    ) -> Optional[str]:
+        """
+        Tag identifying the data behind a query answered from the store.
+        
+        The tag combines the stored server_knowledge with the query, so it
+        changes exactly when a sync brings in changes that the query could
+        see. Checking it makes no request to YNAB.
+        
+        Returns:
+            Version string, or None when the query would bypass the store
+        """
+        account_ids = [account_id] if isinstance(account_id, str) else sorted(account_id or [])
+        knowledge = self.server_knowledge
+        if knowledge is None or self.plan_transaction_query(start_date, category_id, account_ids):
+            return None
+        key = "|".join([
+            self.budget_id,
+            str(knowledge),
+            start_date.strftime("%Y-%m-%d") if start_date else "",
+            end_date.strftime("%Y-%m-%d") if end_date else "",
+            category_id or "",
+            ",".join(account_ids),
+            "stale" if self.last_sync_error else ""
+        ])
+        return hashlib.sha1(key.encode()).hexdigest()[:20]
+    
+    def _sync_covers(self, since_date: Optional[datetime]) -> bool:
+        """Check whether the local copy already spans transactions since since_date."""
+        if self.server_knowledge is None:
+            return False
+        sync_since = self.store.get_state(self.budget_id, "since_date")
+        if not sync_since:
+            return True
+        return since_date is not None and since_date.strftime("%Y-%m-%d") >= sync_since
+    
+    def sync_transactions(
+        self,
+        since_date: Optional[datetime] = None,
+        changes: Optional[Dict[str, List]] = None
+    ) -> int:
+        """
+        Bring the local transaction copy up to date using YNAB delta requests.
+        
+        The first call (or a call reaching further back than the local copy)
+        downloads every transaction since since_date. Later calls send the
+        stored server_knowledge as last_knowledge_of_server so YNAB only returns
+        transactions that changed since the previous sync.
+        
+        Args:
+            since_date: Earliest transaction date the local copy must include
+            changes: Optional dictionary collecting red-flag changes, as in
+                TransactionStore.merge_transactions
+            
+        Returns:
+            Number of transactions added, updated or deleted by this sync
+        """
+        def sync() -> int:
+            with self._sync_lock:
+                waited = self._acquire_sync_lease()
+                token = _holding_sync.set(True)
+                try:
+                    if waited and changes is None and self.is_store_fresh() and self._sync_covers(since_date):
+                        # Another process using the store has just synced it
+                        return 0
+                    return self._sync_transactions(since_date, changes)
+                finally:
+                    _holding_sync.reset(token)
+                    self.store.release_lease(self.budget_id, "sync")
+        
+        priority = _request_priority.get()
+        if priority == BACKGROUND:
+            # Wait for quota before taking the lock, lease or flight, so
+            # interactive syncs never queue behind a background quota wait
+            self.rate_limiter.wait_available(BACKGROUND)
+        if changes is not None:
+            # Changes are collected for this caller alone
+            return sync()
+        # Concurrent syncs of the same range and priority share one download;
+        # interactive callers never wait on a background sync's quota floor
+        since_day = since_date.strftime("%Y-%m-%d") if since_date else None
+        return self._flights.do(("sync", since_day, priority), sync)
+    
+    def _acquire_sync_lease(self) -> bool:
+        """
+        Hold the store's sync lease, waiting while another process syncs.
+        
+        Web workers sharing a store file thereby sync a budget one at a time,
+        and a worker that waited usually finds the store already fresh.
+        
+        Returns:
+            True if another process held the lease first
+        """
+        ttl = self._sync_lease_ttl()
+        deadline = time.monotonic() + ttl
+        waited = False
+        while not self.store.acquire_lease(self.budget_id, "sync", ttl):
+            waited = True
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.1)
+        return waited
+    
+    def _sync_lease_ttl(self) -> float:
+        # Long enough for one request with its retries; a long sync renews
+        # the lease after every merged batch instead
+        return self.timeout * (self.max_retries + 1)
+    
+    def _sync_transactions(
+        self,
+        since_date: Optional[datetime],
+        changes: Optional[Dict[str, List]]
+    ) -> int:
+        params = {}
+        full_sync = not self._sync_covers(since_date)
+        if full_sync:
+            if since_date:
+                params["since_date"] = since_date.strftime("%Y-%m-%d")
+        else:
+            params["last_knowledge_of_server"] = self.server_knowledge
+        
+        transactions = self._stream_transactions(f"/budgets/{self.budget_id}/transactions", params)
+        # A full sync is merged over the previous copy, which stays readable
+        # (and in place, if the download fails) until it completes
+        generation = time.time_ns() if full_sync else None
+        
+        # Merge changed transactions and drop deleted ones as they stream in
+        changed = 0
+        rows = iter(transactions)
+        while True:
+            batch = list(itertools.islice(rows, MERGE_BATCH_ROWS))
+            if not batch:
+                break
+            changed += self.store.merge_transactions(self.budget_id, batch, changes, generation)
+            # Keep other processes from taking over a sync still in progress
+            self.store.acquire_lease(self.budget_id, "sync", self._sync_lease_ttl())
+        if full_sync:
+            changed += self.store.remove_stale_transactions(self.budget_id, generation)
+            self.store.set_state(
+                self.budget_id,
+                "since_date",
+                since_date.strftime("%Y-%m-%d") if since_date else ""
+            )
+        self.store.set_state(
+            self.budget_id, "server_knowledge", str(transactions.scalar("server_knowledge"))
+        )
+        self.store.mark_synced(self.budget_id, "transactions")
+        if changed:
+            # Cached results may predate the changes
+            self._transaction_cache.clear()
+        return changed
+    
+    def sync_red_flag_changes(self) -> Optional[Dict[str, List]]:
+        """
+        Delta-sync the stored range and report what changed among red flags.
+        
+        Returns:
+            Dictionary with "changed" Transaction records and "removed" ids, or
+            None when nothing has been synced yet
+        """
+        if self.server_knowledge is None:
+            return None
+        since = self.store.get_state(self.budget_id, "since_date")
+        changes = {"changed": [], "removed": []}
+        self.sync_transactions(
+            since_date=datetime.strptime(since, "%Y-%m-%d") if since else None,
+            changes=changes
+        )
+        return changes
+    
+    def _refresh_store(self, start_date: Optional[datetime], use_cache: bool = True) -> None:
+        """
+        Delta-sync the store unless it is fresh and already covers start_date.
+        
+        If the sync fails but the store covers the range, the stored data is
+        kept and last_sync_error records the failure.
+        """
+        # Only changed transactions travel over the wire, and not even
+        # those while another process synced the store recently
+        store_fresh = use_cache and self.store.is_fresh(
+            self.budget_id, "transactions", self._cache_timeout
+        )
+        if store_fresh and self._sync_covers(start_date):
+            return
+        if use_cache and self._sync_covers(start_date) and self._within_stale_limit("transactions"):
+            # Serve the stored copy now and bring it up to date in the background
+            self._revalidate("transactions", lambda: self._refresh_store(start_date, use_cache=False))
+            return
+        try:
+            self.sync_transactions(since_date=start_date)
+            self.last_sync_error = None
+        except (requests.exceptions.RequestException, RateLimitExceeded) as e:
+            # Serve the last synced data rather than failing
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            if status == 401 or not self._sync_covers(start_date):
+                raise
+            self.last_sync_error = str(e)
+            print(f"Serving stored transactions, sync failed: {str(e)}")
+    
     def get_red_flag_transactions(
         self,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         category_id: Optional[str] = None,
-        account_id: Optional[str] = None,
+        account_id: Optional[Union[str, List[str]]] = None,
         use_cache: bool = True
-    ) -> List[Dict]:
+    ) -> List[Transaction]:
         """
         Retrieve red-flagged transactions with optional filtering.
         
@@ -74,142 +566,438 @@ class YNABClient:
             start_date: Start date for filtering transactions
             end_date: End date for filtering transactions
             category_id: Optional category ID to filter by
-            account_id: Optional account ID to filter by
+            account_id: Optional account ID, or list of account IDs, to filter by
             use_cache: Whether to use cached data if available
             
         Returns:
-            List of transaction dictionaries
+            List of Transaction records, readable as dictionaries
+            
+        Raises:
+            RateLimitExceeded: If the quota is exhausted and no stored data covers the range
         """
         try:
-            # Check cache if enabled
+            account_ids = [account_id] if isinstance(account_id, str) else list(account_id or [])
+            
+            # Check cache if enabled; a cached wider query also answers this one
             if use_cache:
-                cache_key = f"transactions_{start_date}_{end_date}_{category_id}_{account_id}"
-                if cache_key in self._cache:
-                    cache_time, transactions = self._cache[cache_key]
-                    if time.time() - cache_time < self._cache_timeout:
-                        return transactions
-            
-            # Build URL with parameters
-            url = f"{self.base_url}/budgets/{self.budget_id}/transactions"
-            params = {}
-            if start_date:
-                params["since_date"] = start_date.strftime("%Y-%m-%d")
-            
-            # Get transactions
-            response = requests.get(
-                url,
-                headers=self.headers,
-                params=params
-            )
-            response.raise_for_status()
+                transactions = self._transaction_cache.lookup(
+                    start_date, end_date, category_id, account_ids
+                )
+                if transactions is not None:
+                    return transactions
             
-            # Filter for red flags
-            transactions = response.json()["data"]["transactions"]
-            red_flag_transactions = [
-                t for t in transactions
-                if t.get("flag_color") == "red" or t.get("flag_color") == "red_flag"
-            ]
+            endpoints = self.plan_transaction_query(start_date, category_id, account_ids)
             
-            # Apply date filters
-            if start_date:
-                red_flag_transactions = [
-                    t for t in red_flag_transactions
-                    if datetime.strptime(t["date"], "%Y-%m-%d") >= start_date
-                ]
-            
-            if end_date:
-                red_flag_transactions = [
-                    t for t in red_flag_transactions
-                    if datetime.strptime(t["date"], "%Y-%m-%d") <= end_date
-                ]
-            
-            # Apply category filter
-            if category_id:
-                red_flag_transactions = [
-                    t for t in red_flag_transactions
-                    if t["category_id"] == category_id
-                ]
-            
-            # Apply account filter
-            if account_id:
-                red_flag_transactions = [
-                    t for t in red_flag_transactions
-                    if t["account_id"] == account_id
-                ]
+            if not endpoints:
+                self._refresh_store(start_date, use_cache)
+                
+                # Filtering happens in the store's indexes
+                red_flag_transactions = self.store.query_transactions(
+                    self.budget_id,
+                    start_date=start_date,
+                    end_date=end_date,
+                    category_id=category_id,
+                    account_id=account_ids or None
+                )
+            else:
+                transactions = self._fetch_transactions(endpoints, start_date)
+                red_flag_transactions = self._filter_red_flags(
+                    transactions, start_date, end_date, category_id, account_ids
+                )
             
-            # Update cache
-            if use_cache:
-                self._cache[cache_key] = (time.time(), red_flag_transactions)
+            # Update cache, unless the data is a stale fallback
+            if use_cache and self.last_sync_error is None:
+                self._transaction_cache.store(
+                    start_date, end_date, category_id, account_ids, red_flag_transactions
+                )
             
             return red_flag_transactions
             
         except requests.exceptions.RequestException as e:
-            if hasattr(e.response, "status_code"):
-                if e.response.status_code == 401:
-                    raise ValueError("Invalid API token. Please check your YNAB API token in the .env file.")
-                elif e.response.status_code == 429:
-                    raise ValueError("Rate limit exceeded. Please try again later.")
+            if hasattr(e.response, "status_code") and e.response.status_code == 401:
+                raise ValueError("Invalid API token. Please check your YNAB API token in the .env file.")
             print(f"Error fetching transactions: {str(e)}")
             return []
     
-    def get_categories(self, use_cache: bool = True) -> List[Dict]:
-        """Get all categories from YNAB."""
-        try:
-            # Check cache if enabled
-            if use_cache:
-                cache_key = "categories"
-                if cache_key in self._cache:
-                    cache_time, categories = self._cache[cache_key]
-                    if time.time() - cache_time < self._cache_timeout:
-                        return categories
-            
-            response = requests.get(
-                f"{self.base_url}/budgets/{self.budget_id}/categories",
-                headers=self.headers
-            )
-            response.raise_for_status()
+    def get_red_flag_summary(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_id: Optional[str] = None,
+        account_id: Optional[Union[str, List[str]]] = None
+    ) -> Dict:
+        """
+        Total red-flagged transactions overall, per day and per category.
+        
+        When the store answers the query the totals come from its daily
+        rollups without reading individual transactions. Otherwise they are
+        computed from the downloaded transactions.
+        
+        Args:
+            start_date: Start date for filtering transactions
+            end_date: End date for filtering transactions
+            category_id: Optional category ID to filter by
+            account_id: Optional account ID, or list of account IDs, to filter by
             
-            categories = response.json()["data"]["category_groups"]
+        Returns:
+            Dictionary with total_milliunits and count, plus "daily" and
+            "categories" lists of per-group amount (milliunits) and count
             
-            # Update cache
-            if use_cache:
-                self._cache[cache_key] = (time.time(), categories)
+        Raises:
+            RateLimitExceeded: If the quota is exhausted and no stored data covers the range
+        """
+        account_ids = [account_id] if isinstance(account_id, str) else list(account_id or [])
+        if self.plan_transaction_query(start_date, category_id, account_ids):
+            # numpy is only needed when the store cannot answer
+            from transaction_table import TransactionTable
+            table = TransactionTable.from_records(self.get_red_flag_transactions(
+                start_date=start_date,
+                end_date=end_date,
+                category_id=category_id,
+                account_id=account_ids
+            ))
+            return {
+                "total_milliunits": table.total(),
+                "count": len(table),
+                "daily": table.group_by("date"),
+                "categories": table.group_by("category")
+            }
+        
+        self._try_refresh_store(start_date)
+        return self.store.summarize_transactions(
+            self.budget_id,
+            start_date=start_date,
+            end_date=end_date,
+            category_id=category_id,
+            account_id=account_ids or None
+        )
+    
+    def get_red_flag_page(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_id: Optional[str] = None,
+        account_id: Optional[Union[str, List[str]]] = None,
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 100
+    ) -> Dict:
+        """
+        Get one page of red-flagged transactions, newest first.
+        
+        Pages are keyed by the (date, id) of the last transaction of the
+        previous page. From the store each page is an index seek; otherwise
+        the page is selected from the downloaded transactions with a bounded
+        heap, without sorting them all.
+        
+        Args:
+            start_date: Start date for filtering transactions
+            end_date: End date for filtering transactions
+            category_id: Optional category ID to filter by
+            account_id: Optional account ID, or list of account IDs, to filter by
+            after: next_cursor of the previous page, or None for the first page
+            limit: Maximum number of transactions in the page
             
-            return categories
+        Returns:
+            Dictionary with "transactions" and "next_cursor", the (date, id)
+            to pass as after for the next page or None on the last page
             
+        Raises:
+            RateLimitExceeded: If the quota is exhausted and no stored data covers the range
+        """
+        account_ids = [account_id] if isinstance(account_id, str) else list(account_id or [])
+        after = tuple(after) if after else None
+        if self.plan_transaction_query(start_date, category_id, account_ids):
+            transactions = self.get_red_flag_transactions(
+                start_date=start_date,
+                end_date=end_date,
+                category_id=category_id,
+                account_id=account_ids
+            )
+            if after:
+                transactions = (t for t in transactions if (t["date"], t["id"]) < after)
+            page = heapq.nlargest(limit + 1, transactions, key=lambda t: (t["date"], t["id"]))
+        else:
+            self._try_refresh_store(start_date)
+            # One extra row tells whether another page follows
+            page = self.store.page_transactions(
+                self.budget_id,
+                start_date=start_date,
+                end_date=end_date,
+                category_id=category_id,
+                account_id=account_ids or None,
+                after=after,
+                limit=limit + 1
+            )
+        
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = (page[-1]["date"], page[-1]["id"])
+        return {"transactions": page, "next_cursor": next_cursor}
+    
+    def _try_refresh_store(self, start_date: Optional[datetime]) -> None:
+        """Refresh the store, reporting failures instead of raising them."""
+        try:
+            self._refresh_store(start_date)
         except requests.exceptions.RequestException as e:
             if hasattr(e.response, "status_code") and e.response.status_code == 401:
                 raise ValueError("Invalid API token. Please check your YNAB API token in the .env file.")
-            print(f"Error fetching categories: {str(e)}")
+            print(f"Error fetching transactions: {str(e)}")
+    
+    def iter_red_flag_transactions(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_id: Optional[str] = None,
+        account_id: Optional[Union[str, List[str]]] = None
+    ) -> Iterator[Transaction]:
+        """
+        Stream red-flagged transactions one at a time.
+        
+        Unlike get_red_flag_transactions, nothing is cached and no list is
+        built: records come straight from a store cursor or from the
+        incrementally parsed response body, so memory stays flat regardless
+        of the size of the history.
+        
+        Args:
+            start_date: Start date for filtering transactions
+            end_date: End date for filtering transactions
+            category_id: Optional category ID to filter by
+            account_id: Optional account ID, or list of account IDs, to filter by
+            
+        Yields:
+            Transaction records, readable as dictionaries
+            
+        Raises:
+            RateLimitExceeded: If the quota is exhausted and no stored data covers the range
+            requests.exceptions.RequestException: If fetching from YNAB fails
+        """
+        account_ids = [account_id] if isinstance(account_id, str) else list(account_id or [])
+        endpoints = self.plan_transaction_query(start_date, category_id, account_ids)
+        
+        if not endpoints:
+            self._refresh_store(start_date)
+            yield from self.store.iter_transactions(
+                self.budget_id,
+                start_date=start_date,
+                end_date=end_date,
+                category_id=category_id,
+                account_id=account_ids or None
+            )
+            return
+        
+        params = {}
+        if start_date:
+            params["since_date"] = start_date.strftime("%Y-%m-%d")
+        start_day, end_day = self._day_bounds(start_date, end_date)
+        for path in endpoints:
+            for t in self._stream_transactions(path, params):
+                if self._is_red_flag_match(t, start_day, end_day, category_id, account_ids):
+                    yield Transaction.from_dict(t)
+    
+    def plan_transaction_query(
+        self,
+        start_date: Optional[datetime],
+        category_id: Optional[str] = None,
+        account_ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Choose the YNAB endpoints that answer a transaction query.
+        
+        A store that already spans the range answers any filter after a cheap
+        delta sync. Otherwise an account or category filter is pushed down to
+        the narrower account- or category-scoped endpoints, so the payload
+        scales with the selection rather than the whole budget.
+        
+        Args:
+            start_date: Start date of the query
+            category_id: Optional category ID filter
+            account_ids: Optional account ID filters
+            
+        Returns:
+            Endpoint paths to fetch, or an empty list when the store answers the query
+        """
+        if self.incremental and self._sync_covers(start_date):
             return []
+        if account_ids:
+            # One request per account, fetched in parallel
+            return [
+                f"/budgets/{self.budget_id}/accounts/{a}/transactions"
+                for a in account_ids
+            ]
+        if category_id:
+            return [f"/budgets/{self.budget_id}/categories/{category_id}/transactions"]
+        if self.incremental:
+            return []
+        return [f"/budgets/{self.budget_id}/transactions"]
+    
+    def _fetch_transactions(self, endpoints: List[str], start_date: Optional[datetime]) -> List[Dict]:
+        """Download transactions from one or more endpoints, in parallel if several."""
+        params = {}
+        if start_date:
+            params["since_date"] = start_date.strftime("%Y-%m-%d")
+        
+        def fetch(path: str) -> List[Dict]:
+            return self._get_json(path, params)["data"]["transactions"]
+        
+        if len(endpoints) == 1:
+            return fetch(endpoints[0])
+        
+        # Each worker runs in a copy of this context to keep the request priority
+        transactions = []
+        with ThreadPoolExecutor(max_workers=min(len(endpoints), self.pool_size)) as executor:
+            futures = [executor.submit(copy_context().run, fetch, path) for path in endpoints]
+            for future in futures:
+                transactions.extend(future.result())
+        return transactions
+    
+    @staticmethod
+    def _day_bounds(start_date: Optional[datetime], end_date: Optional[datetime]) -> tuple:
+        """Format the query range once as ISO days for string comparison."""
+        return (
+            start_date.strftime("%Y-%m-%d") if start_date else None,
+            end_date.strftime("%Y-%m-%d") if end_date else None
+        )
+    
+    @staticmethod
+    def _is_red_flag_match(
+        t: Dict,
+        start_day: Optional[str],
+        end_day: Optional[str],
+        category_id: Optional[str],
+        account_ids: List[str]
+    ) -> bool:
+        """Check a downloaded transaction against the red flag and query filters."""
+        if t.get("flag_color") not in ("red", "red_flag") or t.get("deleted"):
+            return False
+        # ISO dates compare correctly as strings
+        if start_day and t["date"] < start_day:
+            return False
+        if end_day and t["date"] > end_day:
+            return False
+        if category_id and t["category_id"] != category_id:
+            return False
+        if account_ids and t["account_id"] not in account_ids:
+            return False
+        return True
+    
+    def _filter_red_flags(
+        self,
+        transactions: List[Dict],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_id: Optional[str],
+        account_ids: List[str]
+    ) -> List[Transaction]:
+        """Filter downloaded transactions for red flags and the query filters."""
+        start_day, end_day = self._day_bounds(start_date, end_date)
+        return [
+            Transaction.from_dict(t) for t in transactions
+            if self._is_red_flag_match(t, start_day, end_day, category_id, account_ids)
+        ]
+    
+    def _get_stored_resource(
+        self,
+        resource: str,
+        field: str,
+        save: Callable[[str, List[Dict]], None],
+        load: Callable[[str], List[Dict]],
+        use_cache: bool
+    ) -> List[Dict]:
+        """
+        Get a budget resource from memory, the store or YNAB, in that order.
+        
+        Downloads are saved and read back from the store, so every path
+        returns the same fields. A stored copy synced within the cache timeout is served as is. One up
+        to max_stale older is served at once while a single background
+        refresh brings it up to date; anything older waits for YNAB.
+        
+        Args:
+            resource: Path below the budget, also the cache and sync state key
+            field: Field of the response data holding the list
+            save: Store method saving the downloaded list
+            load: Store method loading the stored list
+            use_cache: Whether memory and stored copies may be served
+        """
+        if use_cache:
+            data = self._cache.get(resource)
+            if data is not None:
+                return data
+            if self.store.is_fresh(self.budget_id, resource, self._cache_timeout):
+                data = load(self.budget_id)
+                self._cache.set(resource, data)
+                return data
+            if self._within_stale_limit(resource):
+                self._revalidate(
+                    resource,
+                    lambda: self._get_stored_resource(resource, field, save, load, use_cache=False)
+                )
+                return load(self.budget_id)
+        
+        data = self._get_json(f"/budgets/{self.budget_id}/{resource}")["data"][field]
+        save(self.budget_id, data)
+        self.store.mark_synced(self.budget_id, resource)
+        data = load(self.budget_id)
+        
+        # Update cache, also after a forced refresh
+        self._cache.set(resource, data)
+        return data
+    
+    def get_categories(self, use_cache: bool = True) -> List[Dict]:
+        """Get all categories from YNAB."""
+        try:
+            return self._get_stored_resource(
+                "categories", "category_groups",
+                self.store.save_categories, self.store.get_categories, use_cache
+            )
+        except RateLimitExceeded as e:
+            print(f"Error fetching categories: {str(e)}")
+            return self.store.get_categories(self.budget_id)
+        except requests.exceptions.RequestException as e:
+            if hasattr(e.response, "status_code") and e.response.status_code == 401:
+                raise ValueError("Invalid API token. Please check your YNAB API token in the .env file.")
+            print(f"Error fetching categories: {str(e)}")
+            return self.store.get_categories(self.budget_id)
     
     def get_accounts(self, use_cache: bool = True) -> List[Dict]:
         """Get all accounts from YNAB."""
+        try:
+            return self._get_stored_resource(
+                "accounts", "accounts",
+                self.store.save_accounts, self.store.get_accounts, use_cache
+            )
+        except RateLimitExceeded as e:
+            print(f"Error fetching accounts: {str(e)}")
+            return self.store.get_accounts(self.budget_id)
+        except requests.exceptions.RequestException as e:
+            if hasattr(e.response, "status_code") and e.response.status_code == 401:
+                raise ValueError("Invalid API token. Please check your YNAB API token in the .env file.")
+            print(f"Error fetching accounts: {str(e)}")
+            return self.store.get_accounts(self.budget_id) 
+    
+    def get_budgets(self, use_cache: bool = True) -> List[Dict]:
+        """Get summaries of all budgets, including their currency format."""
         try:
             # Check cache if enabled
             if use_cache:
-                cache_key = "accounts"
-                if cache_key in self._cache:
-                    cache_time, accounts = self._cache[cache_key]
-                    if time.time() - cache_time < self._cache_timeout:
-                        return accounts
-            
-            response = requests.get(
-                f"{self.base_url}/budgets/{self.budget_id}/accounts",
-                headers=self.headers
-            )
-            response.raise_for_status()
+                cache_key = "budgets"
+                budgets = self._cache.get(cache_key)
+                if budgets is not None:
+                    return budgets
             
-            accounts = response.json()["data"]["accounts"]
+            budgets = self._get_json("/budgets")["data"]["budgets"]
             
             # Update cache
             if use_cache:
-                self._cache[cache_key] = (time.time(), accounts)
+                self._cache.set(cache_key, budgets)
             
-            return accounts
+            return budgets
             
+        except RateLimitExceeded as e:
+            print(f"Error fetching budgets: {str(e)}")
+            return []
         except requests.exceptions.RequestException as e:
             if hasattr(e.response, "status_code") and e.response.status_code == 401:
                 raise ValueError("Invalid API token. Please check your YNAB API token in the .env file.")
-            print(f"Error fetching accounts: {str(e)}")
-            return [] 
\ No newline at end of file
+            print(f"Error fetching budgets: {str(e)}")
+            return []
\ No newline at end of file
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import tracemalloc
+from rich.console import Console
+from rich.table import Table
+from sample_data import generate_transactions, timed
+
+SIZES = [10000, 100000]
+
+# openpyxl writes far slower than csv, so the Excel exporters run smaller sizes
+EXCEL_SIZES = [10000, 25000]
+
+def measure(fn):
+    """Run fn twice: untraced for its time in seconds, then traced for its peak memory in MB."""
+    elapsed, _ = timed(fn)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return elapsed, peak
+
+def benchmark_exports():
+    print("Benchmarking report exports (peak memory traced with tracemalloc)...")
+    from report_generator import ReportGenerator
+    import streaming_export
+    
+    console = Console()
+    table = Table(title="Export time and peak memory")
+    table.add_column("Rows", justify="right", style="cyan")
+    table.add_column("Exporter")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Peak MB", justify="right")
+    table.add_column("File MB", justify="right")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        exporters = [
+            ("csv", "DataFrame to_csv", SIZES, lambda path, size: ReportGenerator(generate_transactions(size)).generate_csv(path)),
+            ("csv", "streaming write_csv", SIZES, lambda path, size: streaming_export.write_csv(generate_transactions(size), path)),
+            ("xlsx", "DataFrame to_excel", EXCEL_SIZES, lambda path, size: ReportGenerator(generate_transactions(size)).generate_excel(path)),
+            ("xlsx", "write-only write_excel", EXCEL_SIZES, lambda path, size: streaming_export.write_excel(generate_transactions(size), path)),
+            ("xlsx", "  sheet per month", EXCEL_SIZES, lambda path, size: streaming_export.write_excel(generate_transactions(size), path, sheet_per_month=True))
+        ]
+        for extension, name, sizes, export in exporters:
+            for size in sizes:
+                path = os.path.join(directory, f"export.{extension}")
+                seconds, peak = measure(lambda: export(path, size))
+                table.add_row(f"{size:,}", name, f"{seconds:.2f}", f"{peak:.1f}", f"{os.path.getsize(path) / (1024 * 1024):.1f}")
+    
+    console.print(table)
+
+if __name__ == "__main__":
+    benchmark_exports()
@@ -0,0 +1,60 @@
+import os
+import statistics
+import subprocess
+import sys
+from rich.console import Console
+from rich.table import Table
+
+RUNS = 5
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Entry points and the modules that make up their cold start
+ENTRY_POINTS = ["cli", "ynab_client", "main", "report_generator", "cny_dashboard", "web_dashboard"]
+
+# Heavy dependencies that should only load when a code path needs them
+HEAVY_MODULES = ["pandas", "numpy", "reportlab", "plotly", "openpyxl", "pyarrow"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(f"{{elapsed}}|{{','.join(heavy)}}")
+"""
+
+def measure(module: str):
+    """Import a module in fresh interpreters and return the median time and heavy modules loaded."""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR, PYTHONDONTWRITEBYTECODE="1")
+    times = []
+    heavy = ""
+    for _ in range(RUNS):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, env=env, cwd=SRC_DIR
+        )
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        elapsed, heavy = result.stdout.strip().split("|")
+        times.append(float(elapsed) * 1000)
+    return statistics.median(times), heavy
+
+def benchmark_import_time():
+    print("Benchmarking entry point import time (no YNAB requests are made)...")
+    console = Console()
+    table = Table(title=f"Cold import time (median of {RUNS} fresh interpreters)")
+    table.add_column("Entry point", style="cyan")
+    table.add_column("Import ms", justify="right")
+    table.add_column("Heavy modules loaded")
+    
+    for module in ENTRY_POINTS:
+        ms, heavy = measure(module)
+        if ms is None:
+            table.add_row(module, "failed", heavy)
+        else:
+            table.add_row(module, f"{ms:.0f}", heavy or "-")
+    
+    console.print(table)
+
+if __name__ == "__main__":
+    benchmark_import_time()
@@ -0,0 +1,101 @@
+import gzip
+import json
+import os
+import random
+from datetime import timedelta
+from rich.console import Console
+from rich.table import Table
+from sample_data import START, generate_transactions, timed
+
+ITERATIONS = 200
+
+def build_dashboard_data():
+    """Build /api/data contents for a year of red-flagged spending."""
+    rnd = random.Random(1)
+    # Amounts as formatted for display, like format_transaction
+    transactions = [
+        dict(t, amount=f"¥{t['amount'] / 1000:,.2f}")
+        for t in generate_transactions(100, memo="Dinner")
+    ]
+    stats = {
+        "total_milliunits": -1234567,
+        "count": 1000,
+        "daily": [
+            {"date": (START + timedelta(days=d)).isoformat(), "amount": -rnd.randint(1000, 500000), "count": 3}
+            for d in range(365)
+        ],
+        "categories": [
+            {"category_id": f"cat-{c}", "category_name": f"Category {c}", "amount": -rnd.randint(1000, 5000000), "count": 80}
+            for c in range(12)
+        ]
+    }
+    summary = {"total_amount": -1234.567, "avg_amount": -1.234567, "transaction_count": 1000}
+    return transactions, stats, summary
+
+def timed_ms(fn):
+    """Mean milliseconds per call over ITERATIONS calls, and the result."""
+    seconds, result = timed(fn, ITERATIONS)
+    return result, seconds * 1000
+
+def benchmark_json_responses():
+    print("Benchmarking /api/data response encoding...")
+    
+    # web_dashboard builds its clients on import; no request is made
+    os.environ.setdefault("YNAB_API_TOKEN", "benchmark-token")
+    os.environ.setdefault("YNAB_BUDGET_ID", "benchmark-budget")
+    os.environ["YNAB_STORE_PATH"] = ":memory:"
+    import fast_json
+    import web_dashboard
+    
+    transactions, stats, summary = build_dashboard_data()
+    console = Console()
+    table = Table(title=f"/api/data payload (mean of {ITERATIONS} encodes)")
+    table.add_column("Variant", style="cyan")
+    table.add_column("Bytes", justify="right")
+    table.add_column("Encode ms", justify="right")
+    
+    # Before: figure JSON built per request and encoded again inside the payload
+    def before():
+        payload = {
+            "summary": summary,
+            "transactions": transactions,
+            "category_chart": web_dashboard.create_category_chart(stats["categories"]),
+            "trend_chart": web_dashboard.create_trend_chart(stats["daily"]),
+            "stale": False
+        }
+        return json.dumps(payload, sort_keys=True).encode()
+    
+    body, ms = timed_ms(before)
+    table.add_row("json + per-request figures", f"{len(body):,}", f"{ms:.2f}")
+    
+    # After: charts encoded once per data version and spliced into the body
+    for chart_format in ("figure", "data"):
+        if chart_format == "data":
+            charts = (
+                web_dashboard.category_chart_data(stats["categories"]),
+                web_dashboard.trend_chart_data(stats["daily"])
+            )
+        else:
+            charts = (
+                web_dashboard.create_category_chart(stats["categories"]),
+                web_dashboard.create_trend_chart(stats["daily"])
+            )
+        raw = {
+            "category_chart": fast_json.dumps(charts[0]),
+            "trend_chart": fast_json.dumps(charts[1])
+        }
+        payload = {"summary": summary, "transactions": transactions, "stale": False}
+        
+        body, ms = timed_ms(lambda: fast_json.dumps_with_raw(payload, raw))
+        table.add_row(f"fast + cached {chart_format} charts", f"{len(body):,}", f"{ms:.2f}")
+        compressed, ms = timed_ms(lambda: gzip.compress(fast_json.dumps_with_raw(payload, raw), compresslevel=6))
+        table.add_row("  + gzip", f"{len(compressed):,}", f"{ms:.2f}")
+        if fast_json.brotli is not None:
+            compressed, ms = timed_ms(lambda: fast_json.compress(fast_json.dumps_with_raw(payload, raw), "br"))
+            table.add_row("  + brotli", f"{len(compressed):,}", f"{ms:.2f}")
+    
+    console.print(table)
+    print(f"Encoder: {'orjson' if fast_json.orjson is not None else 'json'}")
+
+if __name__ == "__main__":
+    benchmark_json_responses()
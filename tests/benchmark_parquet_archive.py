@@ -0,0 +1,59 @@
+import os
+import tempfile
+from datetime import date, datetime
+from rich.console import Console
+from rich.table import Table
+from sample_data import BUDGETS, generate_transactions, timed
+
+# Three years of red flags in two budgets
+ROWS = 300000
+START = date(2023, 1, 1)
+DAYS = 3 * 365
+
+def generate_archive_transactions(count):
+    """Yield budget-tagged red-flagged transactions in date order."""
+    return generate_transactions(count, days=DAYS, start=START, budgets=BUDGETS)
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+def benchmark_parquet_archive():
+    print(f"Benchmarking the Parquet archive with {ROWS:,} transactions over three years...")
+    import pandas as pd
+    import parquet_archive
+    import streaming_export
+    
+    console = Console()
+    table = Table(title="Archive size and reload time")
+    table.add_column("Operation")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Rows", justify="right")
+    table.add_column("Size MB", justify="right")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, "archive")
+        csv_path = os.path.join(directory, "export.csv")
+        columns = streaming_export.EXPORT_COLUMNS + ["budget_id"] + streaming_export.BUDGET_EXPORT_COLUMNS
+        
+        seconds, rows = timed(lambda: streaming_export.write_csv(generate_archive_transactions(ROWS), csv_path, columns))
+        table.add_row("Write CSV", f"{seconds:.2f}", f"{rows:,}", f"{os.path.getsize(csv_path) / (1024 * 1024):.1f}")
+        seconds, rows = timed(lambda: parquet_archive.write_archive(generate_archive_transactions(ROWS), root))
+        table.add_row("Write Parquet archive", f"{seconds:.2f}", f"{rows:,}", f"{directory_size(root) / (1024 * 1024):.1f}")
+        
+        seconds, df = timed(lambda: pd.read_csv(csv_path))
+        table.add_row("Reload CSV (pandas)", f"{seconds:.2f}", f"{len(df):,}", "")
+        seconds, result = timed(lambda: parquet_archive.load_archive(root))
+        table.add_row("Reload archive, all columns", f"{seconds:.2f}", f"{result.num_rows:,}", "")
+        seconds, result = timed(lambda: parquet_archive.load_archive(
+            root, datetime(2025, 6, 1), datetime(2025, 6, 30), budget_ids=[BUDGETS[0][0]]
+        ))
+        table.add_row("Reload one budget-month", f"{seconds:.3f}", f"{result.num_rows:,}", "")
+        seconds, result = timed(lambda: sum(1 for _ in parquet_archive.iter_archive(root, datetime(2025, 1, 1), datetime(2025, 12, 31))))
+        table.add_row("Iterate one year as records", f"{seconds:.2f}", f"{result:,}", "")
+        seconds, result = timed(lambda: parquet_archive.monthly_totals(root))
+        table.add_row("Monthly totals, three years", f"{seconds:.3f}", f"{len(result):,} months", "")
+    
+    console.print(table)
+
+if __name__ == "__main__":
+    benchmark_parquet_archive()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+from rich.console import Console
+from rich.table import Table
+from sample_data import generate_transactions, timed
+
+SIZES = [1000, 10000, 100000]
+
+# The single-table layout is only timed up to this size; beyond it a run
+# takes minutes
+LEGACY_MAX_ROWS = 10000
+
+def build_transactions(count):
+    """Build red-flagged transactions spread over a year and 12 categories."""
+    return list(generate_transactions(count, memo="Dinner with friends after the concert"))
+
+def legacy_pdf(report, output_path):
+    """Previous layout: iterrows into one fully gridded table."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+    
+    data = [["Date", "Payee", "Category", "Amount", "Notes"]]
+    for _, row in report.df.iterrows():
+        data.append([row["date"], row["payee_name"], row["category_name"],
+                     f"${row['amount']/1000:,.2f}", row.get("memo", "")])
+    table = Table(data)
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+        ("FONTSIZE", (0, 1), (-1, -1), 12),
+        ("GRID", (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    SimpleDocTemplate(output_path, pagesize=letter).build([table])
+
+def benchmark_pdf_report():
+    print("Benchmarking PDF report rendering...")
+    from report_generator import ReportGenerator
+    
+    console = Console()
+    table = Table(title="PDF rendering time (seconds)")
+    table.add_column("Rows", justify="right", style="cyan")
+    table.add_column("Single table", justify="right")
+    table.add_column("Large layout", justify="right")
+    table.add_column("Large + category subtotals", justify="right")
+    table.add_column("Pages", justify="right")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "report.pdf")
+        for size in SIZES:
+            report = ReportGenerator(build_transactions(size))
+            legacy = "skipped"
+            if size <= LEGACY_MAX_ROWS:
+                legacy = f"{timed(lambda: legacy_pdf(report, path))[0]:.2f}"
+            large, _ = timed(lambda: report.generate_pdf(path, large=True))
+            with open(path, "rb") as f:
+                pages = f.read().count(b"/Type /Page\n")
+            subtotals, _ = timed(lambda: report.generate_pdf(path, category_subtotals=True))
+            table.add_row(f"{size:,}", legacy, f"{large:.2f}", f"{subtotals:.2f}", f"{pages:,}")
+    
+    console.print(table)
+
+if __name__ == "__main__":
+    benchmark_pdf_report()
@@ -0,0 +1,92 @@
+import random
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+START = date(2025, 1, 1)
+
+# Budget tags added by MultiBudgetClient: (budget_id, currency code, symbol)
+BUDGETS = [("budget-usd", "USD", "$"), ("budget-cny", "CNY", "¥")]
+
+def generate_transactions(
+    count: int,
+    days: int = 365,
+    start: date = START,
+    memo: str = 'Dinner, "with" friends',
+    budgets: Sequence[Tuple[str, str, str]] = ()
+) -> Iterator[Dict]:
+    """
+    Yield red-flagged transactions in date order, as iter_red_flag_transactions does.
+    
+    Rows are spread evenly over days and cycle through 4 accounts, 12
+    categories and 40 payees; amounts come from a fixed seed, so every run
+    and every benchmark sees the same data.
+    
+    Args:
+        count: Number of transactions
+        days: Number of days the transactions span
+        start: Date of the first transaction
+        memo: Memo of two in three transactions; the others have none
+        budgets: Budgets to tag the transactions with in turn, or none
+    """
+    rnd = random.Random(1)
+    for i in range(count):
+        t = {
+            "id": f"t-{i}",
+            "date": (start + timedelta(days=i * days // count)).isoformat(),
+            "amount": -rnd.randint(1000, 500000),
+            "memo": memo if i % 3 else None,
+            "flag_color": "red",
+            "cleared": "cleared",
+            "approved": True,
+            "account_id": f"acc-{i % 4}",
+            "account_name": f"Account {i % 4}",
+            "category_id": f"cat-{i % 12}",
+            "category_name": f"Category {i % 12}",
+            "payee_id": f"payee-{i % 40}",
+            "payee_name": f"Payee {i % 40}"
+        }
+        if budgets:
+            budget_id, currency_code, currency_symbol = budgets[i % len(budgets)]
+            t.update(
+                budget_id=budget_id,
+                budget_name=budget_id,
+                currency_code=currency_code,
+                currency_symbol=currency_symbol,
+                decimal_digits=2
+            )
+        yield t
+
+def random_transaction(
+    rnd: random.Random,
+    id: str,
+    start: date = START,
+    days: int = 60,
+    flag_colors: Sequence[Optional[str]] = ("red", "red_flag", "blue", None)
+) -> Dict:
+    """
+    Build a transaction with random date, amount, flag, account and category.
+    
+    Unlike generate_transactions, flags and categories vary and may be
+    missing, as in a synced budget, so filters and rollups are exercised.
+    """
+    account_id = rnd.choice(["acc-1", "acc-2", "acc-3"])
+    category_id = rnd.choice(["cat-1", "cat-2", None])
+    return {
+        "id": id,
+        "date": (start + timedelta(days=rnd.randrange(days))).strftime("%Y-%m-%d"),
+        "amount": -rnd.randint(100, 100000),
+        "memo": None, "cleared": "cleared", "approved": True,
+        "flag_color": rnd.choice(flag_colors),
+        "account_id": account_id, "account_name": account_id,
+        "payee_id": "p-1", "payee_name": "Payee",
+        "category_id": category_id, "category_name": category_id,
+        "transfer_account_id": None, "deleted": False
+    }
+
+def timed(fn: Callable, repeat: int = 1) -> Tuple[float, object]:
+    """Run fn repeat times; return the mean seconds per run and the last result."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TODAY = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+def day(days_ago):
+    return (TODAY - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+
+def transaction(id, days_ago, amount, flag_color="red"):
+    return {
+        "id": id, "date": day(days_ago), "amount": amount, "memo": None,
+        "cleared": "cleared", "approved": True, "flag_color": flag_color,
+        "account_id": "acc-1", "account_name": "Checking", "payee_id": "p-1",
+        "payee_name": "Restaurant", "category_id": "cat-1", "category_name": "Groceries",
+        "transfer_account_id": None, "deleted": False
+    }
+
+# Server state: transactions by id, and the server_knowledge of each change
+TRANSACTIONS = {}
+CHANGED_AT = {}
+KNOWLEDGE = [0]
+REQUESTS = []
+
+def change(t):
+    """Record a change on the stand-in server, as an edit in YNAB would."""
+    KNOWLEDGE[0] += 1
+    TRANSACTIONS[t["id"]] = t
+    CHANGED_AT[t["id"]] = KNOWLEDGE[0]
+
+class StandInYNABHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the YNAB transactions endpoint with delta requests."""
+    
+    def do_GET(self):
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        REQUESTS.append(query)
+        if "last_knowledge_of_server" in query:
+            since = int(query["last_knowledge_of_server"])
+            transactions = [t for id, t in TRANSACTIONS.items() if CHANGED_AT[id] > since]
+        else:
+            transactions = [
+                t for t in TRANSACTIONS.values()
+                if not t["deleted"] and t["date"] >= query.get("since_date", "")
+            ]
+        body = json.dumps({
+            "data": {"transactions": transactions, "server_knowledge": KNOWLEDGE[0]}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def test_etag():
+    print("Testing conditional GETs on the dashboard API against a local stand-in server...")
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInYNABHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.setdefault("YNAB_API_TOKEN", "test-token")
+    os.environ["YNAB_API_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["YNAB_BUDGET_ID"] = "test-budget"
+    os.environ["YNAB_STORE_PATH"] = ":memory:"
+    
+    import web_dashboard
+    
+    try:
+        for t in [transaction("t-1", 1, -25000), transaction("t-2", 2, -5000), transaction("t-3", 3, -12000)]:
+            change(t)
+        app = web_dashboard.create_app(warm_cache=False)
+        http = app.test_client()
+        urls = {
+            "/api/data": f"/api/data?start_date={day(30)}&end_date={day(0)}&charts=data",
+            "/api/red-flag-amount": f"/api/red-flag-amount?start_date={day(30)}&end_date={day(0)}"
+        }
+        
+        etags = {}
+        for name, url in urls.items():
+            response = http.get(url)
+            assert response.status_code == 200 and response.headers["ETag"], name
+            assert response.headers["Cache-Control"] == "private, no-cache"
+            etags[name] = response.headers["ETag"]
+        assert json.loads(http.get(urls["/api/red-flag-amount"]).data)["total_milliunits"] == -42000
+        print("✓ Responses carry an ETag and must be revalidated before reuse")
+        
+        synced = len(REQUESTS)
+        for name, url in urls.items():
+            response = http.get(url, headers={"If-None-Match": etags[name]})
+            assert response.status_code == 304 and response.data == b"", name
+            assert response.headers["ETag"] == etags[name]
+        assert len(REQUESTS) == synced
+        print("✓ A matching If-None-Match gets 304 without a request to YNAB")
+        
+        gzip_etag = http.get(urls["/api/data"], headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+        assert gzip_etag != etags["/api/data"]
+        response = http.get(urls["/api/data"], headers={"If-None-Match": gzip_etag})
+        assert response.status_code == 200
+        response = http.get(urls["/api/data"], headers={"If-None-Match": gzip_etag, "Accept-Encoding": "gzip"})
+        assert response.status_code == 304
+        chart_etag = http.get(urls["/api/data"].replace("&charts=data", "")).headers["ETag"]
+        assert chart_etag != etags["/api/data"]
+        print("✓ Each content coding and chart format has its own ETag")
+        
+        # A sync without changes keeps the ETags
+        web_dashboard.client.sync_red_flag_changes()
+        for name, url in urls.items():
+            assert http.get(url, headers={"If-None-Match": etags[name]}).status_code == 304, name
+        print("✓ A sync that brings no changes keeps the ETags")
+        
+        # A sync that brings a change gives new ETags and the new data
+        change(transaction("t-4", 0, -7000))
+        web_dashboard.client.sync_red_flag_changes()
+        for name, url in urls.items():
+            response = http.get(url, headers={"If-None-Match": etags[name]})
+            assert response.status_code == 200, name
+            assert response.headers["ETag"] != etags[name]
+            etags[name] = response.headers["ETag"]
+        assert json.loads(http.get(urls["/api/red-flag-amount"]).data)["total_milliunits"] == -49000
+        assert http.get(urls["/api/data"], headers={"If-None-Match": etags["/api/data"]}).status_code == 304
+        print("✓ A sync that brings changes gives new ETags, which are then revalidated")
+        
+        print("\nAll tests passed successfully!")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_etag()
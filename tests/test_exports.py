@@ -0,0 +1,112 @@
+import csv
+import os
+import tempfile
+from collections import defaultdict
+from datetime import date, datetime
+from sample_data import generate_transactions
+
+def test_csv_round_trip():
+    print("Testing that streaming CSV exports read back unchanged...")
+    from streaming_export import EXPORT_COLUMNS, write_csv
+    
+    transactions = list(generate_transactions(2500))
+    # Memos needing quotes, line breaks and non-ASCII text
+    transactions[1]["memo"] = "Line one\nline two, \"quoted\""
+    transactions[2]["memo"] = "火锅, ¥ and €"
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "export.csv")
+        # A small chunk size, so rows span several chunks
+        assert write_csv(iter(transactions), path, chunk_rows=100) == len(transactions)
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            assert next(reader) == EXPORT_COLUMNS
+            rows = [dict(zip(EXPORT_COLUMNS, row)) for row in reader]
+        
+        assert len(rows) == len(transactions)
+        for t, row in zip(transactions, rows):
+            assert float(row["amount"]) == t["amount"] / 1000, (t, row)
+            assert row["memo"] == (t["memo"] or ""), (t, row)
+            assert row["approved"] == str(t["approved"])
+            for column in ("date", "payee_name", "category_name", "account_name", "cleared", "flag_color", "id"):
+                assert row[column] == t[column], (column, t, row)
+        print("✓ Every value reads back as written, amounts in currency units")
+        print("✓ Commas, quotes, line breaks and non-ASCII text stay inside their field")
+        
+        import pandas as pd
+        df = pd.read_csv(path)
+        assert str(df["amount"].dtype) == "float64" and str(df["approved"].dtype) == "bool"
+        assert round(df["amount"].sum() * 1000) == sum(t["amount"] for t in transactions)
+        print("✓ Amounts parse as numbers and approved as booleans")
+        
+        # A failing source does not leave a truncated file behind
+        def failing():
+            yield from transactions[:150]
+            raise RuntimeError("sync failed")
+        
+        try:
+            write_csv(failing(), path, chunk_rows=100)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("The error was not raised")
+        assert not os.path.exists(path)
+        print("✓ A failed export removes the partial file")
+
+def test_excel_round_trip():
+    print("Testing that write-only Excel exports read back unchanged...")
+    from openpyxl import load_workbook
+    from streaming_export import AMOUNT_FORMAT, DATE_FORMAT, EXPORT_COLUMNS, write_excel
+    
+    transactions = list(generate_transactions(1500, days=90))
+    
+    def read_sheet(sheet):
+        rows = sheet.iter_rows(values_only=True)
+        assert list(next(rows)) == EXPORT_COLUMNS
+        return [dict(zip(EXPORT_COLUMNS, row)) for row in rows]
+    
+    def matches(t, row):
+        assert isinstance(row["date"], datetime) and row["date"].date() == date.fromisoformat(t["date"]), (t, row)
+        # Whole amounts read back as int
+        assert isinstance(row["amount"], (int, float)) and row["amount"] == t["amount"] / 1000, (t, row)
+        assert row["approved"] is t["approved"], (t, row)
+        for column in ("payee_name", "category_name", "account_name", "memo", "cleared", "flag_color", "id"):
+            assert row[column] == t[column], (column, t, row)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "export.xlsx")
+        assert write_excel(iter(transactions), path) == len(transactions)
+        workbook = load_workbook(path)
+        assert workbook.sheetnames == ["Transactions"]
+        sheet = workbook["Transactions"]
+        assert sheet.freeze_panes == "A2" and sheet["A1"].font.bold
+        assert sheet["A2"].number_format == DATE_FORMAT and sheet["E2"].number_format == AMOUNT_FORMAT
+        rows = read_sheet(sheet)
+        assert len(rows) == len(transactions)
+        for t, row in zip(transactions, rows):
+            matches(t, row)
+        print("✓ Dates are date cells and amounts numeric cells in currency units")
+        print("✓ Every other value reads back as written, under a bold, frozen header")
+        
+        by_month = defaultdict(list)
+        for t in transactions:
+            by_month[t["date"][:7]].append(t)
+        assert write_excel(iter(transactions), path, sheet_per_month=True) == len(transactions)
+        workbook = load_workbook(path)
+        assert workbook.sheetnames == sorted(by_month)
+        for month, expected in by_month.items():
+            rows = read_sheet(workbook[month])
+            assert len(rows) == len(expected), month
+            for t, row in zip(expected, rows):
+                matches(t, row)
+        print("✓ One sheet per month holds exactly that month's transactions")
+        
+        write_excel(iter([]), path)
+        workbook = load_workbook(path)
+        assert workbook.sheetnames == ["Transactions"] and workbook["Transactions"].max_row == 1
+        print("✓ An empty export still has a header sheet")
+
+if __name__ == "__main__":
+    test_csv_round_trip()
+    test_excel_round_trip()
+    print("\nAll tests passed successfully!")
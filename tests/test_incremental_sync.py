@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TODAY = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+def day(days_ago):
+    return (TODAY - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+
+def transaction(id, days_ago, amount, flag_color="red"):
+    return {
+        "id": id, "date": day(days_ago), "amount": amount, "memo": None,
+        "cleared": "cleared", "approved": True, "flag_color": flag_color,
+        "account_id": "acc-1", "account_name": "Checking", "payee_id": "p-1",
+        "payee_name": "Restaurant", "category_id": "cat-1", "category_name": "Groceries",
+        "transfer_account_id": None, "deleted": False
+    }
+
+# Server state: transactions by id, and the server_knowledge of each change
+TRANSACTIONS = {}
+CHANGED_AT = {}
+KNOWLEDGE = [0]
+REQUESTS = []
+
+def change(t):
+    """Record a change on the stand-in server, as an edit in YNAB would."""
+    KNOWLEDGE[0] += 1
+    TRANSACTIONS[t["id"]] = t
+    CHANGED_AT[t["id"]] = KNOWLEDGE[0]
+
+class StandInYNABHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the YNAB transactions endpoint with delta requests."""
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        REQUESTS.append(query)
+        if "last_knowledge_of_server" in query:
+            # Delta: everything changed since the client's knowledge, deletions included
+            since = int(query["last_knowledge_of_server"])
+            transactions = [t for id, t in TRANSACTIONS.items() if CHANGED_AT[id] > since]
+        else:
+            transactions = [
+                t for t in TRANSACTIONS.values()
+                if not t["deleted"] and t["date"] >= query.get("since_date", "")
+            ]
+        body = json.dumps({
+            "data": {"transactions": transactions, "server_knowledge": KNOWLEDGE[0]}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def test_incremental_sync():
+    print("Testing delta sync against a local stand-in server...")
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInYNABHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.setdefault("YNAB_API_TOKEN", "test-token")
+    os.environ["YNAB_API_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    
+    from transaction_store import TransactionStore
+    from ynab_client import YNABClient
+    
+    def stored(store):
+        rows = store.query_transactions("test-budget", flag_colors=None)
+        return {t["id"]: t["amount"] for t in rows}
+    
+    try:
+        for t in [
+            transaction("t-1", 1, -25000),
+            transaction("t-2", 2, -5000, flag_color="blue"),
+            transaction("t-3", 3, -12000),
+            transaction("t-old", 60, -8000)
+        ]:
+            change(t)
+        store = TransactionStore()
+        client = YNABClient(budget_id="test-budget", store=store)
+        
+        # The first sync downloads the range and remembers the knowledge
+        client.sync_transactions(since_date=TODAY - timedelta(days=30))
+        assert REQUESTS[-1] == {"since_date": day(30)}, REQUESTS[-1]
+        assert stored(store) == {"t-1": -25000, "t-2": -5000, "t-3": -12000}
+        assert client.server_knowledge == KNOWLEDGE[0]
+        print("✓ First sync downloads the range and stores server_knowledge")
+        
+        # Later syncs send the knowledge and apply edits and deletions
+        knowledge = KNOWLEDGE[0]
+        change(dict(TRANSACTIONS["t-1"], amount=-30000))
+        change(dict(TRANSACTIONS["t-3"], deleted=True))
+        change(transaction("t-4", 0, -7000))
+        changes = client.sync_red_flag_changes()
+        assert REQUESTS[-1] == {"last_knowledge_of_server": str(knowledge)}, REQUESTS[-1]
+        assert stored(store) == {"t-1": -30000, "t-2": -5000, "t-4": -7000}
+        assert sorted(t.id for t in changes["changed"]) == ["t-1", "t-4"]
+        assert changes["removed"] == ["t-3"]
+        print("✓ Delta sync sends last_knowledge_of_server and applies edits and deletions")
+        
+        # Nothing changed: the delta is empty and the copy is untouched
+        assert client.sync_transactions(since_date=TODAY - timedelta(days=30)) == 0
+        assert REQUESTS[-1] == {"last_knowledge_of_server": str(KNOWLEDGE[0])}
+        print("✓ An unchanged budget costs one empty delta request")
+        
+        # Reaching further back than the local copy falls back to a full
+        # sync, which also drops rows the server no longer returns
+        store.merge_transactions("test-budget", [transaction("t-gone", 5, -1000)])
+        client.sync_transactions(since_date=TODAY - timedelta(days=90))
+        assert REQUESTS[-1] == {"since_date": day(90)}, REQUESTS[-1]
+        assert stored(store) == {"t-1": -30000, "t-2": -5000, "t-4": -7000, "t-old": -8000}
+        assert store.get_state("test-budget", "since_date") == day(90)
+        print("✓ A wider range falls back to a full sync that replaces the local copy")
+        
+        # After the full sync, deltas resume with the new knowledge
+        change(dict(TRANSACTIONS["t-old"], flag_color=None))
+        client.sync_transactions(since_date=TODAY - timedelta(days=60))
+        assert REQUESTS[-1] == {"last_knowledge_of_server": str(KNOWLEDGE[0] - 1)}, REQUESTS[-1]
+        assert "t-old" not in {t["id"] for t in store.query_transactions("test-budget")}
+        print("✓ Delta sync resumes after the full sync")
+        
+        print("\nAll tests passed successfully!")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_incremental_sync()
@@ -0,0 +1,68 @@
+import json
+import random
+from sample_data import generate_transactions
+
+def document(items, key="transactions"):
+    """A response body shaped like the YNAB transactions endpoint."""
+    return json.dumps(
+        {"data": {key: items, "server_knowledge": 4821}}, ensure_ascii=False
+    ).encode("utf-8")
+
+def split_bytes(body, rnd):
+    """Split body at random points, so chunks end inside strings, escapes and numbers."""
+    pos = 0
+    while pos < len(body):
+        size = rnd.randint(1, 64)
+        yield body[pos:pos + size]
+        pos += size
+
+def test_json_stream():
+    print("Testing JSONArrayStream against json.loads over every kind of chunking...")
+    from json_stream import JSONArrayStream
+    
+    transactions = list(generate_transactions(200))
+    # Memos with escapes, multi-byte characters and numbers of every shape
+    transactions[0]["memo"] = 'Quote " backslash \\ tab \t newline \n slash / é 火锅 😀 \u0001'
+    transactions[1]["memo"] = "\\\"" * 20
+    transactions[2]["amount"] = -1234567890123
+    transactions[3]["rate"] = -1.25e-7
+    transactions[4]["subtransactions"] = [{"amount": -1, "memo": "]"}, [], {}]
+    body = document(transactions)
+    expected = json.loads(body)["data"]["transactions"]
+    
+    def parse(chunks, key="transactions"):
+        stream = JSONArrayStream(chunks, key)
+        return list(stream), stream.scalar("server_knowledge")
+    
+    assert parse([body]) == (expected, 4821)
+    assert parse(body[i:i + 1] for i in range(len(body))) == (expected, 4821)
+    print("✓ One chunk and one byte at a time give the same records as json.loads")
+    
+    rnd = random.Random(1)
+    for _ in range(50):
+        assert parse(split_bytes(body, rnd)) == (expected, 4821)
+    print("✓ Random chunk sizes splitting strings, escapes and multi-byte characters agree")
+    
+    # Top-level scalars can end exactly where a chunk does
+    scalars = [0, -12345, 6.02e23, -1.5e-3, 123456789, True, False, None, "text", 7]
+    body = document(scalars, key="values")
+    for split in range(1, len(body)):
+        assert parse([body[:split], b"", body[split:]], "values") == (scalars, 4821), split
+    for _ in range(50):
+        assert parse(split_bytes(body, rnd), "values") == (scalars, 4821)
+    print("✓ Numbers and literals split across chunks are read whole")
+    
+    assert parse([document([])]) == ([], 4821)
+    assert parse([b'{"data": {"server_knowledge": 1}}']) == ([], 1)
+    body = document(transactions[:3])
+    try:
+        parse(body[i:i + 7] for i in range(0, len(body) - 40, 7))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("A truncated body was accepted")
+    print("✓ Empty and missing arrays yield nothing, and a truncated body raises ValueError")
+
+if __name__ == "__main__":
+    test_json_stream()
+    print("\nAll tests passed successfully!")
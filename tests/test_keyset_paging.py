@@ -0,0 +1,35 @@
+import random
+from datetime import datetime, timedelta
+from sample_data import random_transaction
+
+BUDGET = "test-budget"
+START = datetime(2024, 1, 1)
+
+def test_keyset_paging():
+    from transaction_store import TransactionStore
+    
+    rnd = random.Random(2)
+    store = TransactionStore()
+    # Many rows per day, so pages end in the middle of a day
+    store.merge_transactions(BUDGET, [random_transaction(rnd, f"t-{i:04d}", START) for i in range(1000)])
+    
+    for filters in [{}, {"account_id": ["acc-1", "acc-2"]}, {"start_date": START + timedelta(days=15)}]:
+        expected = sorted(
+            store.query_transactions(BUDGET, **filters),
+            key=lambda t: (t["date"], t["id"]),
+            reverse=True
+        )
+        seen, after = [], None
+        while True:
+            page = store.page_transactions(BUDGET, after=after, limit=37, **filters)
+            seen += [t.id for t in page]
+            if len(page) < 37:
+                break
+            after = (page[-1].date, page[-1].id)
+        assert seen == [t["id"] for t in expected], filters
+    print("✓ Keyset pages cover every red flag once, newest first, across page boundaries")
+
+if __name__ == "__main__":
+    print("Testing keyset paging of stored transactions...")
+    test_keyset_paging()
+    print("\nAll tests passed successfully!")
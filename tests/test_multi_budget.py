@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+TODAY = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+# Two budgets whose account and category IDs exist in only one of them
+BUDGETS = {
+    "b1": {"accounts": ["acc-1", "acc-2"], "categories": ["cat-1"], "currency": ("USD", "$")},
+    "b2": {"accounts": ["acc-b2"], "categories": ["cat-b2"], "currency": ("CNY", "¥")}
+}
+
+def transaction(id, account_id, category_id, days_ago=1):
+    return {
+        "id": id, "date": (TODAY - timedelta(days=days_ago)).strftime("%Y-%m-%d"),
+        "amount": -10000, "memo": None, "cleared": "cleared", "approved": True,
+        "flag_color": "red", "account_id": account_id, "account_name": account_id,
+        "payee_id": "p-1", "payee_name": "Payee", "category_id": category_id,
+        "category_name": category_id, "transfer_account_id": None, "deleted": False
+    }
+
+TRANSACTIONS = {
+    "b1": [transaction("t-1", "acc-1", "cat-1"), transaction("t-2", "acc-2", "cat-1", 2)],
+    "b2": [transaction("t-3", "acc-b2", "cat-b2", 3)]
+}
+NOT_FOUND = []
+
+class StandInYNABHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the YNAB API that answers 404 for another budget's IDs."""
+    
+    def do_GET(self):
+        parts = urlparse(self.path).path.split("/")[2:]
+        data = None
+        if parts == ["budgets"]:
+            data = {"budgets": [
+                {"id": b, "name": b, "currency_format": {
+                    "iso_code": c["currency"][0], "currency_symbol": c["currency"][1], "decimal_digits": 2
+                }}
+                for b, c in BUDGETS.items()
+            ]}
+        elif len(parts) >= 3 and parts[1] in BUDGETS:
+            budget_id, rest = parts[1], parts[2:]
+            budget = BUDGETS[budget_id]
+            if rest == ["accounts"]:
+                data = {"accounts": [
+                    {"id": a, "name": a, "type": "checking", "on_budget": True,
+                     "closed": False, "balance": 0, "deleted": False}
+                    for a in budget["accounts"]
+                ]}
+            elif rest == ["categories"]:
+                data = {"category_groups": [{
+                    "id": f"group-{budget_id}", "name": "Group", "hidden": False, "deleted": False,
+                    "categories": [
+                        {"id": c, "name": c, "hidden": False, "deleted": False}
+                        for c in budget["categories"]
+                    ]
+                }]}
+            elif rest == ["transactions"]:
+                data = {"transactions": TRANSACTIONS[budget_id], "server_knowledge": 1}
+            elif len(rest) == 3 and rest[2] == "transactions":
+                field = {"accounts": "account_id", "categories": "category_id"}.get(rest[0])
+                if field and rest[1] in budget[rest[0]]:
+                    data = {
+                        "transactions": [t for t in TRANSACTIONS[budget_id] if t[field] == rest[1]],
+                        "server_knowledge": 1
+                    }
+        if data is None:
+            NOT_FOUND.append(self.path)
+        body = json.dumps({"data": data} if data is not None else {"error": {"id": "404"}}).encode()
+        self.send_response(200 if data is not None else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def test_multi_budget():
+    print("Testing MultiBudgetClient filters against a two-budget stand-in server...")
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInYNABHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.setdefault("YNAB_API_TOKEN", "test-token")
+    os.environ["YNAB_API_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    
+    from multi_budget import MultiBudgetClient
+    from transaction_store import TransactionStore
+    
+    def ids(transactions):
+        return [(t["budget_id"], t["id"]) for t in transactions]
+    
+    try:
+        # A cold store, so filtered queries go to the scoped endpoints
+        client = MultiBudgetClient(["b1", "b2"], store=TransactionStore())
+        
+        assert ids(client.iter_red_flag_transactions(account_id="acc-1")) == [("b1", "t-1")]
+        assert ids(client.get_red_flag_transactions(account_id="acc-1")) == [("b1", "t-1")]
+        print("✓ An account filter only goes to the budget that owns the account")
+        
+        both = client.get_red_flag_transactions(account_id=["acc-1", "acc-b2"])
+        assert ids(both) == [("b2", "t-3"), ("b1", "t-1")]
+        assert ids(client.iter_red_flag_transactions(account_id=["acc-1", "acc-b2"])) == ids(both)
+        print("✓ Accounts from several budgets are each queried in their own budget")
+        
+        assert ids(client.iter_red_flag_transactions(category_id="cat-b2")) == [("b2", "t-3")]
+        assert client.get_red_flag_transactions(category_id="cat-b2", account_id="acc-1") == []
+        assert list(client.iter_red_flag_transactions(account_id="acc-unknown")) == []
+        print("✓ Category filters are routed the same way, and budgets owning no filter are skipped")
+        
+        assert NOT_FOUND == [], NOT_FOUND
+        print("✓ No request was sent for another budget's IDs")
+        
+        everything = client.get_red_flag_transactions(start_date=TODAY - timedelta(days=30))
+        assert ids(everything) == [("b2", "t-3"), ("b1", "t-2"), ("b1", "t-1")]
+        assert [s["currency_code"] for s in client.summarize(everything)] == ["CNY", "USD"]
+        print("✓ Unfiltered queries still cover every budget")
+        
+        print("\nAll tests passed successfully!")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_multi_budget()
@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sample_data import BUDGETS, generate_transactions
+
+def transaction(id, date, amount, flag_color="red"):
+    return {
+        "id": id, "date": date, "amount": amount, "memo": None,
+        "cleared": "cleared", "approved": True, "flag_color": flag_color,
+        "account_id": "acc-1", "account_name": "Checking", "payee_id": "p-1",
+        "payee_name": "Restaurant", "category_id": "cat-1", "category_name": "Groceries",
+        "transfer_account_id": None, "deleted": False
+    }
+
+TRANSACTIONS = {}
+
+class StandInYNABHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the YNAB transactions endpoint."""
+    
+    def do_GET(self):
+        body = json.dumps({
+            "data": {"transactions": list(TRANSACTIONS.values()), "server_knowledge": 1}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def test_rearchive_cleared_month():
+    print("Testing that re-archiving replaces months whose red flags were cleared...")
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInYNABHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    directory = tempfile.mkdtemp()
+    root = os.path.join(directory, "archive")
+    os.environ.setdefault("YNAB_API_TOKEN", "test-token")
+    os.environ["YNAB_API_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["YNAB_BUDGET_ID"] = "test-budget"
+    os.environ.pop("YNAB_BUDGET_IDS", None)
+    os.environ["YNAB_STORE_PATH"] = ":memory:"
+    os.environ["YNAB_ARCHIVE_DIR"] = root
+    os.chdir(directory)
+    
+    from main import YNABRedFlagTracker
+    from parquet_archive import iter_archive, write_archive
+    
+    def archived():
+        return sorted(t["id"] for t in iter_archive(root))
+    
+    try:
+        # An older month outside the range of the later runs
+        write_archive([dict(transaction("t-jan", "2024-01-10", -1000), budget_id="test-budget")], root)
+        for t in [
+            transaction("t-mar-1", "2024-03-05", -25000),
+            transaction("t-mar-2", "2024-03-20", -5000),
+            transaction("t-apr", "2024-04-02", -12000)
+        ]:
+            TRANSACTIONS[t["id"]] = t
+        
+        # Each tracker has its own in-memory store, so every run syncs afresh
+        YNABRedFlagTracker().archive_transactions(datetime(2024, 3, 15), datetime(2024, 4, 10))
+        assert archived() == ["t-apr", "t-jan", "t-mar-1", "t-mar-2"], archived()
+        print("✓ Whole months are archived from a mid-month range")
+        
+        # Clear every March flag, then archive the same range again
+        for id in ("t-mar-1", "t-mar-2"):
+            TRANSACTIONS[id] = dict(TRANSACTIONS[id], flag_color=None)
+        YNABRedFlagTracker().archive_transactions(datetime(2024, 3, 1), datetime(2024, 4, 30))
+        assert archived() == ["t-apr", "t-jan"], archived()
+        assert not os.path.exists(os.path.join(root, "budget_id=test-budget", "month=2024-03"))
+        print("✓ A month left without red flags loses its old partition")
+        print("✓ Months outside the archived range are kept")
+        
+        print("\nAll tests passed successfully!")
+    finally:
+        server.shutdown()
+
+def test_round_trip():
+    print("Testing that archived transactions read back unchanged...")
+    from parquet_archive import ARCHIVE_COLUMNS, iter_archive, load_archive, monthly_totals, write_archive
+    
+    root = os.path.join(tempfile.mkdtemp(), "archive")
+    transactions = list(generate_transactions(5000, start=date(2024, 1, 1), budgets=BUDGETS))
+    columns = ARCHIVE_COLUMNS + ["budget_id"]
+    
+    def expected(start, end, budget_id=None):
+        rows = [
+            {column: t.get(column) for column in columns} for t in transactions
+            if start <= t["date"] <= end and budget_id in (None, t["budget_id"])
+        ]
+        return sorted(rows, key=lambda t: (t["date"], t["id"]))
+    
+    # A small chunk size, so partitions hold several row groups
+    assert write_archive(iter(transactions), root, chunk_rows=50) == len(transactions)
+    assert list(iter_archive(root)) == expected("", "9999")
+    table = load_archive(root)
+    assert str(table.schema.field("date").type) == "date32[day]"
+    assert str(table.schema.field("amount").type) == "int64"
+    print("✓ Every record reads back as written, with dates as dates and amounts as integer milliunits")
+    
+    # Copy June's file into the May partition: its rows match the date
+    # filter, so they are only left out if the May partition is never read
+    budget_id = BUDGETS[0][0]
+    shutil.copy(
+        os.path.join(root, f"budget_id={budget_id}", "month=2024-06", "part-0.parquet"),
+        os.path.join(root, f"budget_id={budget_id}", "month=2024-05", "part-0.parquet")
+    )
+    
+    start, end = datetime(2024, 6, 10), datetime(2024, 6, 20)
+    june = list(iter_archive(root, start, end, budget_ids=[budget_id]))
+    assert june and june == expected("2024-06-10", "2024-06-20", budget_id)
+    assert load_archive(root, start, end, budget_ids=[budget_id]).num_rows == len(june)
+    totals = monthly_totals(root, datetime(2024, 6, 1), datetime(2024, 6, 30), budget_ids=[budget_id])
+    assert totals == [{
+        "budget_id": budget_id, "month": "2024-06",
+        "total_milliunits": sum(t["amount"] for t in expected("2024-06-01", "2024-06-30", budget_id)),
+        "count": len(expected("2024-06-01", "2024-06-30", budget_id))
+    }]
+    print("✓ A budget and date range only open the partitions they overlap")
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_rearchive_cleared_month()
@@ -0,0 +1,182 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TODAY = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+TRANSACTIONS = [{
+    "id": "t-1", "date": (TODAY - timedelta(days=1)).strftime("%Y-%m-%d"), "amount": -25000,
+    "memo": None, "cleared": "cleared", "approved": True, "flag_color": "red",
+    "account_id": "acc-1", "account_name": "Checking", "payee_id": "p-1",
+    "payee_name": "Restaurant", "category_id": "cat-1", "category_name": "Groceries",
+    "transfer_account_id": None, "deleted": False
+}]
+
+# Scripted (status, headers) answers, used up before the server answers 200
+FAILURES = []
+SUCCESS_HEADERS = {"X-Rate-Limit": "190/200"}
+REQUESTS = []
+
+class StandInYNABHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the YNAB API that answers with scripted failures first."""
+    
+    def do_GET(self):
+        REQUESTS.append((time.monotonic(), self.path))
+        status, headers = FAILURES.pop(0) if FAILURES else (200, SUCCESS_HEADERS)
+        if status == 200:
+            resource = self.path.split("?")[0].rsplit("/", 1)[-1]
+            data = {resource: []} if resource in ("budgets", "accounts") else {
+                "transactions": TRANSACTIONS, "server_knowledge": 1
+            }
+            body = json.dumps({"data": data}).encode()
+        else:
+            body = json.dumps({"error": {"id": str(status)}}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def test_token_bucket():
+    from rate_limiter import BACKGROUND, RateLimiter, RateLimitExceeded
+    
+    # One token per second
+    limiter = RateLimiter(capacity=10, period=10, reserve=3)
+    for _ in range(7):
+        limiter.acquire(BACKGROUND, max_wait=0)
+    try:
+        limiter.acquire(BACKGROUND, max_wait=0.1)
+    except RateLimitExceeded as e:
+        assert 0.5 < e.retry_after <= 1, e.retry_after
+    else:
+        raise AssertionError("Background calls took the reserve")
+    for _ in range(3):
+        limiter.acquire(max_wait=0)
+    print("✓ Background calls stop at the reserve, interactive calls may use it")
+    
+    start = time.monotonic()
+    limiter.acquire(max_wait=2)
+    assert 0.5 < time.monotonic() - start < 1.5
+    try:
+        limiter.acquire(max_wait=0.1)
+    except RateLimitExceeded as e:
+        assert 0.5 < e.retry_after <= 1, e.retry_after
+    else:
+        raise AssertionError("An empty bucket served a call")
+    print("✓ An empty bucket waits for the refill, or gives up past max_wait")
+    
+    limiter = RateLimiter(capacity=200, period=3600)
+    limiter.update_from_header("190/200")
+    assert limiter.remaining <= 10.01
+    limiter.update_from_header("not a header")
+    limiter.exhaust(retry_after=30)
+    assert limiter.remaining < 0
+    try:
+        limiter.acquire(max_wait=1)
+    except RateLimitExceeded as e:
+        assert 29 < e.retry_after <= 30, e.retry_after
+    else:
+        raise AssertionError("An exhausted bucket served a call")
+    print("✓ X-Rate-Limit headers and 429 responses drain the bucket")
+
+def test_retries():
+    print("Testing retries and the stored-data fallback against a local stand-in server...")
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInYNABHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.setdefault("YNAB_API_TOKEN", "test-token")
+    os.environ["YNAB_API_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    
+    from rate_limiter import RateLimiter, RateLimitExceeded
+    from transaction_store import TransactionStore
+    from ynab_client import YNABClient
+    
+    def client(max_retries=3, limiter=None):
+        return YNABClient(
+            budget_id="test-budget", store=TransactionStore(),
+            rate_limiter=limiter or RateLimiter(), max_retries=max_retries
+        )
+    
+    try:
+        # 429s are retried once Retry-After has passed
+        ynab = client()
+        FAILURES[:] = [(429, {"Retry-After": "0.3"}), (429, {"Retry-After": "0.3"})]
+        del REQUESTS[:]
+        assert ynab.get_budgets(use_cache=False) == []
+        assert len(REQUESTS) == 3 and not FAILURES
+        assert REQUESTS[1][0] - REQUESTS[0][0] >= 0.3 and REQUESTS[2][0] - REQUESTS[1][0] >= 0.3
+        assert ynab.rate_limiter.remaining <= 10.01
+        print("✓ 429 responses are retried after Retry-After, and X-Rate-Limit is applied")
+        
+        # 5xx responses are retried up to max_retries
+        FAILURES[:] = [(503, {}), (502, {})]
+        del REQUESTS[:]
+        assert client().get_budgets(use_cache=False) == []
+        assert len(REQUESTS) == 3 and not FAILURES
+        FAILURES[:] = [(503, {})] * 3
+        del REQUESTS[:]
+        assert client(max_retries=2).get_budgets(use_cache=False) == []
+        assert len(REQUESTS) == 3 and not FAILURES
+        print("✓ 5xx responses are retried with backoff, max_retries times at most")
+        
+        # A Retry-After beyond max_wait fails fast after one request
+        FAILURES[:] = [(429, {"Retry-After": "3600"})]
+        del REQUESTS[:]
+        ynab = client()
+        start = time.monotonic()
+        try:
+            ynab.get_red_flag_transactions(start_date=TODAY - timedelta(days=30), use_cache=False)
+        except RateLimitExceeded as e:
+            assert e.retry_after > ynab.max_wait
+        else:
+            raise AssertionError("RateLimitExceeded was not raised without stored data")
+        assert len(REQUESTS) == 1 and time.monotonic() - start < 2
+        print("✓ Without stored data, a long Retry-After raises RateLimitExceeded at once")
+        
+        # With a synced store the same failure serves the stored copy
+        ynab = client()
+        ynab.sync_transactions(since_date=TODAY - timedelta(days=30))
+        FAILURES[:] = [(429, {"Retry-After": "3600"})]
+        transactions = ynab.get_red_flag_transactions(start_date=TODAY - timedelta(days=30), use_cache=False)
+        assert [t["id"] for t in transactions] == ["t-1"]
+        assert ynab.last_sync_error and not FAILURES
+        print("✓ With stored data, an exhausted quota serves the stored copy and records the error")
+        
+        # Background calls wait for quota above the reserve, interactive calls go first
+        SUCCESS_HEADERS.clear()
+        limiter = RateLimiter(capacity=10, period=10, reserve=5)
+        for _ in range(5):
+            limiter.acquire()
+        ynab = client(limiter=limiter)
+        del REQUESTS[:]
+        
+        def background():
+            with ynab.background():
+                ynab.get_budgets(use_cache=False)
+        
+        thread = threading.Thread(target=background, daemon=True)
+        thread.start()
+        time.sleep(0.1)
+        assert ynab.get_accounts(use_cache=False) == []
+        time.sleep(0.3)
+        assert [path for _, path in REQUESTS] == ["/v1/budgets/test-budget/accounts"] and thread.is_alive()
+        thread.join(5)
+        assert len(REQUESTS) == 2 and not thread.is_alive()
+        print("✓ Background requests wait above the reserve while interactive requests are served")
+        
+        print("\nAll tests passed successfully!")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    print("Testing the rate limiter token bucket...")
+    test_token_bucket()
+    test_retries()
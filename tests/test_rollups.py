@@ -0,0 +1,82 @@
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sample_data import random_transaction
+
+BUDGET = "test-budget"
+START = datetime(2024, 1, 1)
+FLAGS = ["red", "red_flag", "blue", None]
+
+def rollups_match(store, **filters):
+    """Compare the rollup summary with totals computed from the rows themselves."""
+    rows = store.query_transactions(BUDGET, **filters)
+    daily = defaultdict(lambda: [0, 0])
+    categories = defaultdict(lambda: [0, 0])
+    for t in rows:
+        for totals in (daily[t["date"]], categories[t["category_id"]]):
+            totals[0] += t["amount"]
+            totals[1] += 1
+    summary = store.summarize_transactions(BUDGET, **filters)
+    assert summary["total_milliunits"] == sum(t["amount"] for t in rows), filters
+    assert summary["count"] == len(rows), filters
+    assert {d["date"]: [d["amount"], d["count"]] for d in summary["daily"]} == daily, filters
+    assert {c["category_id"]: [c["amount"], c["count"]] for c in summary["categories"]} == categories, filters
+
+def check_all_rollups(store):
+    rollups_match(store)
+    rollups_match(store, account_id="acc-1")
+    rollups_match(store, account_id=["acc-2", "acc-3"], category_id="cat-1")
+    rollups_match(store, start_date=START + timedelta(days=10), end_date=START + timedelta(days=20))
+
+def test_rollups():
+    from transaction_store import TransactionStore
+    
+    rnd = random.Random(1)
+    store = TransactionStore()
+    current = {}
+    
+    # Inserts
+    batch = [random_transaction(rnd, f"t-{i}", START) for i in range(500)]
+    store.merge_transactions(BUDGET, batch)
+    current.update((t["id"], t) for t in batch)
+    check_all_rollups(store)
+    print("✓ Rollups match the stored rows after inserts")
+    
+    # Updates moving rows between days, flags, accounts and categories
+    for _ in range(5):
+        batch = []
+        for id in rnd.sample(sorted(current), 100):
+            t = dict(random_transaction(rnd, id, START), amount=current[id]["amount"] - 1)
+            batch.append(t)
+            current[id] = t
+        store.merge_transactions(BUDGET, batch)
+        check_all_rollups(store)
+    print("✓ Rollups match after updates to amount, date, flag, account and category")
+    
+    # Deletions, both from a delta and from the end of a full sync
+    deleted = rnd.sample(sorted(current), 150)
+    store.merge_transactions(BUDGET, [dict(current.pop(id), deleted=True) for id in deleted])
+    check_all_rollups(store)
+    generation = time.time_ns()
+    kept = rnd.sample(sorted(current), 200)
+    store.merge_transactions(BUDGET, [current[id] for id in kept], generation=generation)
+    store.remove_stale_transactions(BUDGET, generation)
+    check_all_rollups(store)
+    assert store.summarize_transactions(BUDGET, flag_colors=[f for f in FLAGS if f])["count"] == sum(
+        1 for id in kept if current[id]["flag_color"]
+    )
+    print("✓ Rollups match after deletions and stale-row removal")
+    
+    # The incremental rollups equal a rebuild from scratch
+    before = store.summarize_transactions(BUDGET)
+    store.rebuild_rollups()
+    assert store.summarize_transactions(BUDGET) == before
+    store.clear_transactions(BUDGET)
+    assert store.summarize_transactions(BUDGET)["daily"] == []
+    print("✓ Rollups equal a full rebuild, and clearing the budget empties them")
+
+if __name__ == "__main__":
+    print("Testing the transaction store rollups...")
+    test_rollups()
+    print("\nAll tests passed successfully!")
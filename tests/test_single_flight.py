@@ -0,0 +1,65 @@
+import threading
+import time
+
+def test_single_flight():
+    from cache import SingleFlight
+    
+    flights = SingleFlight()
+    calls = []
+    release = threading.Event()
+    
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return len(calls)
+    
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flights.do("sync", slow)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    # Wait until every caller has joined the flight before letting it finish
+    deadline = time.monotonic() + 5
+    while flights.stats()["shared"] < 7 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1] and results == [1] * 8, (calls, results)
+    assert flights.stats() == {"calls": 1, "shared": 7, "in_flight": 0}
+    print("✓ Concurrent calls for one key run once and share the result")
+    
+    # Errors reach every waiter, and nothing is kept once the flight ends
+    def failing():
+        release.wait(5)
+        raise RuntimeError("upstream failed")
+    
+    release.clear()
+    errors = []
+    
+    def call():
+        try:
+            flights.do("sync", failing)
+        except RuntimeError as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while flights.stats()["shared"] < 10 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 4 and len({id(e) for e in errors}) == 1
+    assert flights.do("sync", lambda: "fresh") == "fresh"
+    assert flights.do("other", lambda: "other") == "other"
+    print("✓ Errors are shared with waiters, and later calls run afresh")
+
+if __name__ == "__main__":
+    print("Testing single-flight request coalescing...")
+    test_single_flight()
+    print("\nAll tests passed successfully!")
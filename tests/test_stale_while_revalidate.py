@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+TODAY = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+def transaction(id, days_ago, amount):
+    return {
+        "id": id, "date": (TODAY - timedelta(days=days_ago)).strftime("%Y-%m-%d"),
+        "amount": amount, "memo": None, "cleared": "cleared", "approved": True,
+        "flag_color": "red", "account_id": "acc-1", "account_name": "Checking",
+        "payee_id": "p-1", "payee_name": "Restaurant", "category_id": "cat-1",
+        "category_name": "Groceries", "transfer_account_id": None, "deleted": False
+    }
+
+# Server state: the account name changes with each version, and requests
+# wait for GATE so a refresh can be held in flight
+VERSION = [1]
+TRANSACTIONS = [transaction("t-1", 1, -25000)]
+GATE = threading.Event()
+REQUESTS = []
+
+class StandInYNABHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the YNAB accounts and transactions endpoints."""
+    
+    def do_GET(self):
+        resource = urlparse(self.path).path.rsplit("/", 1)[-1]
+        REQUESTS.append(resource)
+        GATE.wait(5)
+        if resource == "accounts":
+            data = {"accounts": [{
+                "id": "acc-1", "name": f"Checking v{VERSION[0]}", "type": "checking",
+                "on_budget": True, "closed": False, "balance": 0, "deleted": False,
+                "note": None, "transfer_payee_id": "p-transfer"
+            }]}
+        else:
+            data = {"transactions": TRANSACTIONS, "server_knowledge": VERSION[0]}
+        body = json.dumps({"data": data}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_stale_while_revalidate():
+    print("Testing stale-while-revalidate against a local stand-in server...")
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInYNABHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.setdefault("YNAB_API_TOKEN", "test-token")
+    os.environ["YNAB_API_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    
+    from rate_limiter import RateLimiter
+    from transaction_store import TransactionStore
+    from ynab_client import YNABClient
+    
+    store = TransactionStore()
+    
+    def client():
+        # A new client has an empty memory cache, like another web worker
+        return YNABClient(budget_id="test-budget", store=store, rate_limiter=RateLimiter(), max_stale=600)
+    
+    def age(resource, seconds):
+        """Pretend resource was last synced seconds ago."""
+        store.set_state("test-budget", f"{resource}_synced_at", str(time.time() - seconds))
+    
+    def account_name(ynab):
+        return ynab.get_accounts()[0]["name"]
+    
+    try:
+        GATE.set()
+        assert account_name(client()) == "Checking v1" and REQUESTS == ["accounts"]
+        assert client().get_accounts(use_cache=False) == client().get_accounts() == store.get_accounts("test-budget")
+        assert REQUESTS == ["accounts"] * 2
+        print("✓ Downloaded and stored accounts have the same fields")
+        
+        # Expired but within max_stale: served at once, refreshed once
+        age("accounts", 400)
+        VERSION[0] = 2
+        GATE.clear()
+        ynab = client()
+        start = time.monotonic()
+        names = [account_name(ynab) for _ in range(5)]
+        assert time.monotonic() - start < 1 and names == ["Checking v1"] * 5, names
+        assert wait_for(lambda: len(REQUESTS) == 3)
+        time.sleep(0.2)
+        assert REQUESTS == ["accounts"] * 3
+        print("✓ An expired entry is served at once while one background refresh runs")
+        
+        GATE.set()
+        assert wait_for(lambda: store.is_fresh("test-budget", "accounts", 300))
+        assert account_name(ynab) == "Checking v2" and account_name(client()) == "Checking v2"
+        assert REQUESTS == ["accounts"] * 3
+        print("✓ The refreshed copy is served by every client once the refresh ends")
+        
+        # Past max_stale: the caller waits for YNAB
+        age("accounts", 300 + 600 + 10)
+        VERSION[0] = 3
+        assert account_name(client()) == "Checking v3" and REQUESTS == ["accounts"] * 4
+        print("✓ Data older than the cache timeout plus max_stale blocks for a fresh copy")
+        
+        # Transactions follow the same rule
+        ynab = client()
+        ynab.sync_transactions(since_date=TODAY - timedelta(days=30))
+        age("transactions", 400)
+        TRANSACTIONS.append(transaction("t-2", 0, -7000))
+        VERSION[0] = 4
+        GATE.clear()
+        del REQUESTS[:]
+        start = time.monotonic()
+        ids = [t["id"] for t in ynab.get_red_flag_transactions(TODAY - timedelta(days=30))]
+        assert time.monotonic() - start < 1 and ids == ["t-1"], ids
+        assert wait_for(lambda: REQUESTS == ["transactions"])
+        GATE.set()
+        assert wait_for(lambda: store.is_fresh("test-budget", "transactions", 300))
+        ids = [t["id"] for t in ynab.get_red_flag_transactions(TODAY - timedelta(days=30))]
+        assert sorted(ids) == ["t-1", "t-2"] and REQUESTS == ["transactions"], (ids, REQUESTS)
+        print("✓ Expired transactions are served at once and brought up to date in the background")
+        
+        print("\nAll tests passed successfully!")
+    finally:
+        GATE.set()
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_stale_while_revalidate()
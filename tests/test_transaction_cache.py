@@ -0,0 +1,44 @@
+import random
+from datetime import datetime, timedelta
+from sample_data import random_transaction
+
+START = datetime(2024, 1, 1)
+
+def test_transaction_cache():
+    from cache import TransactionCache
+    
+    rnd = random.Random(3)
+    transactions = sorted(
+        (random_transaction(rnd, f"t-{i}", START) for i in range(300)), key=lambda t: t["date"]
+    )
+    cache = TransactionCache(maxsize=10000, ttl=60)
+    start, end = START, START + timedelta(days=59)
+    cache.store(start, end, None, [], transactions)
+    
+    # A narrower range, category and account set is answered from the wider entry
+    q_start, q_end = START + timedelta(days=5), START + timedelta(days=25)
+    result = cache.lookup(q_start, q_end, "cat-1", ["acc-1", "acc-3"])
+    assert result == [
+        t for t in transactions
+        if q_start.strftime("%Y-%m-%d") <= t["date"] <= q_end.strftime("%Y-%m-%d")
+        and t["category_id"] == "cat-1" and t["account_id"] in ("acc-1", "acc-3")
+    ]
+    assert cache.subsumed_hits == 1
+    print("✓ Narrower queries are answered by filtering a wider cached entry")
+    
+    # Queries reaching outside the cached entry miss
+    assert cache.lookup(start - timedelta(days=1), end, None, []) is None
+    assert cache.lookup(start, None, None, []) is None
+    cache.store(start, end, "cat-2", ["acc-1"], [])
+    assert cache.lookup(start, end, "cat-2", ["acc-1", "acc-2"]) is not None  # From the first entry
+    assert cache.lookup(start, end, None, ["acc-1"]) is not None
+    narrow = TransactionCache(maxsize=10000, ttl=60)
+    narrow.store(start, end, "cat-2", ["acc-1"], [])
+    assert narrow.lookup(start, end, None, ["acc-1"]) is None
+    assert narrow.lookup(start, end, "cat-2", ["acc-1", "acc-2"]) is None
+    print("✓ Queries wider than every cached entry miss")
+
+if __name__ == "__main__":
+    print("Testing range subsumption in the transaction cache...")
+    test_transaction_cache()
+    print("\nAll tests passed successfully!")